@@ -1,25 +1,154 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, g
 from models.recommender import AmazonFashionRecommender
+from models.cache import LRUCache, TieredCache, create_shared_backend
+from models.reloader import RecommenderReloader
+from models.metrics import REGISTRY
+from models.memory import process_rss
+from models.ranking import DEFAULT_WEIGHTS
+from functools import wraps
+import hashlib
+import hmac
+import logging
 import os
+import time
 import urllib.parse
 
+# LOG_LEVEL=WARNING silences the per-stage build messages in production; DEBUG adds per-request lines
+logging.basicConfig(
+    level=os.environ.get('LOG_LEVEL', 'INFO').upper(),
+    format='%(asctime)s %(levelname)s %(name)s: %(message)s'
+)
+logger = logging.getLogger('stylesense')
+
 # Initialize Flask app
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'amazon-fashion-recommender-2024'
 
 # Initialize Amazon Fashion Recommender
-print("🚀 Initializing Amazon Fashion Recommender System...")
-print("📥 This may take a few minutes for large datasets...")
-recommender = AmazonFashionRecommender(data_path='data/clean_fashion_data.json')
+logger.info("🚀 Initializing Amazon Fashion Recommender System...")
+logger.info("📥 This may take a few minutes for large datasets...")
+# RECOMMENDER_STORAGE=mmap lets gunicorn workers share one memory-mapped copy of the catalog
+# MAX_PRODUCTS caps the rows loaded from the dataset (0 = no limit)
+DATA_PATH = os.environ.get('DATA_PATH', 'data/clean_fashion_data.json')
+max_products = int(os.environ.get('MAX_PRODUCTS', 5000))
+
+def build_recommender(on_progress=None):
+    return AmazonFashionRecommender(
+        data_path=DATA_PATH,
+        max_products=max_products or None,
+        storage=os.environ.get('RECOMMENDER_STORAGE', 'memory'),
+        n_jobs=int(os.environ.get('BUILD_JOBS', 1)),
+        embedding_dims=int(os.environ.get('EMBEDDING_DIMS', 0)) or None,
+        embedding_dtype=os.environ.get('EMBEDDING_DTYPE', 'float32'),
+        coview_weight=float(os.environ.get('COVIEW_WEIGHT', 0.3)),
+        on_progress=on_progress
+    )
+
+# The catalog is built in the background so the server binds its port right away;
+# until it is ready, pages run in a degraded mode and /readyz reports the build phase.
+# Reloads build a new recommender the same way and swap it in; RELOAD_MEMORY_MB
+# bounds old + new catalog, RELOAD_WATCH_INTERVAL (seconds) reloads when DATA_PATH changes
+reloader = RecommenderReloader(
+    build_recommender,
+    memory_budget=int(os.environ.get('RELOAD_MEMORY_MB', 0)) * 1024 * 1024 or None
+)
+reloader.reload()
+if int(os.environ.get('RELOAD_WATCH_INTERVAL', 0)) > 0:
+    reloader.watch(DATA_PATH, int(os.environ['RELOAD_WATCH_INTERVAL']))
+
+def get_recommender():
+    """The recommender currently serving (None while starting up); read it once per request"""
+    return reloader.current
+
+_boot = {}
+
+def boot_version():
+    """Catalog version the startup build will serve, for reading cached responses before it is ready"""
+    if 'version' not in _boot:
+        try:
+            _boot['version'] = AmazonFashionRecommender.version_for(DATA_PATH, max_products or None)
+        except OSError:
+            _boot['version'] = None
+    return _boot['version']
 
-if recommender.df is not None and len(recommender.df) > 0:
-    print(f"✅ System ready! Loaded {len(recommender.df)} Amazon fashion products")
-else:
-    print("❌ Warning: No products loaded. Please check your Amazon dataset file.")
+def boot_preview():
+    """A few products read straight from the dataset, for the home page while the catalog builds"""
+    if 'preview' not in _boot:
+        try:
+            _boot['preview'] = AmazonFashionRecommender.preview_products(DATA_PATH, 8)
+        except Exception as e:
+            logger.warning("⚠️ Could not read preview products: %s", e)
+            _boot['preview'] = []
+    return _boot['preview']
+
+def loading_response():
+    """503 for requests that need the catalog while it is still building"""
+    status = reloader.status()
+    message = f"The catalog is loading ({status['phase']}, {status['progress']:.0%}); try again shortly"
+    if request.path.startswith('/api/'):
+        response = jsonify({'success': False, 'error': message, 'phase': status['phase'],
+                            'progress': status['progress']})
+    else:
+        response = app.make_response(render_template('error.html', message=message, error_code="503"))
+    response.status_code = 503
+    response.headers['Retry-After'] = '5'
+    return response
+
+# CACHE_SIZE / CACHE_TTL bound the in-process cache; CACHE_URL (redis://... or 'local')
+# adds a shared level so gunicorn workers reuse each other's entries
+CACHE_TTL = int(os.environ.get('CACHE_TTL', 300))
+cache = TieredCache(
+    LRUCache(maxsize=int(os.environ.get('CACHE_SIZE', 2048)), ttl=CACHE_TTL),
+    shared=create_shared_backend(os.environ.get('CACHE_URL'))
+)
+
+def cached_call(name, fn, *args, **kwargs):
+    """fn(*args, **kwargs), memoized per catalog version"""
+    key = f"{name}:{args!r}:{sorted(kwargs.items())!r}"
+    recommender = getattr(fn, '__self__', None) or get_recommender()
+    return cache.get_or_set(key, lambda: fn(*args, **kwargs), version=recommender.catalog_key())
+
+def cached_json(view):
+    """Cache a JSON view's successful responses per URL and catalog version, with ETag / Cache-Control"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        query = urllib.parse.urlencode(sorted(request.args.items(multi=True)))
+        key = f"response:{request.path}?{query}"
+        recommender = get_recommender()
+        # While starting up, answer from entries a shared cache kept for the same catalog
+        version = recommender.catalog_key() if recommender is not None else boot_version()
+        entry = cache.get(key, version) if version is not None else None
+        if entry is None:
+            if recommender is None:
+                return loading_response()
+            response = app.make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            body = response.get_data()
+            entry = (body, hashlib.sha1(body).hexdigest())
+            cache.set(key, entry, version)
+
+        body, etag = entry
+        response = app.response_class(body, mimetype='application/json')
+        response.set_etag(etag)
+        response.cache_control.public = True
+        response.cache_control.max_age = CACHE_TTL
+        return response.make_conditional(request)
+    wrapper.serves_degraded = True
+    return wrapper
 
 @app.route('/')
 def home():
     """Homepage with featured Amazon fashion products"""
+    recommender = get_recommender()
+    if recommender is None:
+        return render_template('index.html',
+            featured_products=boot_preview(),
+            categories=[],
+            brands=[],
+            stats={},
+            loading=reloader.status(),
+            page_title="Amazon Fashion Store")
     try:
         featured_products = recommender.get_featured_products()
         categories = recommender.get_categories()
@@ -32,7 +161,7 @@ def home():
             stats=stats,
             page_title="Amazon Fashion Store")
     except Exception as e:
-        print(f"Error in home route: {e}")
+        logger.exception("Error in home route: %s", e)
         return render_template('index.html', 
             featured_products=[],
             categories=[],
@@ -43,6 +172,7 @@ def home():
 @app.route('/product/<product_id>')
 def product_detail(product_id):
     """Amazon product detail page with recommendations"""
+    recommender = get_recommender()
     try:
         product = recommender.get_product_by_id(product_id)
         if not product:
@@ -50,11 +180,12 @@ def product_detail(product_id):
                 message=f"Product {product_id} not found in Amazon dataset",
                 error_code="404"), 404
 
-        recommendations = recommender.get_recommendations(product_id, 8)
+        recommendations = cached_call('recommendations', recommender.get_recommendations, product_id, 8)
 
         related_by_brand = []
         related_by_category = []
         if product.get('brand') and product['brand'] != 'Unknown':
+            # Random samples are drawn per request, not cached, so visitors see varied picks
             related_by_brand = recommender.get_random_products(4, brand=product['brand'])
         if product.get('main_category'):
             related_by_category = recommender.get_random_products(4, category=product['main_category'])
@@ -66,18 +197,34 @@ def product_detail(product_id):
             related_by_category=related_by_category,
             page_title=f"{product.get('name', 'Product')} - Amazon Fashion")
     except Exception as e:
-        print(f"Error in product detail route: {e}")
+        logger.exception("Error in product detail route: %s", e)
         return render_template('error.html', 
             message="Error loading product details",
             error_code="500"), 500
 
+SEARCH_PAGE_SIZE = 24
+
+def _float_arg(name):
+    """Optional float query parameter; None when missing or malformed"""
+    try:
+        return float(request.args[name])
+    except (KeyError, ValueError):
+        return None
+
 @app.route('/search')
 def search():
     """Search Amazon fashion products"""
+    recommender = get_recommender()
     query = request.args.get('q', '').strip()
     category = request.args.get('category', '').strip()
     brand = request.args.get('brand', '').strip()
     sort_by = request.args.get('sort', 'relevance')
+    if sort_by not in recommender.SORT_KEYS:
+        sort_by = 'relevance'
+    mode = request.args.get('mode', 'keyword')
+    if mode not in recommender.SEARCH_MODES:
+        mode = 'keyword'
+    page = max(request.args.get('page', 1, type=int), 1)
 
     results = []
     search_info = {
@@ -85,34 +232,38 @@ def search():
         'category': category,
         'brand': brand,
         'sort_by': sort_by,
-        'total_results': 0
+        'mode': mode,
+        'min_price': _float_arg('min_price'),
+        'max_price': _float_arg('max_price'),
+        'min_rating': _float_arg('min_rating'),
+        'page': page,
+        'pages': 0,
+        'total_results': 0,
+        'facets': {}
     }
 
     try:
+        response = cached_call(
+            'search', recommender.search,
+            query, category=category or None, brand=brand or None,
+            min_price=search_info['min_price'], max_price=search_info['max_price'],
+            min_rating=search_info['min_rating'], sort=sort_by,
+            offset=(page - 1) * SEARCH_PAGE_SIZE, limit=SEARCH_PAGE_SIZE, mode=mode
+        )
+        results = response['results']
+        search_info['total_results'] = response['total']
+        search_info['pages'] = -(-response['total'] // SEARCH_PAGE_SIZE)
+        search_info['facets'] = response['facets']
+
         if query:
-            results = recommender.search_products(query, 36)
             search_info['search_type'] = f'Search results for "{query}"'
         elif category:
-            results = recommender.get_random_products(36, category=category)
             search_info['search_type'] = f'Products in "{category}"'
         elif brand:
-            results = recommender.get_random_products(36, brand=brand)
             search_info['search_type'] = f'Products by "{brand}"'
         else:
-            results = recommender.get_random_products(36)
             search_info['search_type'] = 'All products'
 
-        if sort_by and results:
-            if sort_by == 'price_low':
-                results = sorted(results, key=lambda x: x.get('price', 0))
-            elif sort_by == 'price_high':
-                results = sorted(results, key=lambda x: x.get('price', 0), reverse=True)
-            elif sort_by == 'rating':
-                results = sorted(results, key=lambda x: x.get('rating', 0), reverse=True)
-            elif sort_by == 'name':
-                results = sorted(results, key=lambda x: x.get('name', '').lower())
-
-        search_info['total_results'] = len(results)
         categories = recommender.get_categories()
         brands = recommender.get_brands()
 
@@ -123,7 +274,7 @@ def search():
             brands=brands[:20],
             page_title=f"Search Results - Amazon Fashion")
     except Exception as e:
-        print(f"Error in search route: {e}")
+        logger.exception("Error in search route: %s", e)
         return render_template('search.html', 
             results=[],
             search_info=search_info,
@@ -133,6 +284,7 @@ def search():
 
 @app.route('/category/<category_name>')
 def category_page(category_name):
+    recommender = get_recommender()
     try:
         category_name = urllib.parse.unquote(category_name)
         results = recommender.get_random_products(36, category=category_name)
@@ -147,7 +299,7 @@ def category_page(category_name):
             stats=stats,
             page_title=f"{category_name} - Category")
     except Exception as e:
-        print(f"Error in category page: {e}")
+        logger.exception("Error in category page: %s", e)
         return render_template('category.html',
             results=[],
             category_name=category_name,
@@ -158,6 +310,7 @@ def category_page(category_name):
 
 @app.route('/brand/<brand_name>')
 def brand_page(brand_name):
+    recommender = get_recommender()
     try:
         brand_name = urllib.parse.unquote(brand_name)
         results = recommender.get_random_products(36, brand=brand_name)
@@ -172,7 +325,7 @@ def brand_page(brand_name):
             stats=stats,
             page_title=f"{brand_name} - Brand")
     except Exception as e:
-        print(f"Error in brand page: {e}")
+        logger.exception("Error in brand page: %s", e)
         return render_template('brand.html',
             results=[],
             brand_name=brand_name,
@@ -182,9 +335,28 @@ def brand_page(brand_name):
             page_title="Brand Error")
 
 @app.route('/api/recommendations/<product_id>')
+@cached_json
 def api_recommendations(product_id):
+    """Recommendations for a product; ranking parameters re-rank them by price, rating and brand.
+
+    min_price / max_price and exclude_brand (repeatable) constrain the
+    candidates, diversity (0-1) spreads them out with MMR, and w_similarity,
+    w_price, w_rating, w_brand, w_category, w_coview override the signal
+    weights (w_coview defaults to COVIEW_WEIGHT).
+    """
+    recommender = get_recommender()
+    weights = {name: _float_arg(f'w_{name}') for name in DEFAULT_WEIGHTS}
+    weights = {name: value for name, value in weights.items() if value is not None} or None
+    diversity = min(max(_float_arg('diversity') or 0.0, 0.0), 1.0)
     try:
-        recommendations = recommender.get_recommendations(product_id, 8)
+        recommendations = recommender.get_recommendations(
+            product_id, 8,
+            weights=weights,
+            min_price=_float_arg('min_price'),
+            max_price=_float_arg('max_price'),
+            exclude_brands=request.args.getlist('exclude_brand') or None,
+            diversity=diversity
+        )
         return jsonify({
             'success': True,
             'product_id': product_id,
@@ -197,17 +369,85 @@ def api_recommendations(product_id):
             'error': str(e)
         }), 500
 
+MAX_BATCH_IDS = 100
+
+@app.route('/api/recommendations/batch', methods=['POST'])
+def api_recommendations_batch():
+    """Recommendations for up to MAX_BATCH_IDS products: {"ids": [...], "k": 8}"""
+    recommender = get_recommender()
+    payload = request.get_json(silent=True) or {}
+    product_ids = payload.get('ids')
+    if not isinstance(product_ids, list) or not product_ids:
+        return jsonify({'success': False, 'error': "'ids' must be a non-empty list"}), 400
+    if len(product_ids) > MAX_BATCH_IDS:
+        return jsonify({'success': False, 'error': f'At most {MAX_BATCH_IDS} ids per request'}), 400
+    try:
+        k = min(max(int(payload.get('k', 8)), 1), 50)
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'error': "'k' must be an integer"}), 400
+
+    try:
+        product_ids = list(dict.fromkeys(str(product_id) for product_id in product_ids))
+        version = recommender.catalog_key()
+        results, missing = {}, []
+        for product_id in product_ids:
+            cached = cache.get(f"batch:{product_id}:{k}", version)
+            if cached is None:
+                missing.append(product_id)
+            else:
+                results[product_id] = cached
+        if missing:
+            for product_id, recommendations in recommender.get_recommendations_batch(missing, k).items():
+                results[product_id] = recommendations
+                if recommendations:
+                    cache.set(f"batch:{product_id}:{k}", recommendations, version)
+
+        return jsonify({
+            'success': True,
+            'k': k,
+            'results': {product_id: results[product_id] for product_id in product_ids},
+            # Ids missing from the catalog, not products that merely have no neighbors
+            'not_found': [product_id for product_id in product_ids if recommender.get_position(product_id) is None]
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @app.route('/api/search')
+@cached_json
 def api_search():
+    recommender = get_recommender()
     query = request.args.get('q', '').strip()
-    limit = min(int(request.args.get('limit', 20)), 100)
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    operator = 'or' if request.args.get('op', 'and').lower() == 'or' else 'and'
+    mode = request.args.get('mode', 'keyword')
+    if mode not in recommender.SEARCH_MODES:
+        mode = 'keyword'
+    sort_by = request.args.get('sort', 'relevance')
+    if sort_by not in recommender.SORT_KEYS:
+        sort_by = 'relevance'
     try:
-        results = recommender.search_products(query, limit)
+        response = recommender.search(
+            query,
+            category=request.args.get('category', '').strip() or None,
+            brand=request.args.get('brand', '').strip() or None,
+            min_price=_float_arg('min_price'),
+            max_price=_float_arg('max_price'),
+            min_rating=_float_arg('min_rating'),
+            sort=sort_by, offset=offset, limit=limit, mode=mode, operator=operator
+        )
         return jsonify({
             'success': True,
             'query': query,
-            'results': results,
-            'total': len(results)
+            'mode': mode,
+            'sort': sort_by,
+            'offset': offset,
+            'results': response['results'],
+            'total': response['total'],
+            'facets': response['facets']
         })
     except Exception as e:
         return jsonify({
@@ -216,7 +456,9 @@ def api_search():
         }), 500
 
 @app.route('/api/stats')
+@cached_json
 def api_stats():
+    recommender = get_recommender()
     try:
         stats = recommender.get_stats()
         categories = recommender.get_categories()
@@ -233,8 +475,35 @@ def api_stats():
             'error': str(e)
         }), 500
 
+@app.route('/api/cache')
+def api_cache():
+    return jsonify({'success': True, 'cache': cache.stats()})
+
+# ADMIN_TOKEN enables the admin endpoints; callers send it as the X-Admin-Token header
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN', '')
+
+def _is_admin():
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(request.headers.get('X-Admin-Token', ''), ADMIN_TOKEN)
+
+@app.route('/api/admin/reload', methods=['GET', 'POST'])
+def api_admin_reload():
+    """POST starts a background reload of the dataset; GET reports reload state and memory"""
+    if not _is_admin():
+        return jsonify({'success': False, 'error': 'Forbidden'}), 403
+    status = reloader.status()
+    if reloader.ready:
+        status['memory']['components'] = get_recommender().memory_usage()
+    if request.method == 'GET':
+        return jsonify({'success': True, 'reload': status})
+
+    started, message = reloader.reload()
+    return jsonify({'success': started, 'message': message, 'reload': status}), 202 if started else 409
+
 @app.context_processor
 def inject_globals():
+    recommender = get_recommender()
+    if recommender is None:
+        return dict(categories=[], brands=[])
     return dict(
         categories=recommender.get_categories(),
         brands=recommender.get_brands()
@@ -252,15 +521,90 @@ def server_error(error):
         message="Internal server error",
         error_code="500"), 500
 
+HTTP_SECONDS = REGISTRY.histogram('stylesense_http_request_seconds', 'Request latency by endpoint, method and status')
+
+@app.before_request
+def start_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        elapsed = time.perf_counter() - started
+        HTTP_SECONDS.observe(elapsed, endpoint=request.endpoint or 'unmatched', method=request.method,
+                             status=str(response.status_code))
+        logger.debug("[%s] %s %d %.1fms", request.method, request.path, response.status_code, elapsed * 1000)
+    return response
+
+def collect_app_metrics():
+    """Cache and catalog state, read from their own counters at scrape time"""
+    stats = cache.stats()
+    local = stats['local']
+    lookups = [({'level': 'local', 'result': 'hit'}, local['hits']),
+               ({'level': 'local', 'result': 'miss'}, local['misses'])]
+    if 'shared' in stats:
+        lookups += [({'level': 'shared', 'result': 'hit'}, stats['shared']['hits']),
+                    ({'level': 'shared', 'result': 'miss'}, stats['shared']['misses'])]
+    status = reloader.status()
+    recommender = get_recommender()
+    families = [
+        ('stylesense_cache_lookups_total', 'counter', 'Response cache lookups by level and result', lookups),
+        ('stylesense_cache_evictions_total', 'counter', 'Entries evicted from the local response cache',
+         [({'reason': 'size'}, local['evictions']), ({'reason': 'ttl'}, local['expirations'])]),
+        ('stylesense_cache_entries', 'gauge', 'Entries in the local response cache', [({}, local['size'])]),
+        ('stylesense_catalog_ready', 'gauge', '1 once a catalog is serving', [({}, int(status['ready']))]),
+        ('stylesense_catalog_build_progress', 'gauge', 'Progress of the running catalog build (0-1)',
+         [({'phase': status['phase']}, status['progress'])]),
+        ('stylesense_catalog_reloads_total', 'counter', 'Completed catalog reloads', [({}, status['reloads'])]),
+        ('stylesense_catalog_heap_bytes', 'gauge', 'Heap bytes held by the serving catalog',
+         [({}, status['memory']['catalog_bytes'])]),
+    ]
+    if recommender is not None and recommender.df is not None:
+        families.append(('stylesense_catalog_products', 'gauge', 'Rows in the serving catalog',
+                         [({}, recommender.n_rows)]))
+    rss = process_rss()
+    if rss is not None:
+        families.append(('stylesense_process_resident_memory_bytes', 'gauge', 'Resident set size', [({}, rss)]))
+    return families
+
+REGISTRY.register_collector(collect_app_metrics)
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus text exposition of request, recommender, build-stage, cache and catalog metrics"""
+    return app.response_class(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+# Endpoints that work before the catalog is ready (cached_json views check the cache themselves)
+DEGRADED_ENDPOINTS = {'home', 'healthz', 'readyz', 'metrics', 'static', 'api_cache', 'api_admin_reload'}
+
 @app.before_request
-def log_request():
-    print(f"[{request.method}] {request.path}")
+def require_catalog():
+    if reloader.ready or request.endpoint in DEGRADED_ENDPOINTS:
+        return None
+    if getattr(app.view_functions.get(request.endpoint), 'serves_degraded', False):
+        return None
+    if request.endpoint is None:
+        return None
+    return loading_response()
+
+@app.route('/healthz')
+def healthz():
+    """Liveness: the process is up and serving requests, whether or not the catalog is built"""
+    return jsonify({'status': 'ok'})
+
+@app.route('/readyz')
+def readyz():
+    """Readiness: 200 once a catalog is serving, else 503 with the build phase and progress"""
+    status = reloader.status()
+    body = {key: status[key] for key in ('ready', 'state', 'phase', 'progress', 'build_seconds', 'last_error')}
+    return jsonify(body), 200 if status['ready'] else 503
 
 if __name__ == '__main__':
     print("\n" + "="*60)
     print("🌟 AMAZON FASHION RECOMMENDATION SYSTEM")
     print("🚀 Starting Flask development server...")
     print("🌐 Open http://127.0.0.1:5000 in your browser")
-    print("📊 Dataset:", f"{len(recommender.df) if recommender.df is not None else 0} Amazon products loaded")
+    print("📊 Catalog is building in the background; /readyz reports progress")
     print("="*60)
     app.run(debug=True, host='127.0.0.1', port=5000)
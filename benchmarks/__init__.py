@@ -0,0 +1,4 @@
+"""Benchmarks and synthetic datasets for the StyleSense recommender.
+
+Run from the project root, e.g. ``python -m benchmarks.bench_clean``.
+"""
@@ -0,0 +1,106 @@
+"""Correctness check and timing of clean_amazon_data against the original row-wise version.
+
+    python -m benchmarks.bench_clean                 # 5k, 100k and 1M rows
+    python -m benchmarks.bench_clean --sizes 5000 20000
+"""
+import argparse
+import json
+import logging
+import time
+import pandas as pd
+from models.recommender import AmazonFashionRecommender
+from benchmarks.synthetic import generate_products
+
+COMPARED_COLUMNS = [
+    'id', 'name', 'main_category', 'subcategory', 'category_path',
+    'brand', 'description', 'price', 'image_url', 'rating', 'combined_features'
+]
+
+
+def _bare_recommender(df):
+    """A recommender holding df, without loading data or building indexes"""
+    recommender = AmazonFashionRecommender.__new__(AmazonFashionRecommender)
+    recommender.df = df.copy()
+    recommender._build_indexes = lambda: None
+    return recommender
+
+
+def legacy_clean(recommender):
+    """The row-wise cleaning pipeline this benchmark replaced (df.apply(axis=1) per column)"""
+    df = recommender.df
+    df = df.dropna(subset=['title'])
+    df = df[df['title'].str.len() > 0].copy()
+    df['id'] = df['asin']
+    df['name'] = df['title']
+    df['main_category'] = df.apply(recommender.extract_main_category, axis=1)
+    df['subcategory'] = df.apply(recommender.extract_subcategory, axis=1)
+    df['category_path'] = df.apply(recommender.extract_category_path, axis=1)
+    df['brand'] = df['brand'].fillna('Unknown') if 'brand' in df.columns else 'Unknown'
+    df['brand'] = df['brand'].apply(lambda x: str(x) if pd.notna(x) else 'Unknown')
+    df['description'] = df['description'].fillna('').apply(recommender.clean_description)
+    df['price'] = pd.to_numeric(df.get('price'), errors='coerce')
+    df = df[df['price'] > 0].copy()
+    df['image_url'] = df.apply(recommender.extract_image_url, axis=1)
+    df['rating'] = pd.to_numeric(df['overall'], errors='coerce').fillna(4.0)
+
+    recommender.df = df
+    recommender.df = recommender.filter_fashion_products()
+    recommender.df['combined_features'] = recommender.create_combined_features()
+    recommender.df = recommender.df.reset_index(drop=True)
+
+
+def compare(expected, actual):
+    """Names of columns whose values differ between the two cleaned frames"""
+    if len(expected) != len(actual):
+        return [f'row count {len(expected)} != {len(actual)}']
+    mismatched = []
+    for column in COMPARED_COLUMNS:
+        left = expected[column].astype(object).where(expected[column].notna(), None).tolist()
+        right = actual[column].astype(object).where(actual[column].notna(), None).tolist()
+        if left != right:
+            mismatched.append(column)
+    return mismatched
+
+
+def run(size, seed=0, check=True):
+    df = pd.DataFrame(list(generate_products(size, seed=seed)))
+    result = {'rows': size}
+
+    vectorized = _bare_recommender(df)
+    started = time.perf_counter()
+    vectorized.clean_amazon_data()
+    result['vectorized_s'] = round(time.perf_counter() - started, 3)
+
+    if check:
+        legacy = _bare_recommender(df)
+        started = time.perf_counter()
+        legacy_clean(legacy)
+        result['legacy_s'] = round(time.perf_counter() - started, 3)
+        result['speedup'] = round(result['legacy_s'] / max(result['vectorized_s'], 1e-9), 1)
+        result['mismatched_columns'] = compare(legacy.df, vectorized.df)
+
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[5000, 100000, 1000000])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-legacy', action='store_true', help='time only the vectorized pipeline')
+    parser.add_argument('--output', help='write results as JSON to this path')
+    args = parser.parse_args()
+    logging.getLogger('models').setLevel(logging.WARNING)
+
+    results = []
+    for size in args.sizes:
+        result = run(size, seed=args.seed, check=not args.no_legacy)
+        results.append(result)
+        print(json.dumps(result))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
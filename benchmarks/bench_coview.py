@@ -0,0 +1,80 @@
+"""Build time, memory and lookup latency of the co-view / co-purchase graph.
+
+    python -m benchmarks.bench_coview                             # 300k products, ~1.8M edges
+    python -m benchmarks.bench_coview -n 1000000 --degree 10 --output coview.json
+
+Related lists are generated in memory (no catalog build): each product links
+to `degree` others drawn with a Zipf-like popularity skew, split between
+also_bought, also_viewed and bought_together like the Amazon metadata, and a
+share of the ids point outside the catalog and are dropped.
+"""
+import argparse
+import numpy as np
+from models.coview import CoViewGraph
+from models.memory import format_bytes
+from benchmarks.synthetic import zipf_choice
+from benchmarks.timing import environment, save_results, time_calls, time_once
+
+
+def generate_related(n, degree=6, skew=0.8, missing=0.1, seed=0):
+    """(ids, related dicts) for n products"""
+    rng = np.random.default_rng(seed)
+    ids = np.array([f'B{i:09d}' for i in range(n)], dtype=object)
+    # Ids past n are products the catalog doesn't carry
+    targets = zipf_choice(rng, int(n * (1 + missing)), n * degree, skew).reshape(n, degree)
+    names = [f'B{i:09d}' for i in range(int(n * (1 + missing)))]
+    bought, viewed = degree // 2, degree - degree // 2 - 1
+    related = []
+    for row in targets.tolist():
+        linked = [names[j] for j in row]
+        related.append({
+            'also_bought': linked[:bought],
+            'also_viewed': linked[bought:bought + viewed],
+            'bought_together': linked[bought + viewed:],
+        })
+    return ids, related
+
+
+def run(size, degree=6, skew=0.8, seed=0, samples=10000):
+    print(f"🔄 Generating related lists for {size} products (degree {degree})...")
+    ids, related = generate_related(size, degree, skew, seed=seed)
+    print("🔄 Building graph...")
+    graph, build_seconds = time_once(CoViewGraph.build, ids, related)
+    stats = graph.stats()
+
+    rng = np.random.default_rng(seed)
+    positions = [(int(p),) for p in rng.integers(0, size, samples)]
+    lookup = time_calls(graph.neighbors, positions)
+    live = rng.random(size) < 0.99
+    take, take_seconds = time_once(graph.take, np.flatnonzero(live), size)
+
+    print(f"   {stats['edges']} edges over {stats['linked_products']} products (max degree {stats['max_degree']})")
+    print(f"   build {build_seconds:.2f}s  ({1e6 * build_seconds / max(stats['edges'], 1):.2f}µs/edge)")
+    print(f"   memory {format_bytes(stats['bytes'])}  ({stats['bytes'] / max(stats['edges'], 1):.1f} bytes/edge)")
+    print(f"   neighbors() p50 {lookup['p50_ms']:.4f}ms  p95 {lookup['p95_ms']:.4f}ms")
+    print(f"   remap after 1% deletes {take_seconds:.2f}s ({take.n_edges} edges kept)")
+    return {
+        'environment': environment(),
+        'config': {'size': size, 'degree': degree, 'skew': skew, 'seed': seed, 'samples': samples},
+        'graph': {**stats, 'build_s': round(build_seconds, 3), 'take_s': round(take_seconds, 3)},
+        'benchmarks': {'neighbors': lookup},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-n', '--size', type=int, default=300000, help='products generated')
+    parser.add_argument('--degree', type=int, default=6, help='related ids listed per product')
+    parser.add_argument('--skew', type=float, default=0.8, help='popularity skew of related products')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--samples', type=int, default=10000, help='neighbor lookups timed')
+    parser.add_argument('--output', help='write results as JSON to this path')
+    args = parser.parse_args()
+
+    results = run(args.size, args.degree, args.skew, seed=args.seed, samples=args.samples)
+    if args.output:
+        save_results(args.output, results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Neighbor quality, latency and memory of LSA embeddings versus raw TF-IDF.
+
+    python -m benchmarks.bench_embeddings                        # 20k synthetic products
+    python -m benchmarks.bench_embeddings --dims 64 128 256 --output embeddings.json
+    python -m benchmarks.bench_embeddings --data-path data/clean_fashion_data.json -n 50000
+
+For each dimensionality the SVD is fitted once and the vectors are
+re-encoded in every storage dtype, so rows differ only in dims and dtype.
+recall_at_k compares each sampled product's top-k against the exact
+TF-IDF cosine neighbors.
+"""
+import argparse
+import logging
+import os
+import tempfile
+from models.embeddings import EmbeddingIndex, EMBEDDING_DTYPES, quality_report
+from models.memory import format_bytes
+from models.recommender import AmazonFashionRecommender
+from benchmarks.synthetic import write_dataset
+from benchmarks.timing import environment, save_results, time_once
+
+
+def run(size, dims_list, seed=0, k=10, samples=200, data_path=None):
+    with tempfile.TemporaryDirectory() as directory:
+        path = data_path or write_dataset(os.path.join(directory, 'bench.json'), size, seed=seed)
+        print(f"🔄 Vectorizing {size if data_path is None else path} products...")
+        recommender = AmazonFashionRecommender(path, n_neighbors=0, use_snapshot=False,
+                                               max_products=None if data_path is None else size)
+    matrix = recommender.tfidf_matrix
+
+    reports = []
+    for dims in dims_list:
+        index, fit_seconds = time_once(EmbeddingIndex.fit, matrix, dims, seed=seed)
+        for dtype in EMBEDDING_DTYPES:
+            report = quality_report(index.with_dtype(dtype), matrix, k=k, sample_size=samples, seed=seed)
+            report['fit_s'] = round(fit_seconds, 3)
+            reports.append(report)
+            print(f"   {report['dims']:>4}d {dtype:<8} recall@{k} {report['recall_at_k']:.3f}  "
+                  f"score ratio {report['score_ratio']:.3f}  {report['embedding_ms']:>7.3f}ms vs "
+                  f"{report['tfidf_ms']:>7.3f}ms  {format_bytes(report['embedding_bytes'])} vs "
+                  f"{format_bytes(report['tfidf_bytes'])}")
+
+    return {
+        'environment': environment(),
+        'config': {'size': size, 'seed': seed, 'k': k, 'samples': samples, 'rows': matrix.shape[0],
+                   'terms': matrix.shape[1]},
+        'reports': reports,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-n', '--size', type=int, default=20000, help='synthetic products generated')
+    parser.add_argument('--dims', type=int, nargs='+', default=[64, 128, 256])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-k', type=int, default=10, help='neighbors compared per product')
+    parser.add_argument('--samples', type=int, default=200, help='products whose neighbors are compared')
+    parser.add_argument('--data-path', help='benchmark a real dataset instead (first --size products)')
+    parser.add_argument('--output', help='write results as JSON to this path')
+    args = parser.parse_args()
+    logging.getLogger('models').setLevel(logging.WARNING)
+
+    results = run(args.size, args.dims, seed=args.seed, k=args.k, samples=args.samples, data_path=args.data_path)
+    if args.output:
+        save_results(args.output, results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""Microbenchmarks of AmazonFashionRecommender build phases and read methods.
+
+    python -m benchmarks.bench_recommender                       # 20k synthetic products
+    python -m benchmarks.bench_recommender -n 100000 --output results.json
+    python -m benchmarks.bench_recommender --compare results.json
+
+Build phases (load, clean, TF-IDF fit, neighbor table) are timed once on a
+fresh synthetic dataset without snapshots; read methods are timed per call
+over query and product-id samples drawn with a fixed seed, so runs are
+comparable. The recommender's info log lines are silenced (the 'models'
+logger is set to WARNING) so they don't interleave with the results.
+"""
+import argparse
+import json
+import logging
+import os
+import tempfile
+import time
+import numpy as np
+from models.recommender import AmazonFashionRecommender
+from benchmarks.synthetic import DESCRIPTION_WORDS, write_dataset
+from benchmarks.timing import compare_results, environment, save_results, time_calls, time_once
+
+QUERIES = [
+    'dress', 'leather boots', 'silk scarf', 'black jacket', 'sterling silver necklace',
+    'summer sandals', 'wool coat winter', 'denim jeans slim fit', 'watch', 'bag',
+]
+
+
+def build_phases(path, max_products, n_neighbors):
+    """Seconds spent in each cold-build phase (from on_progress), and the built recommender"""
+    marks = []
+    recommender, total = time_once(
+        AmazonFashionRecommender, path, n_neighbors=n_neighbors, max_products=max_products,
+        use_snapshot=False, on_progress=lambda phase, _: marks.append((phase, time.perf_counter()))
+    )
+    phases = {f'{phase}_s': round(end - start, 3) for (phase, start), (_, end) in zip(marks, marks[1:])}
+    phases['total_s'] = round(total, 3)
+    return phases, recommender
+
+
+def read_benchmarks(recommender, samples, seed=0):
+    """Per-call latency summaries of the recommender's read methods"""
+    rng = np.random.default_rng(seed)
+    ids = recommender.ids()
+    product_ids = ids[rng.integers(0, len(ids), samples)].tolist()
+    queries = [QUERIES[i % len(QUERIES)] for i in range(samples)]
+    random_queries = [' '.join(rng.choice(DESCRIPTION_WORDS, 2)) for _ in range(samples)]
+    categories = [c['name'] for c in recommender.get_categories()] or [None]
+    brands = [b['name'] for b in recommender.get_brands()] or [None]
+
+    benchmarks = {
+        'get_recommendations': (recommender.get_recommendations, [(pid, 8) for pid in product_ids]),
+        'get_recommendations_batch[20]': (
+            recommender.get_recommendations_batch,
+            [(product_ids[i:i + 20], 8) for i in range(0, samples, 20)]
+        ),
+        'search_products[keyword]': (recommender.search_products, [(q, 12) for q in queries]),
+        'search_products[keyword,random]': (recommender.search_products, [(q, 12) for q in random_queries]),
+        'search_products[semantic]': (
+            lambda q: recommender.search_products(q, 12, mode='semantic'), [(q,) for q in queries]
+        ),
+        'search[query+facets]': (lambda q: recommender.search(q, limit=24), [(q,) for q in queries]),
+        'search[browse,price_low]': (
+            lambda c: recommender.search('', category=c, sort='price_low', limit=24),
+            [(categories[i % len(categories)],) for i in range(samples)]
+        ),
+        'get_random_products': (recommender.get_random_products, [(12,)] * samples),
+        'get_random_products[category]': (
+            lambda c: recommender.get_random_products(12, category=c),
+            [(categories[i % len(categories)],) for i in range(samples)]
+        ),
+        'get_random_products[brand]': (
+            lambda b: recommender.get_random_products(12, brand=b),
+            [(brands[i % len(brands)],) for i in range(samples)]
+        ),
+        'get_featured_products': (recommender.get_featured_products, [()] * samples),
+        'get_categories': (recommender.get_categories, [()] * samples),
+        'get_brands': (recommender.get_brands, [()] * samples),
+        'get_stats': (recommender.get_stats, [()] * samples),
+        'get_product_by_id': (recommender.get_product_by_id, [(pid,) for pid in product_ids]),
+    }
+
+    results = {}
+    for name, (fn, arguments) in benchmarks.items():
+        results[name] = time_calls(fn, arguments)
+        print(f"   {name:<40} p50 {results[name]['p50_ms']:>9.3f}ms  p95 {results[name]['p95_ms']:>9.3f}ms")
+    return results
+
+
+def run(size, seed=0, samples=200, n_neighbors=20, skew=None, description_words=40, data_path=None):
+    skew = skew or {}
+    with tempfile.TemporaryDirectory() as directory:
+        path = data_path or write_dataset(os.path.join(directory, 'bench.json'), size, seed=seed,
+                                          description_words=description_words, **skew)
+        print(f"🔄 Building from {size if data_path is None else path} products...")
+        phases, recommender = build_phases(path, None if data_path is None else size, n_neighbors)
+        print("   " + ", ".join(f"{name} {seconds}" for name, seconds in phases.items()))
+        print("🔄 Timing read methods...")
+        benchmarks = read_benchmarks(recommender, samples, seed)
+
+    memory = recommender.memory_usage()['total']
+    return {
+        'environment': environment(),
+        'config': {'size': size, 'seed': seed, 'samples': samples, 'n_neighbors': n_neighbors,
+                   'description_words': description_words, 'rows': len(recommender.df), **skew},
+        'build': phases,
+        'memory_bytes': memory,
+        'benchmarks': benchmarks,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-n', '--size', type=int, default=20000, help='synthetic products generated')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--samples', type=int, default=200, help='calls timed per read method')
+    parser.add_argument('--neighbors', type=int, default=20, help='neighbor table width (0 = none)')
+    parser.add_argument('--brand-skew', type=float, default=1.1)
+    parser.add_argument('--category-skew', type=float, default=0.8)
+    parser.add_argument('--description-words', type=int, default=40)
+    parser.add_argument('--data-path', help='benchmark a real dataset instead (first --size products)')
+    parser.add_argument('--output', help='write results as JSON to this path')
+    parser.add_argument('--compare', help='baseline results JSON to compare p50 latencies against')
+    parser.add_argument('--threshold', type=float, default=0.1, help='slowdown fraction flagged as a regression')
+    args = parser.parse_args()
+    logging.getLogger('models').setLevel(logging.WARNING)
+
+    results = run(args.size, seed=args.seed, samples=args.samples, n_neighbors=args.neighbors,
+                  skew={'brand_skew': args.brand_skew, 'category_skew': args.category_skew},
+                  description_words=args.description_words, data_path=args.data_path)
+    if args.output:
+        save_results(args.output, results)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        print(f"🔄 Compared with {args.compare}:")
+        if compare_results(baseline, results, threshold=args.threshold):
+            raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""Check that the precomputed neighbor table answers like on-the-fly scoring.
+
+    python -m benchmarks.check_neighbors                         # 3k synthetic products
+    python -m benchmarks.check_neighbors -n 10000 -k 30
+
+Builds a catalog from a synthetic dataset and asserts that NeighborIndex
+lookups match compute_top_k_for_rows over the same TF-IDF matrix, before and
+after a save / memory-mapped load. Ties between equal scores may be ordered
+differently, so rows are compared by score and each stored neighbor's score
+is recomputed from the matrix. Exits non-zero on the first mismatch.
+"""
+import argparse
+import logging
+import os
+import tempfile
+import numpy as np
+from models.recommender import AmazonFashionRecommender
+from models.neighbors import NeighborIndex, compute_top_k_for_rows
+from benchmarks.synthetic import write_dataset
+
+
+def check_table(table, matrix, k, block_size=97):
+    """Assert the table holds the top-k cosine neighbors of every row"""
+    n_rows = matrix.shape[0]
+    assert len(table) == n_rows, f"table has {len(table)} rows, matrix {n_rows}"
+    assert table.k == k, f"table width {table.k}, expected {k}"
+
+    # A different block size than the build, so blocking can't hide an error
+    indices, scores = compute_top_k_for_rows(matrix, np.arange(n_rows), k, block_size=block_size)
+    assert np.allclose(table.scores, scores, atol=1e-5), "table scores differ from on-the-fly top-k"
+
+    rows = np.repeat(np.arange(n_rows), k)
+    stored = np.asarray(table.indices).ravel()
+    assert not (stored == rows).any(), "a row lists itself as a neighbor"
+    recomputed = np.asarray(matrix[rows].multiply(matrix[stored]).sum(axis=1)).ravel()
+    assert np.allclose(recomputed, np.asarray(table.scores).ravel(), atol=1e-5), \
+        "stored scores don't match the cosine of the stored neighbors"
+
+    for position in (0, n_rows // 2, n_rows - 1):
+        assert np.array_equal(table.lookup(position, k), table.indices[position]), f"lookup({position}) differs"
+    assert table.lookup(0, k + 1) is None, "lookup wider than the table should return None"
+    assert table.lookup(n_rows, 1) is None, "lookup past the last row should return None"
+
+
+def run(size, k=20, seed=0):
+    with tempfile.TemporaryDirectory() as directory:
+        path = write_dataset(os.path.join(directory, 'check.json'), size, seed=seed)
+        recommender = AmazonFashionRecommender(path, n_neighbors=k, use_snapshot=False)
+        matrix = recommender.tfidf_matrix
+        print(f"🔄 Checking the top-{k} table of {matrix.shape[0]} products...")
+        check_table(recommender.neighbor_index, matrix, k)
+
+        saved = os.path.join(directory, 'neighbors')
+        recommender.neighbor_index.save(saved)
+        loaded = NeighborIndex.load(saved, recommender.neighbor_index.fingerprint, mmap_mode='r')
+        assert loaded is not None, "saved table did not load"
+        assert NeighborIndex.load(saved, 'other-catalog') is None, "table loaded under another fingerprint"
+        check_table(loaded, matrix, k)
+    print("✅ Neighbor table matches on-the-fly scoring")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-n', '--size', type=int, default=3000, help='synthetic products generated')
+    parser.add_argument('-k', type=int, default=20, help='neighbor table width')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    logging.getLogger('models').setLevel(logging.WARNING)
+
+    run(args.size, k=args.k, seed=args.seed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,208 @@
+"""In-process load test of the Flask routes through the test client.
+
+    python -m benchmarks.load_test                               # 20k synthetic products
+    python -m benchmarks.load_test --requests 5000 --concurrency 4 --output load.json
+    python -m benchmarks.load_test --no-cache --compare load.json
+
+Requests follow a weighted mix of pages and API calls (ROUTE_MIX) with
+product ids, queries and filters sampled from the catalog. Latency is
+measured around each test-client call, so it covers routing, the view,
+templates and JSON encoding but not the network or a WSGI server.
+"""
+import argparse
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import urllib.parse
+import numpy as np
+from benchmarks.synthetic import write_dataset
+from benchmarks.timing import compare_results, environment, save_results, summarize
+
+QUERIES = ['dress', 'leather boots', 'silk scarf', 'black jacket', 'necklace', 'summer sandals',
+           'wool coat', 'denim jeans', 'watch', 'bag', 'casual shirt', 'gold ring']
+
+# (route name, weight): relative share of each kind of request in the load
+ROUTE_MIX = [
+    ('home', 5),
+    ('product', 25),
+    ('search_page', 10),
+    ('api_search', 20),
+    ('api_search_filtered', 10),
+    ('api_recommendations', 20),
+    ('api_recommendations_batch', 5),
+    ('category', 3),
+    ('brand', 2),
+    ('api_stats', 2),
+]
+
+
+def make_requests(catalog, n, seed=0):
+    """n (route name, method, url, json body) tuples drawn from ROUTE_MIX"""
+    rng = np.random.default_rng(seed)
+    names = [name for name, _ in ROUTE_MIX]
+    weights = np.array([weight for _, weight in ROUTE_MIX], dtype=float)
+    picks = rng.choice(len(names), size=n, p=weights / weights.sum())
+    ids, categories, brands = catalog['ids'], catalog['categories'], catalog['brands']
+
+    def pick(values):
+        return values[rng.integers(len(values))]
+
+    requests = []
+    for i in picks:
+        name = names[i]
+        query = urllib.parse.quote(pick(QUERIES))
+        if name == 'home':
+            requests.append((name, 'GET', '/', None))
+        elif name == 'product':
+            requests.append((name, 'GET', f'/product/{pick(ids)}', None))
+        elif name == 'search_page':
+            requests.append((name, 'GET', f'/search?q={query}&page={rng.integers(1, 3)}', None))
+        elif name == 'api_search':
+            requests.append((name, 'GET', f'/api/search?q={query}', None))
+        elif name == 'api_search_filtered':
+            category = urllib.parse.quote(pick(categories))
+            requests.append((name, 'GET', f'/api/search?q={query}&category={category}&sort=price_low&max_price=100',
+                             None))
+        elif name == 'api_recommendations':
+            requests.append((name, 'GET', f'/api/recommendations/{pick(ids)}', None))
+        elif name == 'api_recommendations_batch':
+            batch = [str(pick(ids)) for _ in range(10)]
+            requests.append((name, 'POST', '/api/recommendations/batch', {'ids': batch, 'k': 8}))
+        elif name == 'category':
+            requests.append((name, 'GET', f'/category/{urllib.parse.quote(pick(categories))}', None))
+        elif name == 'api_stats':
+            requests.append((name, 'GET', '/api/stats', None))
+        else:
+            requests.append((name, 'GET', f'/brand/{urllib.parse.quote(pick(brands))}', None))
+    return requests
+
+
+def start_app(data_path, max_products, cache):
+    """Import app.py against data_path and wait until /readyz passes; returns the module"""
+    os.environ['DATA_PATH'] = data_path
+    os.environ['MAX_PRODUCTS'] = str(max_products or 0)
+    if not cache:
+        os.environ['CACHE_SIZE'] = '0'
+    import app as app_module
+    # app.py configures INFO logging; keep the catalog build and request logs out of the results
+    for name in ('models', 'stylesense'):
+        logging.getLogger(name).setLevel(logging.WARNING)
+    client = app_module.app.test_client()
+    started = time.perf_counter()
+    while client.get('/readyz').status_code != 200:
+        if app_module.reloader.state == 'failed':
+            raise RuntimeError(f"Catalog build failed: {app_module.reloader.last_error}")
+        time.sleep(0.1)
+    print(f"✅ App ready in {time.perf_counter() - started:.1f}s")
+    return app_module
+
+
+def run_load(app_module, requests, concurrency=1):
+    """Send requests from `concurrency` threads; returns per-request (name, status, seconds) and wall time"""
+    results = [None] * len(requests)
+    position = iter(range(len(requests)))
+    lock = threading.Lock()
+
+    def worker():
+        client = app_module.app.test_client()
+        while True:
+            with lock:
+                i = next(position, None)
+            if i is None:
+                return
+            name, method, url, body = requests[i]
+            started = time.perf_counter()
+            response = client.open(url, method=method, json=body)
+            elapsed = time.perf_counter() - started
+            results[i] = (name, response.status_code, elapsed)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+    return results, wall
+
+
+def report(results, wall):
+    by_route = {}
+    for name, status, seconds in results:
+        by_route.setdefault(name, []).append((status, seconds))
+
+    benchmarks = {}
+    for name, samples in sorted(by_route.items()):
+        summary = summarize([seconds for _, seconds in samples])
+        summary['errors'] = sum(1 for status, _ in samples if status >= 500)
+        summary['statuses'] = {str(s): sum(1 for status, _ in samples if status == s)
+                               for s in sorted({status for status, _ in samples})}
+        benchmarks[name] = summary
+    overall = summarize([seconds for _, _, seconds in results])
+    overall['errors'] = sum(1 for _, status, _ in results if status >= 500)
+    overall['throughput_rps'] = round(len(results) / wall, 1) if wall else 0.0
+    benchmarks['all'] = overall
+
+    for name, summary in benchmarks.items():
+        print(f"   {name:<28} n={summary['count']:<6} p50 {summary['p50_ms']:>8.2f}ms  "
+              f"p95 {summary['p95_ms']:>8.2f}ms  p99 {summary['p99_ms']:>8.2f}ms  errors {summary['errors']}")
+    print(f"   throughput {overall['throughput_rps']} req/s over {wall:.1f}s")
+    return benchmarks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-n', '--size', type=int, default=20000, help='synthetic products generated')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--data-path', help='load-test a real dataset instead (first --size products)')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--warmup', type=int, default=200, help='requests sent before measuring')
+    parser.add_argument('--concurrency', type=int, default=1, help='client threads')
+    parser.add_argument('--no-cache', action='store_true', help='disable the response cache (CACHE_SIZE=0)')
+    parser.add_argument('--output', help='write results as JSON to this path')
+    parser.add_argument('--compare', help='baseline results JSON to compare p95 latencies against')
+    parser.add_argument('--threshold', type=float, default=0.1, help='slowdown fraction flagged as a regression')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        if args.data_path:
+            data_path, max_products = args.data_path, args.size
+        else:
+            data_path, max_products = write_dataset(os.path.join(directory, 'load.json'), args.size,
+                                                    seed=args.seed), None
+        print(f"🔄 Starting app on {data_path}...")
+        app_module = start_app(data_path, max_products, cache=not args.no_cache)
+
+        recommender = app_module.get_recommender()
+        catalog = {
+            'ids': recommender.ids().tolist(),
+            'categories': [c['name'] for c in recommender.get_categories()] or ['Clothing'],
+            'brands': [b['name'] for b in recommender.get_brands()] or ['Unknown'],
+        }
+        if args.warmup:
+            run_load(app_module, make_requests(catalog, args.warmup, seed=args.seed + 1), args.concurrency)
+        print(f"🔄 Sending {args.requests} requests from {args.concurrency} thread(s)...")
+        results, wall = run_load(app_module, make_requests(catalog, args.requests, seed=args.seed),
+                                 args.concurrency)
+
+    results = {
+        'environment': environment(),
+        'config': {'size': args.size, 'seed': args.seed, 'requests': args.requests, 'warmup': args.warmup,
+                   'concurrency': args.concurrency, 'cache': not args.no_cache, 'rows': len(catalog['ids'])},
+        'benchmarks': report(results, wall),
+    }
+    if args.output:
+        save_results(args.output, results)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        print(f"🔄 Compared with {args.compare}:")
+        if compare_results(baseline, results, metric='p95_ms', threshold=args.threshold):
+            raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+"""Synthetic Amazon-style fashion metadata for benchmarks.
+
+Records mimic the raw Amazon fashion dumps: nested ``categories`` lists,
+HTML descriptions, prices as numbers, strings or missing, image URLs as
+strings or lists, and ``related`` also_bought / also_viewed lists.
+"""
+import argparse
+import gzip
+import json
+import numpy as np
+
+CATEGORY_TREE = [
+    ['Clothing, Shoes & Jewelry', 'Women', 'Clothing', 'Dresses'],
+    ['Clothing, Shoes & Jewelry', 'Women', 'Shoes', 'Boots'],
+    ['Clothing, Shoes & Jewelry', 'Men', 'Clothing', 'Shirts'],
+    ['Clothing, Shoes & Jewelry', 'Men', 'Shoes', 'Sneakers'],
+    ['Clothing, Shoes & Jewelry', 'Girls', 'Clothing'],
+    ['Clothing, Shoes & Jewelry', 'Boys', 'Clothing'],
+    ['Jewelry', 'Necklaces'],
+    ['Jewelry', 'Rings'],
+    ['Accessories', 'Handbags'],
+    ['Accessories', 'Wallets'],
+    ['Accessories', 'Watches'],
+    ['Sports & Outdoors', 'Fan Shop'],
+]
+
+PRODUCT_WORDS = [
+    'dress', 'shirt', 'pants', 'jeans', 'jacket', 'coat', 'sweater', 'hoodie',
+    'boots', 'sneakers', 'sandals', 'necklace', 'bracelet', 'earrings', 'ring',
+    'watch', 'bag', 'handbag', 'backpack', 'wallet', 'belt', 'hat', 'scarf',
+    'gloves', 'socks', 'swimwear',
+]
+
+DESCRIPTION_WORDS = PRODUCT_WORDS + [
+    'cotton', 'leather', 'silk', 'wool', 'denim', 'polyester', 'slim', 'fit',
+    'casual', 'formal', 'summer', 'winter', 'vintage', 'classic', 'elegant',
+    'comfortable', 'lightweight', 'waterproof', 'black', 'white', 'red', 'blue',
+    'navy', 'grey', 'gold', 'silver', 'sterling', 'stretch', 'breathable',
+    'adjustable', 'pocket', 'zipper', 'button', 'hand', 'wash', 'imported',
+]
+
+
+def zipf_choice(rng, n_items, size, skew):
+    """Indices in [0, n_items) with a Zipf-like popularity skew (0 = uniform)"""
+    weights = 1.0 / np.arange(1, n_items + 1) ** skew
+    return rng.choice(n_items, size=size, p=weights / weights.sum())
+
+
+def generate_products(n, seed=0, n_brands=500, brand_skew=1.1, category_skew=0.8,
+                      description_words=40, vocabulary_size=5000, related_per_product=6):
+    """Yield n raw product records.
+
+    Brands and categories follow Zipf-like distributions controlled by
+    brand_skew / category_skew. Descriptions average description_words words
+    drawn from fashion words plus a synthetic long-tail vocabulary.
+    """
+    rng = np.random.default_rng(seed)
+    brands = [f'Brand{i:04d}' for i in range(n_brands)]
+    description_vocab = np.array(DESCRIPTION_WORDS + [f'term{i}' for i in range(vocabulary_size)])
+    product_words = np.array(PRODUCT_WORDS)
+    adjectives = np.array(DESCRIPTION_WORDS)
+
+    # Draw everything up front; per-record work is slicing and string joins
+    brand_ids = zipf_choice(rng, n_brands, n, brand_skew)
+    category_ids = zipf_choice(rng, len(CATEGORY_TREE), n, category_skew)
+    title_nouns = rng.integers(0, len(product_words), size=(n, 2))
+    title_adjectives = rng.integers(0, len(adjectives), size=(n, 3))
+    desc_lengths = np.maximum(1, rng.poisson(description_words, size=n))
+    desc_offsets = np.concatenate(([0], np.cumsum(desc_lengths)))
+    desc_words = description_vocab[zipf_choice(rng, len(description_vocab), int(desc_offsets[-1]), 0.7)]
+    ratings = np.round(rng.uniform(1, 5, size=n), 1)
+    prices = np.round(rng.lognormal(3.3, 0.8, size=n), 2)
+    price_kind = rng.random(n)
+    has_brand = rng.random(n) < 0.9
+    list_image = rng.random(n) < 0.5
+    related = rng.integers(0, max(n, 1), size=(n, related_per_product))
+    half = related_per_product // 2
+
+    for i in range(n):
+        title = adjectives[title_adjectives[i]].tolist() + product_words[title_nouns[i]].tolist()
+        record = {
+            'asin': f'B{i:09d}',
+            'title': ' '.join(title).title(),
+            'categories': [CATEGORY_TREE[category_ids[i]]],
+            'description': '<p>' + ' '.join(desc_words[desc_offsets[i]:desc_offsets[i + 1]]) + '</p>\n<br>',
+            'overall': float(ratings[i]),
+        }
+
+        if price_kind[i] < 0.7:
+            record['price'] = float(prices[i])
+        elif price_kind[i] < 0.85:
+            record['price'] = f'{prices[i]:.2f}'
+        # else: price missing, dropped during loading/cleaning
+
+        if has_brand[i]:
+            record['brand'] = brands[brand_ids[i]]
+        if list_image[i]:
+            record['imageURL'] = [f'https://images.example.com/{i}.jpg']
+        else:
+            record['imUrl'] = f'https://images.example.com/{i}.jpg'
+        if i and related_per_product:
+            record['related'] = {
+                'also_bought': [f'B{j:09d}' for j in related[i, :half]],
+                'also_viewed': [f'B{j:09d}' for j in related[i, half:]],
+            }
+        yield record
+
+
+def write_dataset(path, n, fmt=None, **params):
+    """Write n synthetic products as a JSON array ('json') or JSONL ('jsonl'), gzipped if path ends in .gz"""
+    if fmt is None:
+        fmt = 'json' if path.replace('.gz', '').endswith('.json') else 'jsonl'
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'wt', encoding='utf-8') as f:
+        if fmt == 'json':
+            f.write('[')
+            for i, record in enumerate(generate_products(n, **params)):
+                f.write((',\n' if i else '\n') + json.dumps(record))
+            f.write('\n]\n')
+        else:
+            for record in generate_products(n, **params):
+                f.write(json.dumps(record) + '\n')
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic Amazon-style fashion dataset')
+    parser.add_argument('path', help='output file (.json, .jsonl, optionally .gz)')
+    parser.add_argument('-n', '--size', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--brands', type=int, default=500)
+    parser.add_argument('--brand-skew', type=float, default=1.1)
+    parser.add_argument('--category-skew', type=float, default=0.8)
+    parser.add_argument('--description-words', type=int, default=40)
+    args = parser.parse_args()
+
+    write_dataset(args.path, args.size, seed=args.seed, n_brands=args.brands,
+                  brand_skew=args.brand_skew, category_skew=args.category_skew,
+                  description_words=args.description_words)
+    print(f"✅ Wrote {args.size} products to {args.path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Timing, percentile and result-file helpers shared by the benchmarks."""
+import json
+import os
+import platform
+import subprocess
+import time
+import numpy as np
+
+
+def summarize(samples):
+    """Latency summary in milliseconds for a list of durations in seconds"""
+    ms = np.asarray(samples, dtype=np.float64) * 1000
+    if len(ms) == 0:
+        return {'count': 0}
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        'count': len(ms),
+        'mean_ms': round(float(ms.mean()), 3),
+        'p50_ms': round(float(p50), 3),
+        'p95_ms': round(float(p95), 3),
+        'p99_ms': round(float(p99), 3),
+        'max_ms': round(float(ms.max()), 3),
+    }
+
+
+def time_calls(fn, arguments, warmup=3):
+    """Call fn(*args) for each args tuple; returns the summary of per-call durations"""
+    for args in arguments[:warmup]:
+        fn(*args)
+    samples = []
+    for args in arguments:
+        started = time.perf_counter()
+        fn(*args)
+        samples.append(time.perf_counter() - started)
+    summary = summarize(samples)
+    summary['ops_per_s'] = round(len(samples) / max(sum(samples), 1e-9), 1)
+    return summary
+
+
+def time_once(fn, *args, **kwargs):
+    """(result, seconds) of a single call"""
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+
+def environment():
+    """Machine and code version the results were measured on"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def save_results(path, results):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"✅ Wrote results to {path}")
+
+
+def compare_results(baseline, current, metric='p50_ms', threshold=0.1):
+    """Print each benchmark's change in metric against a baseline results file.
+
+    Both are {'benchmarks': {name: summary}} dicts; a slowdown larger than
+    threshold (a fraction) is flagged. Returns the names of regressed benchmarks.
+    """
+    regressed = []
+    for name, summary in current['benchmarks'].items():
+        before = baseline.get('benchmarks', {}).get(name, {}).get(metric)
+        after = summary.get(metric)
+        if before is None or after is None:
+            continue
+        change = (after - before) / before if before else 0.0
+        flag = ''
+        if change > threshold:
+            flag = '  ⚠️ slower'
+            regressed.append(name)
+        elif change < -threshold:
+            flag = '  ✅ faster'
+        print(f"   {name:<40} {before:>10.3f} → {after:>10.3f} {metric} ({change:+.1%}){flag}")
+    return regressed
@@ -0,0 +1,204 @@
+"""Write top-K similar items for every product in the catalog.
+
+    python export_recommendations.py --output exports/similar -k 20
+    python export_recommendations.py --output exports/similar --format npz --jobs 4
+    python export_recommendations.py --output exports/similar --resume
+
+The catalog is split into parts of --part-rows rows. Each part is scored
+block by block (bounded memory) and written atomically as its own file, so
+an interrupted run continues from the first missing part with --resume.
+
+Formats:
+  jsonl  part-NNNNN.jsonl, one {"id", "neighbors", "scores"} object per product
+  npz    part-NNNNN.npz with int32 'positions', 'neighbors' and float32
+         'scores' arrays; row positions map to ids through ids.txt
+"""
+import argparse
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from models.recommender import AmazonFashionRecommender
+from models.neighbors import NeighborIndex, compute_top_k_for_rows
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ('jsonl', 'npz')
+
+# Manifest fields that must match for --resume to continue an earlier export
+JOB_KEYS = ('catalog', 'rows', 'k', 'format', 'part_rows')
+
+# Per-process state, set once by _init_worker instead of pickling it with every task
+_worker = {}
+
+
+def _init_worker(matrix, matrix_t, ids, table, output, fmt, k, block_size):
+    _worker.update(matrix=matrix, matrix_t=matrix_t, ids=ids, table=table,
+                   output=output, fmt=fmt, k=k, block_size=block_size)
+
+
+def part_path(output, part, fmt):
+    return os.path.join(output, f'part-{part:05d}.{fmt}')
+
+
+def export_part(part, start, stop):
+    """Score rows [start, stop) and write them as one part file; returns the row count"""
+    w = _worker
+    rows = np.arange(start, stop)
+    table = w['table']
+    if table is not None:
+        indices, scores = table.indices[start:stop, :w['k']], table.scores[start:stop, :w['k']]
+    else:
+        indices, scores = compute_top_k_for_rows(w['matrix'], rows, w['k'], block_size=w['block_size'],
+                                                 matrix_t=w['matrix_t'])
+
+    path = part_path(w['output'], part, w['fmt'])
+    tmp_path = f'{path}.tmp-{os.getpid()}'
+    if w['fmt'] == 'npz':
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, positions=rows.astype(np.int32), neighbors=np.asarray(indices, dtype=np.int32),
+                     scores=np.asarray(scores, dtype=np.float32))
+    else:
+        ids = w['ids']
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for position, neighbors, neighbor_scores in zip(rows, indices, scores):
+                f.write(json.dumps({
+                    'id': ids[position],
+                    'neighbors': [ids[i] for i in neighbors],
+                    'scores': [round(float(s), 4) for s in neighbor_scores]
+                }) + '\n')
+    os.replace(tmp_path, path)
+    return stop - start
+
+
+def read_manifest(output):
+    try:
+        with open(os.path.join(output, 'manifest.json'), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_manifest(output, manifest):
+    tmp_path = os.path.join(output, 'manifest.json.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(output, 'manifest.json'))
+
+
+def export(recommender, output, k=20, fmt='jsonl', part_rows=10000, block_size=1024, jobs=1, resume=False):
+    """Export top-k neighbors of every catalog row into output/; returns the manifest"""
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of {FORMATS}, got {fmt!r}")
+    matrix = recommender.tfidf_rows()
+    if matrix is None:
+        raise RuntimeError("Recommender has no TF-IDF matrix to export")
+
+    n_rows = matrix.shape[0]
+    k = max(0, min(k, n_rows - 1))
+    n_parts = -(-n_rows // part_rows)
+    manifest = {
+        'catalog': recommender.catalog_key(),
+        'rows': n_rows,
+        'k': k,
+        'format': fmt,
+        'part_rows': part_rows,
+        'parts': n_parts,
+        'complete': False
+    }
+
+    os.makedirs(output, exist_ok=True)
+    previous = read_manifest(output)
+    if previous is not None:
+        if not resume:
+            raise RuntimeError(f"{output} already holds an export; pass --resume to continue it")
+        if any(previous.get(key) != manifest[key] for key in JOB_KEYS):
+            raise RuntimeError(f"{output} holds an export of a different catalog or settings")
+    write_manifest(output, manifest)
+
+    ids = recommender.ids().tolist()
+    if fmt == 'npz':
+        with open(os.path.join(output, 'ids.txt'), 'w', encoding='utf-8') as f:
+            f.write('\n'.join(ids) + '\n')
+
+    # A precomputed neighbor table for this catalog answers parts without any scoring
+    try:
+        table = NeighborIndex.load(recommender.neighbor_index_path, recommender._source_fingerprint(), mmap_mode='r')
+    except Exception:
+        table = None
+    if table is not None and (table.k < k or len(table) != n_rows):
+        table = None
+
+    todo = [(part, part * part_rows, min((part + 1) * part_rows, n_rows)) for part in range(n_parts)
+            if not os.path.exists(part_path(output, part, fmt))]
+    done_rows = n_rows - sum(stop - start for _, start, stop in todo)
+    if done_rows:
+        logger.info(f"🔄 Resuming: {n_parts - len(todo)}/{n_parts} parts already written")
+    logger.info(f"🔄 Exporting top-{k} neighbors for {n_rows} products in {len(todo)} parts"
+          + (" from the precomputed table" if table is not None else f" with {jobs} process(es)"))
+
+    started = time.perf_counter()
+    exported = 0
+
+    def report(rows):
+        nonlocal exported
+        exported += rows
+        elapsed = time.perf_counter() - started
+        rate = exported / elapsed if elapsed > 0 else 0
+        remaining = n_rows - done_rows - exported
+        eta = remaining / rate if rate > 0 else 0
+        logger.info(f"   {done_rows + exported}/{n_rows} rows ({100 * (done_rows + exported) / n_rows:.1f}%), "
+              f"{rate:.0f} rows/s, ETA {eta:.0f}s")
+
+    # The term-major copy only covers the fitted rows, so it is used only while nothing is appended
+    matrix_t = recommender._tfidf_by_term if recommender._tfidf_delta is None else None
+    init_args = (matrix, matrix_t if table is None else None, ids, table, output, fmt, k, block_size)
+    if jobs > 1 and table is None and len(todo) > 1:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=init_args) as executor:
+            futures = [executor.submit(export_part, *task) for task in todo]
+            for future in as_completed(futures):
+                report(future.result())
+    else:
+        _init_worker(*init_args)
+        for task in todo:
+            report(export_part(*task))
+
+    manifest['complete'] = True
+    manifest['seconds'] = round(time.perf_counter() - started, 2)
+    write_manifest(output, manifest)
+    logger.info(f"✅ Exported {n_rows} products to {output} in {manifest['seconds']}s")
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--data-path', default=os.environ.get('DATA_PATH', 'data/clean_fashion_data.json'))
+    parser.add_argument('--max-products', type=int, default=int(os.environ.get('MAX_PRODUCTS', 0)),
+                        help='rows loaded from the dataset (0 = no limit)')
+    parser.add_argument('--output', required=True, help='output directory')
+    parser.add_argument('-k', type=int, default=20, help='neighbors per product')
+    parser.add_argument('--format', choices=FORMATS, default='jsonl')
+    parser.add_argument('--part-rows', type=int, default=10000, help='products per output file')
+    parser.add_argument('--block-size', type=int, default=1024, help='rows scored per matrix product')
+    parser.add_argument('--jobs', type=int, default=1, help='worker processes')
+    parser.add_argument('--resume', action='store_true', help='continue an interrupted export')
+    args = parser.parse_args()
+    logging.basicConfig(level=os.environ.get('LOG_LEVEL', 'INFO').upper(), format='%(message)s')
+
+    recommender = AmazonFashionRecommender(
+        data_path=args.data_path,
+        max_products=args.max_products or None,
+        n_neighbors=0,
+        storage=os.environ.get('RECOMMENDER_STORAGE', 'memory')
+    )
+    if recommender.df is None or len(recommender.df) == 0:
+        raise SystemExit("❌ No products loaded")
+
+    export(recommender, args.output, k=args.k, fmt=args.format, part_rows=args.part_rows,
+           block_size=args.block_size, jobs=args.jobs, resume=args.resume)
+
+
+if __name__ == '__main__':
+    main()
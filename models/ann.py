@@ -0,0 +1,217 @@
+import time
+import numpy as np
+from models.neighbors import select_top_k
+
+
+def _random_projection(n_features, n_components, seed):
+    rng = np.random.default_rng(seed)
+    return rng.standard_normal((n_features, n_components)).astype(np.float32)
+
+
+def _project(matrix, projection, block_size=65536):
+    """Dense (n_rows, n_components) projection of a sparse matrix, computed in row blocks"""
+    out = np.empty((matrix.shape[0], projection.shape[1]), dtype=np.float32)
+    for start in range(0, matrix.shape[0], block_size):
+        out[start:start + block_size] = matrix[start:start + block_size] @ projection
+    return out
+
+
+def _normalize_rows(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class ANNIndex:
+    """Base class: candidate generation by the subclass, exact cosine re-ranking here"""
+
+    name = 'ann'
+
+    def __init__(self, seed=0):
+        self.seed = seed
+        self.matrix = None
+        self.last_candidate_count = 0
+
+    def fit(self, matrix):
+        raise NotImplementedError
+
+    def candidates(self, vector):
+        """Row positions worth scoring exactly for a 1 x n_features sparse query"""
+        raise NotImplementedError
+
+    def query_vector(self, vector, n, exclude=None):
+        candidates = self.candidates(vector)
+        if exclude is not None:
+            candidates = candidates[candidates != exclude]
+        self.last_candidate_count = len(candidates)
+        if len(candidates) == 0:
+            return candidates
+
+        # TF-IDF rows are L2-normalized, so the dot product is the cosine similarity
+        scores = (self.matrix[candidates] @ vector.T).toarray().ravel()
+        return candidates[select_top_k(scores, n)[0]]
+
+    def query(self, position, n):
+        """Approximate top-n neighbors of an indexed row, excluding the row itself"""
+        return self.query_vector(self.matrix[position], n, exclude=position)
+
+
+class RandomProjectionLSH(ANNIndex):
+    """Sign random-projection LSH (SimHash) over several independent hash tables.
+
+    More tables raise recall, more bits per table shrink buckets and cut latency.
+    By default n_bits is sized so an average bucket holds about bucket_size rows.
+    """
+
+    name = 'lsh'
+
+    def __init__(self, n_tables=16, n_bits=None, bucket_size=200, seed=0):
+        super().__init__(seed)
+        self.n_tables = n_tables
+        self.n_bits = n_bits
+        self.bucket_size = bucket_size
+        self.projection = None
+        self.sorted_codes = None
+        self.orders = None
+
+    def _codes(self, projected):
+        bits = (projected > 0).reshape(len(projected), self.n_tables, self.n_bits)
+        weights = np.left_shift(np.int64(1), np.arange(self.n_bits, dtype=np.int64))
+        return (bits * weights).sum(axis=2)
+
+    def fit(self, matrix):
+        self.matrix = matrix.tocsr()
+        if self.n_bits is None:
+            self.n_bits = int(np.clip(np.round(np.log2(matrix.shape[0] / self.bucket_size)), 1, 30))
+        self.projection = _random_projection(matrix.shape[1], self.n_tables * self.n_bits, self.seed)
+        codes = self._codes(_project(self.matrix, self.projection))
+
+        # One sorted code array per table; a bucket is a searchsorted range
+        self.orders = np.argsort(codes, axis=0, kind='stable').astype(np.int32)
+        self.sorted_codes = np.take_along_axis(codes, self.orders, axis=0)
+        return self
+
+    def candidates(self, vector):
+        codes = self._codes(np.asarray(vector @ self.projection, dtype=np.float32))[0]
+        buckets = []
+        for table, code in enumerate(codes):
+            column = self.sorted_codes[:, table]
+            lo, hi = np.searchsorted(column, code, side='left'), np.searchsorted(column, code, side='right')
+            buckets.append(self.orders[lo:hi, table])
+        return np.unique(np.concatenate(buckets)) if buckets else np.empty(0, dtype=np.int32)
+
+
+class IVFIndex(ANNIndex):
+    """Inverted-file index: spherical k-means over randomly projected TF-IDF rows.
+
+    Queries scan the n_probe closest lists; raising n_probe trades latency for recall.
+    """
+
+    name = 'ivf'
+
+    def __init__(self, n_lists=None, n_probe=16, n_components=128, n_iter=10,
+                 train_size=50000, seed=0):
+        super().__init__(seed)
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.n_components = n_components
+        self.n_iter = n_iter
+        self.train_size = train_size
+        self.projection = None
+        self.centroids = None
+        self.list_order = None
+        self.list_offsets = None
+
+    def _reduce(self, matrix):
+        return _normalize_rows(_project(matrix, self.projection))
+
+    def _assign(self, vectors, block_size=65536):
+        labels = np.empty(len(vectors), dtype=np.int32)
+        for start in range(0, len(vectors), block_size):
+            labels[start:start + block_size] = np.argmax(vectors[start:start + block_size] @ self.centroids.T, axis=1)
+        return labels
+
+    def fit(self, matrix):
+        self.matrix = matrix.tocsr()
+        n_rows = matrix.shape[0]
+        n_lists = self.n_lists or max(1, int(np.sqrt(n_rows)))
+        n_lists = min(n_lists, n_rows)
+
+        self.projection = _random_projection(matrix.shape[1], self.n_components, self.seed)
+        reduced = self._reduce(self.matrix)
+
+        # Train centroids on a sample; assignment of the full catalog is one pass
+        rng = np.random.default_rng(self.seed)
+        train = reduced[rng.choice(n_rows, size=min(self.train_size, n_rows), replace=False)]
+        self.centroids = train[rng.choice(len(train), size=n_lists, replace=False)].copy()
+        for _ in range(self.n_iter):
+            labels = np.argmax(train @ self.centroids.T, axis=1)
+            sums = np.zeros_like(self.centroids)
+            np.add.at(sums, labels, train)
+            empty = np.bincount(labels, minlength=n_lists) == 0
+            sums[empty] = self.centroids[empty]
+            self.centroids = _normalize_rows(sums)
+
+        labels = self._assign(reduced)
+        self.list_order = np.argsort(labels, kind='stable').astype(np.int32)
+        self.list_offsets = np.concatenate(([0], np.cumsum(np.bincount(labels, minlength=n_lists))))
+        return self
+
+    def candidates(self, vector):
+        reduced = _normalize_rows(np.asarray(vector @ self.projection, dtype=np.float32))[0]
+        probes = select_top_k(self.centroids @ reduced, self.n_probe)[0]
+        return np.concatenate([
+            self.list_order[self.list_offsets[p]:self.list_offsets[p + 1]] for p in probes
+        ])
+
+
+ANN_BACKENDS = {
+    RandomProjectionLSH.name: RandomProjectionLSH,
+    IVFIndex.name: IVFIndex,
+}
+
+
+def create_ann_index(backend, **params):
+    """Instantiate an ANN backend by name ('lsh' or 'ivf')"""
+    if isinstance(backend, ANNIndex):
+        return backend
+    if backend not in ANN_BACKENDS:
+        raise ValueError(f"Unknown ANN backend '{backend}', expected one of {sorted(ANN_BACKENDS)}")
+    return ANN_BACKENDS[backend](**params)
+
+
+def recall_report(index, matrix, k=10, sample_size=200, seed=0):
+    """Compare an ANN index against brute-force cosine on a random sample of rows"""
+    n_rows = matrix.shape[0]
+    rng = np.random.default_rng(seed)
+    sample = rng.choice(n_rows, size=min(sample_size, n_rows), replace=False)
+    matrix_t = matrix.T.tocsr()
+
+    hits, total, candidates = 0, 0, 0
+    ann_seconds, exact_seconds = 0.0, 0.0
+    for position in sample:
+        started = time.perf_counter()
+        approx = index.query(position, k)
+        ann_seconds += time.perf_counter() - started
+        candidates += index.last_candidate_count
+
+        started = time.perf_counter()
+        similarities = (matrix[position] @ matrix_t).toarray().ravel()
+        similarities[position] = -np.inf
+        exact = select_top_k(similarities, k)[0]
+        exact_seconds += time.perf_counter() - started
+
+        hits += len(np.intersect1d(approx, exact))
+        total += len(exact)
+
+    n = max(len(sample), 1)
+    return {
+        'backend': index.name,
+        'k': k,
+        'queries': len(sample),
+        'recall_at_k': round(hits / total, 4) if total else 0.0,
+        'ann_ms': round(1000 * ann_seconds / n, 3),
+        'brute_force_ms': round(1000 * exact_seconds / n, 3),
+        'mean_candidates': round(candidates / n, 1),
+        'catalog_size': n_rows,
+    }
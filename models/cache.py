@@ -0,0 +1,208 @@
+import logging
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Thread-safe in-process cache with a size bound (LRU eviction) and per-entry TTL"""
+
+    def __init__(self, maxsize=1024, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, expires = entry
+            if expires is not None and expires < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (value, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations
+        }
+
+
+class LocalBackend:
+    """In-process stand-in for a shared backend: same bytes-in/bytes-out, TTL semantics as Redis"""
+
+    def __init__(self):
+        self._store = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._store.get(key)
+            if entry is None:
+                return None
+            data, expires = entry
+            if expires is not None and expires < time.monotonic():
+                del self._store[key]
+                return None
+            return data
+
+    def set(self, key, data, ttl=None):
+        with self._lock:
+            self._store[key] = (data, time.monotonic() + ttl if ttl else None)
+
+    def clear(self):
+        with self._lock:
+            self._store.clear()
+
+
+class RedisBackend:
+    """Shared backend on Redis, so all worker processes share cached entries"""
+
+    def __init__(self, url):
+        if redis is None:
+            raise ImportError("The 'redis' package is required for a redis:// cache URL")
+        self.client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        return self.client.get(key)
+
+    def set(self, key, data, ttl=None):
+        self.client.set(key, data, ex=int(ttl) if ttl else None)
+
+    def clear(self):
+        # Entries are versioned and expire on their own; never flush a shared database
+        pass
+
+
+def create_shared_backend(url):
+    """Shared backend for a cache URL: 'redis://...', 'local' or None/'' for none"""
+    if not url:
+        return None
+    if url == 'local':
+        return LocalBackend()
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisBackend(url)
+    raise ValueError(f"Unsupported cache URL: {url!r}")
+
+
+class TieredCache:
+    """In-process LRU in front of an optional shared backend.
+
+    Keys are namespaced by a version (the catalog snapshot key), so a
+    reloaded catalog never serves entries computed from the previous one.
+    Entries of old versions are not cleared: requests on the old and new
+    catalog overlap during a swap, and LRU eviction and the TTL age them out.
+    """
+
+    def __init__(self, local=None, shared=None, namespace='stylesense'):
+        self.local = local if local is not None else LRUCache()
+        self.shared = shared
+        self.namespace = namespace
+        self.version = None
+        self.shared_hits = self.shared_misses = self.shared_errors = 0
+
+    def _key(self, key, version):
+        # Last version seen, for stats only
+        self.version = version
+        return f"{self.namespace}:{version}:{key}"
+
+    def get(self, key, version=None):
+        full_key = self._key(key, version)
+        value = self.local.get(full_key, _MISSING)
+        if value is not _MISSING or self.shared is None:
+            return None if value is _MISSING else value
+
+        try:
+            data = self.shared.get(full_key)
+        except Exception as e:
+            self.shared_errors += 1
+            logger.warning(f"⚠️ Shared cache read failed: {e}")
+            return None
+        if data is None:
+            self.shared_misses += 1
+            return None
+        self.shared_hits += 1
+        value = pickle.loads(data)
+        self.local.set(full_key, value)
+        return value
+
+    def set(self, key, value, version=None, ttl=None):
+        full_key = self._key(key, version)
+        self.local.set(full_key, value, ttl)
+        if self.shared is not None:
+            try:
+                self.shared.set(full_key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL),
+                                self.local.ttl if ttl is None else ttl)
+            except Exception as e:
+                self.shared_errors += 1
+                logger.warning(f"⚠️ Shared cache write failed: {e}")
+
+    def get_or_set(self, key, compute, version=None, ttl=None):
+        """Cached value for key, computing and storing it on a miss"""
+        value = self.get(key, version)
+        if value is None:
+            value = compute()
+            if value is not None:
+                self.set(key, value, version, ttl)
+        return value
+
+    def clear(self):
+        self.local.clear()
+        if self.shared is not None:
+            self.shared.clear()
+
+    def stats(self):
+        stats = {'version': self.version, 'local': self.local.stats()}
+        if self.shared is not None:
+            lookups = self.shared_hits + self.shared_misses
+            stats['shared'] = {
+                'backend': type(self.shared).__name__,
+                'hits': self.shared_hits,
+                'misses': self.shared_misses,
+                'hit_rate': round(self.shared_hits / lookups, 4) if lookups else 0.0,
+                'errors': self.shared_errors
+            }
+        return stats
+
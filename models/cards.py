@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+
+# Fields every product list, recommendation and search result needs
+CARD_FIELDS = ('id', 'name', 'brand', 'price', 'rating', 'image_url', 'main_category')
+
+# Internal or bulky columns left out of the product detail dict
+DETAIL_EXCLUDED = ('combined_features', 'categories', 'related')
+
+
+def _missing_to_none(values):
+    return [None if isinstance(v, float) and v != v else v for v in values]
+
+
+class CardStore:
+    """Column arrays for the product-card projection, extracted once per build.
+
+    take(positions) builds one small dict per requested row from arrays that
+    share the DataFrame's string objects (or the memory-mapped string
+    columns), instead of materializing full rows with to_dict('records').
+    Rows appended since the catalog was fitted live in their own `appended`
+    store, numbered after this one's rows.
+    """
+
+    def __init__(self, columns, appended=None):
+        self.columns = columns
+        self.appended = appended
+        column = next(iter(columns.values()), None)
+        self.size = 0 if column is None else len(column[1] if isinstance(column, tuple) else column)
+
+    @classmethod
+    def build(cls, df, string_columns=None, fields=CARD_FIELDS):
+        string_columns = string_columns or {}
+        columns = {}
+        for field in fields:
+            if field in string_columns:
+                columns[field] = string_columns[field]
+            elif field in df.columns:
+                column = df[field]
+                if isinstance(column.dtype, pd.CategoricalDtype):
+                    # Decode through the categories instead of a per-row object array
+                    categories = np.asarray(column.cat.categories, dtype=object)
+                    columns[field] = (np.append(categories, None), column.cat.codes.to_numpy())
+                elif pd.api.types.is_numeric_dtype(column.dtype):
+                    columns[field] = column.to_numpy(dtype=np.float64)
+                else:
+                    columns[field] = column.to_numpy(dtype=object)
+        return cls(columns)
+
+    def with_appended(self, appended):
+        """These rows followed by the rows of another store"""
+        return CardStore(self.columns, appended)
+
+    def updated(self, positions, rows):
+        """A new store with the fields in rows (a frame aligned with positions) replaced.
+
+        Only for this store's own rows and for fields held as plain arrays;
+        edited columns are copied, the rest are shared.
+        """
+        columns = dict(self.columns)
+        for field, values in CardStore.build(rows, fields=tuple(self.columns)).columns.items():
+            column = columns[field].copy()
+            column[positions] = values
+            columns[field] = column
+        return CardStore(columns, self.appended)
+
+    def take(self, positions):
+        """Card dicts for a sequence of row positions"""
+        positions = np.asarray(positions, dtype=np.int64)
+        if self.appended is not None and len(positions) and positions.max() >= self.size:
+            later = positions >= self.size
+            cards = [None] * len(positions)
+            for i, card in zip(np.flatnonzero(~later), self._take(positions[~later])):
+                cards[i] = card
+            for i, card in zip(np.flatnonzero(later), self.appended.take(positions[later] - self.size)):
+                cards[i] = card
+            return cards
+        return self._take(positions)
+
+    def _take(self, positions):
+        values = []
+        for column in self.columns.values():
+            if isinstance(column, tuple):
+                categories, codes = column
+                values.append(categories[codes[positions]].tolist())
+            elif isinstance(column, np.ndarray):
+                values.append(_missing_to_none(column[positions].tolist()))
+            else:
+                values.append(column.take(positions))
+        fields = tuple(self.columns)
+        return [dict(zip(fields, row)) for row in zip(*values)]
@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+# Edge weight contributed by each Amazon "related" list; an edge listed
+# under several relations (or from both ends) sums their weights
+RELATION_WEIGHTS = {
+    'bought_together': 1.0,
+    'also_bought': 0.7,
+    'also_viewed': 0.4,
+}
+
+
+class CoViewGraph:
+    """Item-item co-view / co-purchase graph as a symmetric CSR adjacency.
+
+    Row i holds the catalog rows related to row i and their summed relation
+    weights (float32 data, int32 indices). Related ids that are not in the
+    catalog are dropped. The matrix may have fewer rows than the catalog
+    when products were appended after the build; those rows have no edges.
+    """
+
+    def __init__(self, matrix):
+        self.matrix = matrix
+
+    @classmethod
+    def build(cls, ids, related, relation_weights=RELATION_WEIGHTS):
+        """Graph over catalog rows from the product ids and their raw 'related' dicts"""
+        n = len(ids)
+        relations = list(relation_weights.items())
+        # One (row, relation, count) entry per list; edges are expanded with np.repeat
+        rows, kinds, counts, targets = [], [], [], []
+        for position, lists in enumerate(related):
+            if not isinstance(lists, dict):
+                continue
+            for kind, (relation, _) in enumerate(relations):
+                linked = lists.get(relation)
+                if linked:
+                    rows.append(position)
+                    kinds.append(kind)
+                    counts.append(len(linked))
+                    targets.extend(linked)
+
+        if not targets:
+            return cls(sp.csr_matrix((n, n), dtype=np.float32))
+
+        # First row wins for duplicate ids, like get_position
+        index = pd.Index(np.asarray(ids, dtype=object))
+        first = ~index.duplicated()
+        lookup, first_positions = index[first], np.flatnonzero(first)
+        found = lookup.get_indexer(pd.Index(targets, dtype=object))
+        keep = found >= 0
+
+        counts = np.asarray(counts, dtype=np.int64)
+        sources = np.repeat(np.asarray(rows, dtype=np.int32), counts)[keep]
+        kind_weights = np.array([weight for _, weight in relations], dtype=np.float32)
+        weights = np.repeat(kind_weights[kinds], counts)[keep]
+        targets = first_positions[found[keep]]
+        loops = sources == targets
+        if loops.any():
+            sources, targets, weights = sources[~loops], targets[~loops], weights[~loops]
+        directed = sp.csr_matrix((weights, (sources, targets)), shape=(n, n), dtype=np.float32)
+        return cls(cls._compact((directed + directed.T).tocsr()))
+
+    @staticmethod
+    def _compact(matrix):
+        matrix.sort_indices()
+        matrix.indices = matrix.indices.astype(np.int32, copy=False)
+        matrix.data = matrix.data.astype(np.float32, copy=False)
+        return matrix
+
+    @property
+    def n_edges(self):
+        """Undirected edges (each is stored once per endpoint)"""
+        return self.matrix.nnz // 2
+
+    @property
+    def nbytes(self):
+        return self.matrix.data.nbytes + self.matrix.indices.nbytes + self.matrix.indptr.nbytes
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    def neighbors(self, position):
+        """(positions, weights) linked to a row, weights scaled so the strongest is 1"""
+        if position < 0 or position >= len(self):
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+        start, end = self.matrix.indptr[position], self.matrix.indptr[position + 1]
+        positions, weights = self.matrix.indices[start:end], self.matrix.data[start:end]
+        if len(weights):
+            weights = weights / weights.max()
+        return positions, weights
+
+    def take(self, positions, n_rows):
+        """The graph restricted to the given rows, renumbered 0..len(positions)-1.
+
+        n_rows is the current catalog size, so rows appended after the
+        build (beyond the matrix) map to edgeless rows.
+        """
+        matrix = self.matrix
+        if n_rows > matrix.shape[0]:
+            matrix = matrix.copy()
+            matrix.resize((n_rows, n_rows))
+        return CoViewGraph(self._compact(matrix[positions][:, positions].tocsr()))
+
+    def stats(self):
+        degrees = np.diff(self.matrix.indptr)
+        return {
+            'products': len(self),
+            'edges': self.n_edges,
+            'linked_products': int((degrees > 0).sum()),
+            'max_degree': int(degrees.max()) if len(degrees) else 0,
+            'bytes': self.nbytes,
+        }
@@ -0,0 +1,193 @@
+import time
+import numpy as np
+from sklearn.decomposition import TruncatedSVD
+from models.neighbors import select_top_k
+
+EMBEDDING_DTYPES = ('float32', 'float16', 'int8')
+
+
+def _normalize_rows(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class EmbeddingIndex:
+    """L2-normalized LSA embeddings of TF-IDF rows, scored with dense dot products.
+
+    TruncatedSVD projects the sparse matrix to `dims` components and rows are
+    re-normalized, so a dot product is the cosine similarity in the reduced
+    space. Vectors live in one C-contiguous array: float32, float16 (half the
+    memory) or int8 with a float32 scale per row (a quarter). Scoring upcasts
+    one block of stored rows at a time to float32 so the product runs in BLAS.
+    Rows added by extend() are kept in a separate `appended` index after the
+    fitted ones, so an update never copies the fitted vectors.
+    """
+
+    def __init__(self, svd, vectors, scales=None, appended=None):
+        self.svd = svd
+        self.vectors = vectors
+        self.scales = scales
+        self.appended = appended
+
+    @classmethod
+    def fit(cls, matrix, dims=128, dtype='float32', n_iter=5, seed=0):
+        if dtype not in EMBEDDING_DTYPES:
+            raise ValueError(f"dtype must be one of {EMBEDDING_DTYPES}, got {dtype!r}")
+        dims = max(1, min(dims, matrix.shape[1] - 1, matrix.shape[0] - 1))
+        svd = TruncatedSVD(n_components=dims, n_iter=n_iter, random_state=seed)
+        vectors = _normalize_rows(svd.fit_transform(matrix).astype(np.float32))
+        return cls(svd, *cls._encode(vectors, dtype))
+
+    @staticmethod
+    def _encode(vectors, dtype):
+        """(stored vectors, per-row scales or None) for float32 unit vectors"""
+        if dtype == 'int8':
+            scales = np.abs(vectors).max(axis=1) / 127
+            scales[scales == 0] = 1.0
+            quantized = np.rint(vectors / scales[:, None]).astype(np.int8)
+            return np.ascontiguousarray(quantized), scales.astype(np.float32)
+        return np.ascontiguousarray(vectors, dtype=dtype), None
+
+    @property
+    def dtype(self):
+        return self.vectors.dtype.name
+
+    @property
+    def dims(self):
+        return self.vectors.shape[1]
+
+    @property
+    def nbytes(self):
+        return self.vectors.nbytes + (self.scales.nbytes if self.scales is not None else 0) + \
+            (self.appended.nbytes if self.appended is not None else 0)
+
+    def __len__(self):
+        return self.vectors.shape[0] + (len(self.appended) if self.appended is not None else 0)
+
+    def transform(self, matrix):
+        """float32 unit embeddings for TF-IDF rows, in the fitted space"""
+        return _normalize_rows(self.svd.transform(matrix).astype(np.float32))
+
+    def decode(self, rows):
+        """float32 vectors for stored row positions"""
+        if self.appended is not None:
+            rows = np.arange(len(self))[rows] if isinstance(rows, slice) else np.asarray(rows, dtype=np.int64)
+            fitted = self.vectors.shape[0]
+            later = rows >= fitted
+            if later.any():
+                vectors = np.empty((len(rows), self.dims), dtype=np.float32)
+                vectors[~later] = self._decode(rows[~later])
+                vectors[later] = self.appended.decode(rows[later] - fitted)
+                return vectors
+        return self._decode(rows)
+
+    def _decode(self, rows):
+        vectors = self.vectors[rows].astype(np.float32)
+        if self.scales is not None:
+            vectors *= self.scales[rows, None]
+        return vectors
+
+    def extend(self, matrix):
+        """A new index with TF-IDF rows appended (the SVD basis is not refitted)"""
+        vectors, scales = self._encode(self.transform(matrix), self.dtype)
+        if self.appended is not None:
+            vectors = np.ascontiguousarray(np.concatenate((self.appended.vectors, vectors)))
+            scales = None if scales is None else np.concatenate((self.appended.scales, scales))
+        return EmbeddingIndex(self.svd, self.vectors, self.scales, EmbeddingIndex(self.svd, vectors, scales))
+
+    def with_dtype(self, dtype):
+        """The same embeddings re-encoded with another storage dtype"""
+        return EmbeddingIndex(self.svd, *self._encode(self.decode(slice(None)), dtype))
+
+    def scores(self, queries, block_rows=65536):
+        """Cosine scores of float32 query vectors against every stored row, shape (n_queries, n_rows)"""
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        if self.appended is not None:
+            fitted = EmbeddingIndex(self.svd, self.vectors, self.scales)
+            return np.hstack((fitted.scores(queries, block_rows), self.appended.scores(queries, block_rows)))
+        n_rows = len(self)
+        if self.vectors.dtype == np.float32 and self.scales is None:
+            return queries @ self.vectors.T
+
+        scores = np.empty((len(queries), n_rows), dtype=np.float32)
+        for start in range(0, n_rows, block_rows):
+            block = self.vectors[start:start + block_rows].astype(np.float32)
+            scores[:, start:start + len(block)] = queries @ block.T
+        if self.scales is not None:
+            scores *= self.scales
+        return scores
+
+    def top_k_for_rows(self, rows, k=20, block_size=1024, excluded=None):
+        """Top-k neighbors (indices, scores) of stored rows, excluding each row itself"""
+        rows = np.asarray(rows, dtype=np.int64)
+        k = max(0, min(k, len(self) - 1))
+        indices = np.zeros((len(rows), k), dtype=np.int32)
+        scores = np.zeros((len(rows), k), dtype=np.float32)
+        if k == 0 or len(rows) == 0:
+            return indices, scores
+
+        for start in range(0, len(rows), block_size):
+            block_rows = rows[start:start + block_size]
+            sims = self.scores(self.decode(block_rows))
+            sims[np.arange(len(block_rows)), block_rows] = -np.inf
+            if excluded is not None:
+                sims[:, excluded] = -np.inf
+            top = select_top_k(sims, k)
+            indices[start:start + len(block_rows)] = top
+            scores[start:start + len(block_rows)] = np.take_along_axis(sims, top, axis=1)
+        return indices, scores
+
+    def query(self, position, n, excluded=None):
+        """Positions of the n rows most similar to a stored row"""
+        return self.top_k_for_rows([position], n, excluded=excluded)[0][0]
+
+
+def quality_report(index, matrix, k=10, sample_size=200, seed=0):
+    """Compare embedding neighbors with exact TF-IDF cosine neighbors on a sample of rows.
+
+    recall_at_k is the overlap of the two top-k lists; score_ratio is the
+    mean TF-IDF cosine of the embedding's neighbors over that of the exact
+    neighbors (1.0 = neighbors as similar as the true ones, even if different).
+    """
+    n_rows = matrix.shape[0]
+    rng = np.random.default_rng(seed)
+    sample = rng.choice(n_rows, size=min(sample_size, n_rows), replace=False)
+    matrix_t = matrix.T.tocsr()
+
+    hits, total = 0, 0
+    exact_scores, approx_scores = 0.0, 0.0
+    embedding_seconds, tfidf_seconds = 0.0, 0.0
+    for position in sample:
+        started = time.perf_counter()
+        approx = index.query(position, k)
+        embedding_seconds += time.perf_counter() - started
+
+        started = time.perf_counter()
+        similarities = (matrix[position] @ matrix_t).toarray().ravel()
+        similarities[position] = -np.inf
+        exact = select_top_k(similarities, k)[0]
+        tfidf_seconds += time.perf_counter() - started
+
+        hits += len(np.intersect1d(approx, exact))
+        total += len(exact)
+        exact_scores += similarities[exact].sum()
+        approx_scores += similarities[approx].sum()
+
+    n = max(len(sample), 1)
+    tfidf_bytes = sum(a.nbytes for a in (matrix.data, matrix.indices, matrix.indptr))
+    return {
+        'dims': int(index.dims),
+        'dtype': index.dtype,
+        'k': k,
+        'queries': len(sample),
+        'recall_at_k': round(float(hits / total), 4) if total else 0.0,
+        'score_ratio': round(float(approx_scores / exact_scores), 4) if exact_scores else 0.0,
+        'explained_variance': round(float(index.svd.explained_variance_ratio_.sum()), 4),
+        'embedding_ms': round(float(1000 * embedding_seconds / n), 3),
+        'tfidf_ms': round(float(1000 * tfidf_seconds / n), 3),
+        'embedding_bytes': int(index.nbytes),
+        # Row-major matrix plus the term-major copy used for queries
+        'tfidf_bytes': int(2 * tfidf_bytes),
+        'catalog_size': int(n_rows),
+    }
@@ -0,0 +1,115 @@
+from collections import Counter
+
+TOP_CATEGORIES = 15
+TOP_BRANDS = 20
+
+
+class FacetSummary:
+    """Navigation facets and catalog stats, aggregated once per catalog build.
+
+    Instances are read-only (attributes can't be reassigned and lists are
+    tuples); callers share the same entries, so treat them as constants.
+    Build with FacetSummary.build, then derive the summary of an updated
+    catalog with updated(), which only aggregates the added and removed rows.
+    """
+
+    __slots__ = ('categories', 'brands', 'stats', '_totals')
+
+    def __init__(self, categories=(), brands=(), stats=None, totals=None):
+        object.__setattr__(self, 'categories', tuple(categories))
+        object.__setattr__(self, 'brands', tuple(brands))
+        object.__setattr__(self, 'stats', dict(stats or {'total_products': 0}))
+        object.__setattr__(self, '_totals', totals)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('FacetSummary is immutable')
+
+    @staticmethod
+    def _aggregate(df):
+        """Value counts, sums and price extremes of a frame's rows"""
+        prices = df['price'][df['price'] > 0]
+        return {
+            # Most frequent first, like value_counts, so ties keep its order
+            'categories': Counter({k: int(v) for k, v in df['main_category'].value_counts().items() if v > 0}),
+            'brands': Counter({k: int(v) for k, v in df['brand'].value_counts().items() if v > 0}),
+            'products': len(df),
+            'rated': int(df['rating'].count()),
+            'rating_sum': float(df['rating'].sum()),
+            'priced': len(prices),
+            'price_sum': float(prices.sum()),
+            'price_min': float(prices.min()) if len(prices) else None,
+            'price_max': float(prices.max()) if len(prices) else None,
+        }
+
+    @classmethod
+    def build(cls, df):
+        if df is None or len(df) == 0:
+            return cls()
+        return cls._summarize(cls._aggregate(df))
+
+    def updated(self, added=None, removed=None, prices=None):
+        """The summary after adding and removing rows (frames of catalog columns).
+
+        prices() returns every live row's price; it's only called when a
+        removed row held the lowest or highest price.
+        """
+        if self._totals is None:
+            return FacetSummary.build(added)
+        totals = dict(self._totals)
+        totals['categories'], totals['brands'] = Counter(totals['categories']), Counter(totals['brands'])
+        for frame, sign in ((added, 1), (removed, -1)):
+            if frame is None or len(frame) == 0:
+                continue
+            rows = self._aggregate(frame)
+            for name in ('categories', 'brands'):
+                if sign > 0:
+                    totals[name].update(rows[name])
+                else:
+                    totals[name].subtract(rows[name])
+            for name in ('products', 'rated', 'rating_sum', 'priced', 'price_sum'):
+                totals[name] += sign * rows[name]
+            if rows['priced'] == 0:
+                continue
+            if sign > 0:
+                totals['price_min'] = min(rows['price_min'], totals['price_min'] or rows['price_min'])
+                totals['price_max'] = max(rows['price_max'], totals['price_max'] or rows['price_max'])
+            elif rows['price_min'] <= totals['price_min'] or rows['price_max'] >= totals['price_max']:
+                live = prices()
+                live = live[live > 0]
+                totals['price_min'] = float(live.min()) if len(live) else None
+                totals['price_max'] = float(live.max()) if len(live) else None
+        for name in ('categories', 'brands'):
+            totals[name] = Counter({k: v for k, v in totals[name].items() if v > 0})
+        return FacetSummary._summarize(totals)
+
+    @classmethod
+    def _summarize(cls, totals):
+        if totals['products'] <= 0:
+            return cls(totals=totals)
+
+        categories = sorted(totals['categories'].items(), key=lambda item: -item[1])[:TOP_CATEGORIES]
+        brands = sorted(totals['brands'].items(), key=lambda item: -item[1])[:TOP_BRANDS]
+        stats = {
+            'total_products': totals['products'],
+            'total_brands': len(totals['brands']),
+            'total_categories': len(totals['categories']),
+            'avg_rating': round(totals['rating_sum'] / totals['rated'], 1) if totals['rated'] else float('nan')
+        }
+
+        if totals['priced'] > 0:
+            stats.update({
+                'avg_price': round(totals['price_sum'] / totals['priced'], 2),
+                'price_range': {
+                    'min': round(totals['price_min'], 2),
+                    'max': round(totals['price_max'], 2)
+                }
+            })
+        else:
+            stats.update({'avg_price': 0, 'price_range': {'min': 0, 'max': 0}})
+
+        return cls(
+            categories=[{'name': name, 'count': count} for name, count in categories],
+            brands=[{'name': name, 'count': count} for name, count in brands if name != 'Unknown'],
+            stats=stats,
+            totals=totals
+        )
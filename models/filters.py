@@ -0,0 +1,221 @@
+import copy
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from models.metrics import FILTER_LOOKUPS
+
+MATCH_MODES = ('exact', 'prefix', 'contains')
+
+
+class FieldIndex:
+    """Row positions per distinct value of a column, for filtering without scans.
+
+    Postings are stored CSR-style: positions[offsets[i]:offsets[i + 1]] are
+    the sorted rows holding values[i], and codes[row] is the value index of
+    each row (-1 if missing). Matching is case-insensitive; missing values are
+    never matched.
+
+    extend() and drop() return updated copies for incremental catalog
+    updates: rows appended since the build keep their postings per value in
+    `appended`, and dropped rows only lose their code, so lookups check codes
+    once any row was dropped. The built arrays are shared, never modified.
+    """
+
+    def __init__(self, values, offsets, positions, codes, cache_size=1024):
+        self.values = values
+        self.codes = codes
+        self.keys = [str(v).lower() for v in values]
+        self.offsets = offsets
+        self.positions = positions
+        self.appended = {}
+        self.dropped = False
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        # Lookups run on request threads; move_to_end / popitem must not interleave
+        self._cache_lock = threading.Lock()
+        self._by_value = None
+
+        self._by_key = {}
+        for i, key in enumerate(self.keys):
+            self._by_key.setdefault(key, []).append(i)
+
+    @classmethod
+    def build(cls, column, **params):
+        codes, values = pd.factorize(pd.Series(column).astype(object))
+        codes = np.asarray(codes, dtype=np.int32)
+        rows = np.flatnonzero(codes >= 0)
+        order = rows[np.argsort(codes[rows], kind='stable')].astype(np.int32)
+        counts = np.bincount(codes[rows], minlength=len(values))
+        offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+        return cls(list(values), offsets, order, codes, **params)
+
+    def __len__(self):
+        return len(self.values)
+
+    def _derived(self):
+        """Shallow copy with its own (empty) lookup cache, to apply an update to"""
+        derived = copy.copy(self)
+        derived._cache = OrderedDict()
+        derived._cache_lock = threading.Lock()
+        return derived
+
+    def extend(self, column):
+        """A new index with rows for column's values appended after the indexed rows.
+
+        New values get the next value indexes, so existing codes stay valid.
+        """
+        if self._by_value is None:
+            self._by_value = {value: i for i, value in enumerate(self.values)}
+        extended = self._derived()
+        start = len(self.codes)
+        codes = np.full(len(column), -1, dtype=np.int32)
+        rows = {}
+        for row, value in enumerate(pd.Series(column).astype(object).tolist()):
+            if pd.isna(value):
+                continue
+            i = extended._by_value.get(value)
+            if i is None:
+                if extended._by_value is self._by_value:
+                    extended.values, extended.keys = list(self.values), list(self.keys)
+                    extended._by_value, extended._by_key = dict(self._by_value), dict(self._by_key)
+                i = len(extended.values)
+                key = str(value).lower()
+                extended.values.append(value)
+                extended.keys.append(key)
+                extended._by_value[value] = i
+                extended._by_key[key] = extended._by_key.get(key, []) + [i]
+            codes[row] = i
+            rows.setdefault(i, []).append(start + row)
+
+        extended.codes = np.concatenate((self.codes, codes))
+        extended.appended = dict(self.appended)
+        for i, positions in rows.items():
+            positions = np.asarray(positions, dtype=np.int32)
+            if i in self.appended:
+                positions = np.concatenate((self.appended[i], positions))
+            extended.appended[i] = positions
+        return extended
+
+    def drop(self, positions):
+        """A new index that no longer matches the given rows"""
+        dropped = self._derived()
+        dropped.codes = self.codes.copy()
+        dropped.codes[positions] = -1
+        dropped.dropped = True
+        return dropped
+
+    def _postings(self, i):
+        """Sorted rows indexed under values[i]: built postings, then appended ones"""
+        if i + 1 < len(self.offsets):
+            built = self.positions[self.offsets[i]:self.offsets[i + 1]]
+        else:
+            built = self.positions[:0]
+        appended = self.appended.get(i)
+        return built if appended is None else np.concatenate((built, appended))
+
+    def _matching_values(self, key, match):
+        if match == 'exact':
+            return self._by_key.get(key, [])
+        if match == 'prefix':
+            return [i for i, k in enumerate(self.keys) if k.startswith(key)]
+        return [i for i, k in enumerate(self.keys) if key in k]
+
+    def lookup(self, query, match='contains'):
+        """Sorted int32 row positions whose value matches query"""
+        if match not in MATCH_MODES:
+            raise ValueError(f"match must be one of {MATCH_MODES}, got {match!r}")
+
+        cache_key = (str(query).lower(), match)
+        with self._cache_lock:
+            cached = self._cache.get(cache_key)
+            if cached is not None:
+                self._cache.move_to_end(cache_key)
+        if cached is not None:
+            FILTER_LOOKUPS.inc(result='hit')
+            return cached
+        FILTER_LOOKUPS.inc(result='miss')
+
+        matched = self._matching_values(cache_key[0], match)
+        if len(matched) == 1:
+            result = self._postings(matched[0])
+        elif matched:
+            result = np.sort(np.concatenate([self._postings(i) for i in matched]))
+        else:
+            result = np.empty(0, dtype=np.int32)
+        if self.dropped:
+            result = result[self.codes[result] >= 0]
+
+        with self._cache_lock:
+            self._cache[cache_key] = result
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+    def counts(self, mask=None):
+        """(values, row counts) over the rows selected by a boolean mask, most frequent first"""
+        codes = self.codes if mask is None else self.codes[mask]
+        counts = np.bincount(codes[codes >= 0], minlength=len(self.values))
+        order = np.argsort(-counts, kind='stable')
+        order = order[counts[order] > 0]
+        return [self.values[i] for i in order], counts[order]
+
+
+class SortOrder:
+    """Every row position ordered by a sort key, ties in position order.
+
+    rank[row] is the row's index in order. The sorted keys are kept so rows
+    appended or re-keyed by an update are placed by binary search instead of
+    re-sorting the catalog.
+    """
+
+    def __init__(self, order, keys):
+        self.order = order
+        self.keys = keys
+        self.rank = np.empty(len(order), dtype=np.int64)
+        self.rank[order] = np.arange(len(order))
+
+    @classmethod
+    def build(cls, keys):
+        order = np.argsort(keys, kind='stable')
+        return cls(order, keys[order])
+
+    def extend(self, keys):
+        """A new order with rows len(self.order).. appended under the given keys"""
+        added = np.argsort(keys, kind='stable')
+        keys = keys[added]
+        at = np.searchsorted(self.keys, keys, side='right')
+        return SortOrder(np.insert(self.order, at, added + len(self.order)), np.insert(self.keys, at, keys))
+
+    def rekey(self, positions, keys):
+        """A new order with the given rows moved to their new keys"""
+        keep = np.ones(len(self.order), dtype=bool)
+        keep[self.rank[positions]] = False
+        order, sorted_keys = self.order[keep], self.keys[keep]
+        moved = sorted(zip(keys, positions))
+        at = np.empty(len(moved), dtype=np.int64)
+        for i, (key, position) in enumerate(moved):
+            lo = np.searchsorted(sorted_keys, key, side='left')
+            hi = np.searchsorted(sorted_keys, key, side='right')
+            at[i] = lo + np.searchsorted(order[lo:hi], position)
+        return SortOrder(
+            np.insert(order, at, [position for _, position in moved]),
+            np.insert(sorted_keys, at, [key for key, _ in moved])
+        )
+
+
+def intersect_positions(*position_arrays):
+    """Rows present in every sorted, duplicate-free position array"""
+    result = position_arrays[0]
+    for positions in position_arrays[1:]:
+        result = np.intersect1d(result, positions, assume_unique=True)
+    return result
+
+
+def sample_positions(positions, n, rng=None):
+    """Up to n distinct positions drawn uniformly from positions (an array, or a size for range(size))"""
+    rng = rng if rng is not None else np.random.default_rng()
+    n = min(n, positions if isinstance(positions, (int, np.integer)) else len(positions))
+    if n == 0:
+        return np.empty(0, dtype=np.int64)
+    return rng.choice(positions, size=n, replace=False)
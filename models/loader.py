@@ -0,0 +1,206 @@
+import gzip
+import json
+import pandas as pd
+
+# Raw Amazon metadata fields used downstream; everything else is dropped on read
+LOADED_FIELDS = (
+    'asin', 'title', 'categories', 'brand', 'description', 'price',
+    'imUrl', 'imageURL', 'image', 'imageURLHighRes', 'overall', 'related'
+)
+
+GZIP_MAGIC = b'\x1f\x8b'
+
+
+def open_dataset(path):
+    """Open a dataset as text, transparently decompressing gzip (detected by magic bytes)"""
+    with open(path, 'rb') as f:
+        magic = f.read(2)
+    if magic == GZIP_MAGIC:
+        return gzip.open(path, 'rt', encoding='utf-8')
+    return open(path, 'r', encoding='utf-8')
+
+
+def detect_format(f):
+    """'array' for a JSON array, 'lines' for JSONL / a single object; rewinds the file"""
+    fmt = 'lines'
+    while True:
+        char = f.read(1)
+        if not char:
+            break
+        if not char.isspace():
+            fmt = 'array' if char == '[' else 'lines'
+            break
+    f.seek(0)
+    return fmt
+
+
+def iter_json_array(f, chunk_size=1 << 20, max_record_size=64 << 20):
+    """Yield the elements of a top-level JSON array without reading the whole file"""
+    decoder = json.JSONDecoder()
+    buffer = f.read(chunk_size)
+    pos = buffer.index('[') + 1
+    eof = False
+
+    while True:
+        # Skip separators between elements
+        while True:
+            while pos < len(buffer) and (buffer[pos].isspace() or buffer[pos] == ','):
+                pos += 1
+            if pos < len(buffer) or eof:
+                break
+            buffer, pos = f.read(chunk_size), 0
+            eof = not buffer
+        if pos >= len(buffer) or buffer[pos] == ']':
+            return
+
+        try:
+            value, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            # Element straddles the chunk boundary: read more and retry
+            more = f.read(chunk_size)
+            if not more or len(buffer) - pos > max_record_size:
+                raise
+            buffer, pos = buffer[pos:] + more, 0
+            continue
+
+        yield value
+        pos = end
+        if pos > chunk_size:
+            buffer, pos = buffer[pos:], 0
+
+
+def iter_json_lines(f):
+    """Yield one JSON object per line, skipping blank or malformed lines"""
+    for line in f:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError:
+            continue
+
+
+def _has_title(record):
+    title = record.get('title')
+    return title is not None and len(str(title)) > 0
+
+
+def _has_positive_price(record):
+    """Same rule as clean_amazon_data: pd.to_numeric(errors='coerce') > 0"""
+    price = record.get('price')
+    if isinstance(price, (int, float)):
+        return price > 0
+    if isinstance(price, str):
+        try:
+            return float(price) > 0
+        except ValueError:
+            return False
+    return False
+
+
+def project_record(record, fields=LOADED_FIELDS, require_price=True):
+    """The record reduced to `fields`, or None if it fails the title/price filters"""
+    if not isinstance(record, dict) or not _has_title(record):
+        return None
+    if require_price and not _has_positive_price(record):
+        return None
+    return {field: record[field] for field in fields if field in record}
+
+
+def iter_shards(path, shard_size=20000):
+    """Split a dataset into shards for parallel parsing.
+
+    Yields ('lines', [raw JSON lines]) for line-delimited files, so parsing
+    happens in the workers, or ('records', [dicts]) for JSON arrays, which
+    can only be split after decoding.
+    """
+    with open_dataset(path) as f:
+        fmt = detect_format(f)
+        if fmt == 'array':
+            kind, items = 'records', iter_json_array(f)
+        else:
+            kind, items = 'lines', (line for line in f if line.strip())
+
+        shard = []
+        for item in items:
+            shard.append(item)
+            if len(shard) >= shard_size:
+                yield kind, shard
+                shard = []
+        if shard:
+            yield kind, shard
+
+
+def parse_shard(kind, items, fields=LOADED_FIELDS, require_price=True):
+    """Projected, filtered records of a shard produced by iter_shards"""
+    products = []
+    for item in items:
+        if kind == 'lines':
+            try:
+                item = json.loads(item)
+            except json.JSONDecodeError:
+                continue
+        record = project_record(item, fields, require_price)
+        if record is not None:
+            products.append(record)
+    return products
+
+
+def stream_products(path, fields=LOADED_FIELDS, max_products=None, require_price=True, stats=None):
+    """Stream projected product records that pass the title/price filters.
+
+    Format (JSON array, JSONL, single object, optionally gzipped) is detected
+    from the first bytes. Only `fields` are kept from each record, and at most
+    `max_products` accepted records are produced (None for no limit). If given,
+    `stats` is updated with 'scanned' and 'kept' counts.
+    """
+    stats = stats if stats is not None else {}
+    stats.update(scanned=0, kept=0)
+
+    with open_dataset(path) as f:
+        fmt = detect_format(f)
+        stats['format'] = fmt
+        records = iter_json_array(f) if fmt == 'array' else iter_json_lines(f)
+        for record in records:
+            if max_products is not None and stats['kept'] >= max_products:
+                break
+            if not isinstance(record, dict):
+                continue
+            stats['scanned'] += 1
+            if not _has_title(record):
+                continue
+            if require_price and not _has_positive_price(record):
+                continue
+            stats['kept'] += 1
+            yield {field: record[field] for field in fields if field in record}
+
+    if fmt == 'lines' and stats['scanned'] == 0:
+        # A single (possibly pretty-printed) JSON object is not line-delimited
+        with open_dataset(path) as f:
+            try:
+                record = json.load(f)
+            except json.JSONDecodeError:
+                return
+        if isinstance(record, dict):
+            stats['format'] = 'object'
+            stats['scanned'] = 1
+            if _has_title(record) and (not require_price or _has_positive_price(record)):
+                stats['kept'] = 1
+                yield {field: record[field] for field in fields if field in record}
+
+
+def load_products(path, max_products=None, chunk_size=50000, stats=None, **params):
+    """Build a DataFrame from a streamed dataset, chunk by chunk, with flat parse memory"""
+    frames, chunk = [], []
+    for record in stream_products(path, max_products=max_products, stats=stats, **params):
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            frames.append(pd.DataFrame(chunk))
+            chunk = []
+    if chunk:
+        frames.append(pd.DataFrame(chunk))
+
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
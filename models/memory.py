@@ -0,0 +1,73 @@
+import mmap
+import os
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+
+def _is_mapped(array):
+    """True if an array's memory belongs to a file mapping rather than the heap"""
+    while array is not None:
+        if isinstance(array, (np.memmap, mmap.mmap)):
+            return True
+        array = getattr(array, 'base', None)
+    return False
+
+
+def object_nbytes(obj, _seen=None):
+    """(heap, mapped) bytes held by obj's arrays, frames and sparse matrices.
+
+    Walks containers and plain objects' attributes, counting each array once.
+    Python-level overhead (dicts of ids, small scalars) is not counted, so this
+    is a lower bound that covers the large buffers a catalog is made of.
+    """
+    seen = set() if _seen is None else _seen
+    if obj is None or isinstance(obj, (str, bytes, int, float, bool)) or id(obj) in seen:
+        return 0, 0
+    seen.add(id(obj))
+
+    if isinstance(obj, np.ndarray):
+        size = obj.nbytes
+        if obj.dtype == object:
+            size += sum(len(v) + 49 for v in obj.ravel().tolist() if isinstance(v, str))
+        return (0, size) if _is_mapped(obj) else (size, 0)
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(index=True, deep=True).sum()), 0
+    if isinstance(obj, pd.Series):
+        return int(obj.memory_usage(index=True, deep=True)), 0
+    if sp.issparse(obj):
+        arrays = [obj.data] + [getattr(obj, name) for name in ('indices', 'indptr', 'row', 'col') if hasattr(obj, name)]
+        return _sum(arrays, seen)
+    if isinstance(obj, dict):
+        return _sum(list(obj.values()), seen)
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        # Large lists of scalars are ids or tokens; only containers of arrays matter here
+        return _sum([v for v in obj if not isinstance(v, (str, bytes, int, float))], seen)
+    if hasattr(obj, '__dict__') and type(obj).__module__.startswith('models.'):
+        return _sum(list(vars(obj).values()), seen)
+    return 0, 0
+
+
+def _sum(values, seen):
+    heap = mapped = 0
+    for value in values:
+        h, m = object_nbytes(value, seen)
+        heap += h
+        mapped += m
+    return heap, mapped
+
+
+def process_rss():
+    """Resident set size of this process in bytes, or None where /proc is unavailable"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def format_bytes(n):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if abs(n) < 1024 or unit == 'GB':
+            return f"{n:.0f}{unit}" if unit == 'B' else f"{n:.1f}{unit}"
+        n /= 1024
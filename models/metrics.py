@@ -0,0 +1,208 @@
+"""In-process metrics rendered in the Prometheus text exposition format.
+
+A small dependency-free registry: counters, gauges and histograms with
+labels, plus collectors that read existing stats (e.g. cache hit counts)
+at scrape time. span() and timed() record build stages and recommender
+calls into histograms.
+"""
+import functools
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Seconds; spans everything from a cached lookup to a cold TF-IDF fit
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"') for _, v in labels)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(labels, escaped)) + '}'
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self._values = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(labels):
+        return tuple(sorted(labels.items()))
+
+    def header(self):
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def render(self):
+        return [f'{self.name}{_format_labels(k)} {_format_value(v)}' for k, v in sorted(self._values.items())]
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            counts = state[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels):
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+
+    def render(self):
+        lines = []
+        with self._lock:
+            items = sorted((k, (list(s[0]), s[1], s[2])) for k, s in self._values.items())
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                lines.append(f'{self.name}_bucket{_format_labels(key + (("le", _format_value(bound)),))} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(key)} {_format_value(total)}')
+            lines.append(f'{self.name}_count{_format_labels(key)} {count}')
+        return lines
+
+
+class MetricsRegistry:
+    """Named metrics plus scrape-time collectors, rendered together by render()"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, documentation, **params):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, **params)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} is already registered as a {metric.kind}")
+            return metric
+
+    def counter(self, name, documentation):
+        return self._get_or_create(Counter, name, documentation)
+
+    def gauge(self, name, documentation):
+        return self._get_or_create(Gauge, name, documentation)
+
+    def histogram(self, name, documentation, buckets=DEFAULT_BUCKETS):
+        return self._get_or_create(Histogram, name, documentation, buckets=buckets)
+
+    def register_collector(self, collect):
+        """collect() returns [(name, kind, documentation, [(labels dict, value), ...]), ...] per scrape"""
+        self._collectors.append(collect)
+
+    def render(self):
+        lines = []
+        for metric in list(self._metrics.values()):
+            samples = metric.render()
+            if samples:
+                lines += metric.header() + samples
+        for collect in self._collectors:
+            try:
+                families = collect()
+            except Exception as e:
+                logger.warning("⚠️ Metrics collector failed: %s", e)
+                continue
+            for name, kind, documentation, samples in families:
+                lines += [f'# HELP {name} {documentation}', f'# TYPE {name} {kind}']
+                lines += [f'{name}{_format_labels(tuple(sorted(labels.items())))} {_format_value(value)}'
+                          for labels, value in samples]
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+BUILD_STAGE_SECONDS = REGISTRY.histogram(
+    'stylesense_build_stage_seconds', 'Time spent in each catalog build stage')
+CALL_SECONDS = REGISTRY.histogram(
+    'stylesense_recommender_call_seconds', 'Latency of recommender methods')
+CALL_ERRORS = REGISTRY.counter(
+    'stylesense_recommender_errors_total', 'Recommender calls that raised or fell back after an error')
+NEIGHBOR_LOOKUPS = REGISTRY.counter(
+    'stylesense_neighbor_lookups_total', 'Recommendation neighbor lookups by source (table, ann, computed, ranked)')
+FILTER_LOOKUPS = REGISTRY.counter(
+    'stylesense_filter_lookups_total', 'Brand / category filter lookups by result (hit = served from the lookup cache)')
+
+
+@contextmanager
+def span(stage):
+    """Time a build stage into BUILD_STAGE_SECONDS and log its duration"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        BUILD_STAGE_SECONDS.observe(elapsed, stage=stage)
+        logger.debug("⏱ %s took %.3fs", stage, elapsed)
+
+
+def timed(method):
+    """Decorator recording a recommender method's latency in CALL_SECONDS"""
+    name = method.__name__
+
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            CALL_SECONDS.observe(time.perf_counter() - started, method=name)
+    return wrapper
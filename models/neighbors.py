@@ -0,0 +1,138 @@
+import os
+import shutil
+import numpy as np
+import scipy.sparse as sp
+
+
+def select_top_k(scores, k):
+    """Return the column positions of the k highest scores in each row, best first"""
+    scores = np.atleast_2d(scores)
+    k = min(k, scores.shape[1])
+    if k <= 0:
+        return np.empty((scores.shape[0], 0), dtype=np.int64)
+
+    # argpartition is O(n) per row; only the k survivors get sorted
+    part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    part_scores = np.take_along_axis(scores, part, axis=1)
+    order = np.argsort(-part_scores, axis=1, kind='stable')
+    return np.take_along_axis(part, order, axis=1)
+
+
+def compute_top_k_neighbors(matrix, k=20, block_size=1024, start=0, stop=None,
+                            max_block_elements=2 ** 24):
+    """Top-k cosine neighbors for rows [start, stop) of an L2-normalized sparse matrix.
+
+    Rows are processed in blocks so at most block_size x n_rows scores (and never
+    more than max_block_elements) are held in memory at once. Each row's own
+    position is excluded.
+    """
+    stop = matrix.shape[0] if stop is None else min(stop, matrix.shape[0])
+    return compute_top_k_for_rows(matrix, np.arange(start, stop), k=k, block_size=block_size,
+                                  max_block_elements=max_block_elements)
+
+
+def stacked_rows(matrix, appended, rows):
+    """Rows of matrix with appended's rows numbered after its own, without stacking the two"""
+    rows = np.asarray(rows, dtype=np.int64)
+    fitted = matrix.shape[0]
+    later = rows >= fitted
+    if appended is None or not later.any():
+        return matrix[rows]
+    if later.all():
+        return appended[rows - fitted]
+    stacked = sp.vstack((matrix[rows[~later]], appended[rows[later] - fitted]), format='csr')
+    return stacked[np.argsort(np.concatenate((np.flatnonzero(~later), np.flatnonzero(later))))]
+
+
+def compute_top_k_for_rows(matrix, rows, k=20, block_size=1024, max_block_elements=2 ** 24,
+                           matrix_t=None, excluded=None, appended=None):
+    """Top-k cosine neighbors for arbitrary row positions, blocked like compute_top_k_neighbors.
+
+    matrix_t may be a precomputed matrix.T.tocsr() to skip the transpose;
+    excluded is an optional boolean mask of rows never returned as neighbors.
+    appended holds rows numbered after matrix's (e.g. added since the fit),
+    scored as their own block so matrix is never re-stacked.
+    """
+    n_rows = matrix.shape[0] + (appended.shape[0] if appended is not None else 0)
+    rows = np.asarray(rows, dtype=np.int64)
+    k = max(0, min(k, n_rows - 1))
+    block_size = max(1, min(block_size, max_block_elements // max(n_rows, 1)))
+
+    indices = np.zeros((len(rows), k), dtype=np.int32)
+    scores = np.zeros((len(rows), k), dtype=np.float32)
+    if k == 0 or len(rows) == 0:
+        return indices, scores
+
+    matrix_t = matrix.T.tocsr() if matrix_t is None else matrix_t
+    appended_t = None if appended is None else appended.T.tocsr()
+    for block_start in range(0, len(rows), block_size):
+        block_rows = rows[block_start:block_start + block_size]
+        block = stacked_rows(matrix, appended, block_rows)
+        sims = (block @ matrix_t).toarray()
+        if appended_t is not None:
+            sims = np.hstack((sims, (block @ appended_t).toarray()))
+        sims[np.arange(len(block_rows)), block_rows] = -np.inf
+        if excluded is not None:
+            sims[:, excluded] = -np.inf
+
+        top = select_top_k(sims, k)
+        indices[block_start:block_start + len(block_rows)] = top
+        scores[block_start:block_start + len(block_rows)] = np.take_along_axis(sims, top, axis=1)
+
+    return indices, scores
+
+
+class NeighborIndex:
+    """Precomputed top-K neighbor table keyed by matrix row position"""
+
+    def __init__(self, indices, scores, fingerprint=''):
+        self.indices = indices
+        self.scores = scores
+        self.fingerprint = fingerprint
+
+    @property
+    def k(self):
+        return self.indices.shape[1]
+
+    def __len__(self):
+        return self.indices.shape[0]
+
+    @classmethod
+    def build(cls, matrix, k=20, block_size=1024, fingerprint=''):
+        indices, scores = compute_top_k_neighbors(matrix, k=k, block_size=block_size)
+        return cls(indices, scores, fingerprint)
+
+    def lookup(self, position, n):
+        """Return up to n neighbor positions, or None if the table can't answer"""
+        if position < 0 or position >= len(self) or n > self.k:
+            return None
+        return self.indices[position, :n]
+
+    def save(self, path):
+        """Write the table as a directory of .npy files so it can be memory-mapped"""
+        tmp_path = f'{path}.tmp-{os.getpid()}'
+        os.makedirs(tmp_path, exist_ok=True)
+        np.save(os.path.join(tmp_path, 'indices.npy'), self.indices)
+        np.save(os.path.join(tmp_path, 'scores.npy'), self.scores)
+        with open(os.path.join(tmp_path, 'fingerprint.txt'), 'w', encoding='utf-8') as f:
+            f.write(self.fingerprint)
+
+        old_path = f'{path}.old-{os.getpid()}'
+        if os.path.exists(path):
+            os.replace(path, old_path)
+        os.replace(tmp_path, path)
+        shutil.rmtree(old_path, ignore_errors=True)
+
+    @classmethod
+    def load(cls, path, fingerprint=None, mmap_mode=None):
+        """Load a saved table; returns None if missing or built from other data"""
+        fingerprint_path = os.path.join(path, 'fingerprint.txt')
+        if not os.path.exists(fingerprint_path):
+            return None
+        with open(fingerprint_path, 'r', encoding='utf-8') as f:
+            saved_fingerprint = f.read()
+        if fingerprint is not None and saved_fingerprint != fingerprint:
+            return None
+        indices = np.load(os.path.join(path, 'indices.npy'), mmap_mode=mmap_mode)
+        scores = np.load(os.path.join(path, 'scores.npy'), mmap_mode=mmap_mode)
+        return cls(indices, scores, saved_fingerprint)
@@ -0,0 +1,135 @@
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import CountVectorizer, TfidfTransformer, TfidfVectorizer
+from models.loader import iter_shards, parse_shard
+
+# TfidfVectorizer options that only affect vocabulary selection, handled by select_vocabulary
+VOCABULARY_LIMITS = ('max_features', 'min_df', 'max_df')
+
+
+def _ordered_results(executor, fn, arg_tuples, max_in_flight):
+    """Like executor.map, but submits lazily so at most max_in_flight shards are in memory"""
+    pending = deque()
+    try:
+        for args in arg_tuples:
+            pending.append(executor.submit(fn, *args))
+            if len(pending) >= max_in_flight:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def prepare_shard(kind, items):
+    """Worker: parse, clean and build text features for one shard of raw records"""
+    from models.recommender import AmazonFashionRecommender
+
+    records = parse_shard(kind, items)
+    if not records:
+        return pd.DataFrame()
+
+    shard = AmazonFashionRecommender.__new__(AmazonFashionRecommender)
+    shard.df = pd.DataFrame(records)
+    if not shard._standardize_columns():
+        return pd.DataFrame()
+    # The keep-all fallback of filter_fashion_products needs the global count,
+    # so the mask is applied after the merge
+    shard.df['_fashion'] = shard.fashion_mask()
+    shard.df['combined_features'] = shard.create_combined_features()
+    return shard.df
+
+
+def load_and_clean_parallel(path, n_jobs, max_products=None, shard_size=20000):
+    """Cleaned catalog (with a '_fashion' mask column) built shard by shard in a process pool.
+
+    Shards are merged in input order, so the result matches a serial build.
+    """
+    frames, kept = [], 0
+    with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+        results = _ordered_results(executor, prepare_shard, iter_shards(path, shard_size), 2 * n_jobs)
+        for frame in results:
+            if max_products is not None:
+                frame = frame.iloc[:max_products - kept]
+            if len(frame):
+                frames.append(frame)
+                kept += len(frame)
+            if max_products is not None and kept >= max_products:
+                results.close()
+                break
+
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
+
+
+def _analyzer_params(params):
+    return {k: v for k, v in params.items() if k not in VOCABULARY_LIMITS}
+
+
+def count_terms(texts, params):
+    """Worker: document and total frequencies of every analyzed term in a shard"""
+    analyzer = CountVectorizer(**_analyzer_params(params)).build_analyzer()
+    doc_freq, term_freq = Counter(), Counter()
+    for text in texts:
+        terms = analyzer(text)
+        term_freq.update(terms)
+        doc_freq.update(set(terms))
+    return doc_freq, term_freq
+
+
+def select_vocabulary(doc_freq, term_freq, n_docs, max_features=None, min_df=1, max_df=1.0):
+    """Apply TfidfVectorizer's min_df / max_df / max_features rules to merged counts.
+
+    Terms are ranked by total frequency with the same argsort scikit-learn
+    uses, so ties at the max_features cutoff resolve identically.
+    """
+    max_doc_count = max_df if isinstance(max_df, (int, np.integer)) else max_df * n_docs
+    min_doc_count = min_df if isinstance(min_df, (int, np.integer)) else min_df * n_docs
+    terms = sorted(t for t, d in doc_freq.items() if min_doc_count <= d <= max_doc_count)
+
+    if max_features is not None and len(terms) > max_features:
+        frequencies = np.array([term_freq[t] for t in terms], dtype=np.int64)
+        keep = np.sort((-frequencies).argsort()[:max_features])
+        terms = [terms[i] for i in keep]
+    return {term: i for i, term in enumerate(terms)}
+
+
+def count_matrix(texts, vocabulary, params):
+    """Worker: term-count matrix of a shard over a fixed vocabulary"""
+    return CountVectorizer(vocabulary=vocabulary, **_analyzer_params(params)).transform(texts)
+
+
+def fit_tfidf_parallel(texts, params, n_jobs, shard_size=20000):
+    """Fit a TfidfVectorizer equivalent to TfidfVectorizer(**params).fit_transform(texts).
+
+    A parallel count pass builds the vocabulary, a second parallel pass
+    counts terms against it, and idf weighting runs once on the stacked counts.
+    """
+    texts = list(texts)
+    shards = [texts[i:i + shard_size] for i in range(0, len(texts), shard_size)]
+
+    with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+        doc_freq, term_freq = Counter(), Counter()
+        for shard_doc_freq, shard_term_freq in executor.map(count_terms, shards, repeat(params)):
+            doc_freq.update(shard_doc_freq)
+            term_freq.update(shard_term_freq)
+
+        vocabulary = select_vocabulary(
+            doc_freq, term_freq, len(texts),
+            max_features=params.get('max_features'),
+            min_df=params.get('min_df', 1),
+            max_df=params.get('max_df', 1.0)
+        )
+        counts = sp.vstack(list(executor.map(count_matrix, shards, repeat(vocabulary), repeat(params)))).tocsr()
+
+    transformer = TfidfTransformer()
+    matrix = transformer.fit_transform(counts)
+    vectorizer = TfidfVectorizer(vocabulary=vocabulary, **_analyzer_params(params))
+    vectorizer.idf_ = transformer.idf_
+    return vectorizer, matrix
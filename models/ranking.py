@@ -0,0 +1,132 @@
+import numpy as np
+from models.neighbors import select_top_k
+
+# Weight of each signal in the fused score; every term is scaled to [0, 1]
+DEFAULT_WEIGHTS = {
+    'similarity': 1.0,  # text cosine to the anchor product
+    'price': 0.15,      # price proximity to the anchor
+    'rating': 0.1,      # average rating
+    'brand': 0.05,      # same brand as the anchor
+    'category': 0.1,    # same main category as the anchor
+    'coview': 0.3,      # co-view / co-purchase strength with the anchor
+}
+
+
+def resolve_weights(weights=None):
+    """DEFAULT_WEIGHTS overridden by weights, rejecting unknown signals"""
+    resolved = dict(DEFAULT_WEIGHTS)
+    for name, value in (weights or {}).items():
+        if name not in DEFAULT_WEIGHTS:
+            raise ValueError(f"Unknown ranking signal {name!r}, expected one of {tuple(DEFAULT_WEIGHTS)}")
+        resolved[name] = float(value)
+    return resolved
+
+
+class RankingFeatures:
+    """Per-row price, rating, brand and category arrays used to re-rank neighbor candidates.
+
+    Brand and category codes are shared with the FieldIndex of each column
+    (-1 = missing). A price of 0 means unknown and scores no proximity.
+    """
+
+    def __init__(self, prices, ratings, brand_codes=None, category_codes=None):
+        self.prices = prices
+        self.ratings = ratings
+        self.brand_codes = brand_codes
+        self.category_codes = category_codes
+
+    @classmethod
+    def build(cls, df, field_indexes):
+        n = len(df)
+        prices = df['price'].to_numpy(dtype=np.float64) if 'price' in df.columns else np.zeros(n)
+        ratings = df['rating'].to_numpy(dtype=np.float64) if 'rating' in df.columns else np.zeros(n)
+        return cls(
+            prices.astype(np.float32),
+            ratings.astype(np.float32),
+            field_indexes['brand'].codes if 'brand' in field_indexes else None,
+            field_indexes['main_category'].codes if 'main_category' in field_indexes else None
+        )
+
+    def updated(self, field_indexes, positions=None, rows=None, appended=None):
+        """A new instance after an incremental update, sharing unchanged arrays.
+
+        rows hold new prices / ratings for the given positions, appended is a
+        frame of rows added after the existing ones; codes are re-read from
+        the updated field indexes.
+        """
+        prices, ratings = self.prices, self.ratings
+        if positions is not None and len(positions):
+            edited = RankingFeatures.build(rows, {})
+            prices, ratings = prices.copy(), ratings.copy()
+            prices[positions], ratings[positions] = edited.prices, edited.ratings
+        if appended is not None and len(appended):
+            added = RankingFeatures.build(appended, {})
+            prices, ratings = np.concatenate((prices, added.prices)), np.concatenate((ratings, added.ratings))
+        return RankingFeatures(
+            prices,
+            ratings,
+            field_indexes['brand'].codes if 'brand' in field_indexes else None,
+            field_indexes['main_category'].codes if 'main_category' in field_indexes else None
+        )
+
+    def __len__(self):
+        return len(self.prices)
+
+    def eligible(self, live=None, min_price=None, max_price=None):
+        """Boolean mask of rows passing the price constraints (and not tombstoned)"""
+        mask = np.ones(len(self), dtype=bool) if live is None else live.copy()
+        if min_price is not None:
+            mask &= self.prices >= min_price
+        if max_price is not None:
+            mask &= self.prices <= max_price
+        return mask
+
+    def price_proximity(self, anchor, candidates):
+        """1 at the anchor's price, halving with each doubling of the price ratio"""
+        anchor_price = self.prices[anchor]
+        prices = self.prices[candidates]
+        if anchor_price <= 0:
+            return np.zeros(len(candidates), dtype=np.float32)
+        known = prices > 0
+        ratio = np.abs(np.log2(np.where(known, prices, 1) / anchor_price))
+        return np.where(known, 1.0 / (1.0 + ratio), 0.0).astype(np.float32)
+
+    def fuse(self, anchor, candidates, similarities, weights, coview=None):
+        """Weighted sum of similarity and feature terms for candidate rows.
+
+        coview holds each candidate's co-view strength with the anchor (0-1), if any.
+        """
+        scores = weights['similarity'] * similarities.astype(np.float32)
+        if weights['price']:
+            scores += weights['price'] * self.price_proximity(anchor, candidates)
+        if weights['rating']:
+            scores += weights['rating'] * np.clip((self.ratings[candidates] - 1) / 4, 0, 1)
+        for name, codes in (('brand', self.brand_codes), ('category', self.category_codes)):
+            if weights[name] and codes is not None and codes[anchor] >= 0:
+                scores += weights[name] * (codes[candidates] == codes[anchor])
+        if coview is not None and weights['coview']:
+            scores += weights['coview'] * coview
+        return scores
+
+
+def mmr_order(scores, pairwise, n, diversity=0.0):
+    """Indices of the n best scores, picked greedily by maximal marginal relevance.
+
+    Each pick maximizes (1 - diversity) * score - diversity * (highest
+    similarity to an already picked item), using the pairwise similarity
+    matrix of the candidates; diversity=0 is plain top-n by score.
+    """
+    n = min(n, len(scores))
+    if diversity <= 0 or pairwise is None:
+        return select_top_k(scores, n)[0]
+
+    available = np.ones(len(scores), dtype=bool)
+    redundancy = np.zeros(len(scores), dtype=np.float32)
+    picked = np.empty(n, dtype=np.int64)
+    for i in range(n):
+        objective = np.where(available, (1 - diversity) * scores - diversity * redundancy, -np.inf)
+        best = int(np.argmax(objective))
+        picked[i] = best
+        available[best] = False
+        redundancy = np.maximum(redundancy, pairwise[best])
+    return picked
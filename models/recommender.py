@@ -1,26 +1,311 @@
 import pandas as pd
-import json
 import numpy as np
+import scipy.sparse as sp
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-import gzip
+import copy
+import functools
+import logging
 import os
 import re
+import threading
+import time
+from models.neighbors import NeighborIndex, compute_top_k_for_rows, select_top_k, stacked_rows
+from models.embeddings import EmbeddingIndex, EMBEDDING_DTYPES, quality_report
+from models.ranking import RankingFeatures, mmr_order, resolve_weights
+from models.coview import CoViewGraph
+from models.ann import create_ann_index, recall_report
+from models.search_index import InvertedIndex
+from models.snapshot import SnapshotStore, SNAPSHOT_VERSION, file_digest
+from models.storage import IdHashIndex
+from models.loader import load_products, project_record, stream_products
+from models.parallel import load_and_clean_parallel, fit_tfidf_parallel
+from models.facets import FacetSummary
+from models.filters import FieldIndex, SortOrder, intersect_positions, sample_positions
+from models.cards import CardStore, DETAIL_EXCLUDED
+from models.updates import VocabularyDrift
+from models.memory import object_nbytes, format_bytes
+from models.metrics import span, timed, CALL_ERRORS, NEIGHBOR_LOOKUPS
+
+logger = logging.getLogger(__name__)
+
+TFIDF_PARAMS = dict(
+    max_features=2000,  # Reduced for better performance
+    stop_words='english',
+    ngram_range=(1, 2),
+    min_df=2,
+    max_df=0.8,
+    lowercase=True
+)
+
+# Standardized columns produced by clean_amazon_data and kept in snapshots
+SNAPSHOT_COLUMNS = [
+    'id', 'name', 'brand', 'main_category', 'subcategory', 'category_path',
+    'description', 'price', 'image_url', 'rating'
+]
+HTML_TAG_PATTERN = re.compile(r'<[^>]+>')
+
+# Low-cardinality columns stored as codes + categories
+CATEGORICAL_COLUMNS = ('brand', 'main_category', 'subcategory')
+
+# Startup phases reported to on_progress, in order
+BUILD_PHASES = ('loading', 'cleaning', 'vectorizing', 'neighbors', 'ready')
+
+
+def reads_catalog(method):
+    """Run a read method against the catalog published when the call starts.
+
+    The recommender handle forwards to its current catalog through a single
+    reference, so a concurrent upsert or refit can't mix two versions' rows
+    and indexes within one call. Catalog objects (and a recommender still
+    building) point at themselves.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        return method(self.__dict__.get('_catalog', self), *args, **kwargs)
+    return wrapper
+
 
 class AmazonFashionRecommender:
-    def __init__(self, data_path):
+    # Attributes describing one version of the catalog. Once built they live on
+    # an immutable catalog object that the recommender publishes as a whole;
+    # the recommender itself keeps only configuration and update bookkeeping.
+    CATALOG_ATTRIBUTES = (
+        'catalog_version', 'df', 'n_rows', 'tfidf_matrix', 'vectorizer', 'neighbor_index', 'ann_index',
+        'embeddings', 'coview_graph', '_id_to_pos', '_id_index', '_string_columns', 'search_index',
+        '_tfidf_by_term', 'facets', 'field_indexes', 'ranking_features', '_sort_orders', 'cards', '_detail_columns',
+        '_high_rated', '_live', '_live_positions', '_delta_start', '_df_delta', '_tfidf_delta', '_search_delta',
+        '_id_delta', '_detail_delta', '_base_version', '_update_seq', '_fitted_rows', '_changed_rows', '_drift'
+    )
+
+    def __init__(self, data_path, n_neighbors=20, max_products=5000,
+                 ann_backend=None, ann_params=None, use_snapshot=True, storage='memory',
+                 n_jobs=1, refit_threshold=0.1, refit_changed_fraction=0.5, on_progress=None,
+                 embedding_dims=None, embedding_dtype='float32', coview_weight=0.3):
+        """
+        ann_backend: None for exact cosine, 'lsh' or 'ivf' (or an ANNIndex instance)
+        for approximate neighbors on large catalogs. ann_params are passed to the
+        backend, e.g. {'n_probe': 16} for IVF or {'n_tables': 12} for LSH.
+        use_snapshot: reuse (or write) a binary snapshot of the cleaned catalog
+        and fitted models next to the dataset, keyed by a hash of the file.
+        storage: 'memory' loads everything onto the heap; 'mmap' serves from
+        read-only memory-mapped snapshot files (string columns decoded per row),
+        so worker processes share one physical copy of the catalog.
+        n_jobs: processes used for a cold build (parse, clean and TF-IDF fit
+        run per shard and are merged in input order); 1 builds serially.
+        refit_threshold / refit_changed_fraction: after upsert_products, a
+        background refit starts once added products' out-of-vocabulary rate
+        exceeds the fitted catalog's by refit_threshold, or once added plus
+        deleted rows reach refit_changed_fraction of the fitted catalog
+        (refit_threshold=None disables automatic refits).
+        on_progress: called as on_progress(phase, fraction) as the build enters
+        each of BUILD_PHASES, e.g. to report startup progress to health checks.
+        embedding_dims: reduce TF-IDF rows to this many LSA dimensions and use
+        dense dot products for neighbors (None keeps sparse TF-IDF similarity);
+        embedding_dtype stores them as 'float32', 'float16' or 'int8'. An
+        ann_backend takes precedence: the ANN index is fitted on TF-IDF vectors,
+        so recommendations then ignore the embeddings.
+        coview_weight: share of a recommendation's score taken from the
+        co-view / co-purchase graph built from the dataset's 'related' lists
+        (0 = content similarity only).
+        """
+        if storage not in ('memory', 'mmap'):
+            raise ValueError(f"storage must be 'memory' or 'mmap', got {storage!r}")
         self.data_path = data_path
+        self.n_neighbors = n_neighbors
+        self.max_products = max_products
+        self.ann_backend = ann_backend
+        self.ann_params = ann_params or {}
+        self.storage = storage
+        self.use_snapshot = use_snapshot or storage == 'mmap'
+        self.n_jobs = max(1, n_jobs or 1)
+        self.refit_threshold = refit_threshold
+        self.refit_changed_fraction = refit_changed_fraction
+        self.on_progress = on_progress
+        self.embedding_dims = embedding_dims
+        self.embedding_dtype = embedding_dtype
+        self.embeddings = None
+        self.coview_weight = coview_weight
+        self.coview_graph = None
+        self.catalog_version = None
         self.df = None
+        self.n_rows = 0
         self.tfidf_matrix = None
         self.vectorizer = None
+        self.neighbor_index = None
+        self.ann_index = None
+        self._id_to_pos = {}
+        self._id_index = None
+        self._string_columns = {}
+        self.search_index = None
+        self._tfidf_by_term = None
+        self.facets = FacetSummary()
+        self.field_indexes = {}
+        self.ranking_features = None
+        self._sort_orders = {}
+        self.cards = CardStore({})
+        self._detail_columns = []
+        self._high_rated = np.empty(0, dtype=np.int64)
+        # Incremental updates: tombstones (None = every row live), the rows appended
+        # since the fit (positions from _delta_start on) kept in their own frame,
+        # TF-IDF matrix, search segment, id map and detail arrays until a refit
+        # folds them in, and refit bookkeeping
+        self._live = None
+        self._live_positions = None
+        self._delta_start = 0
+        self._df_delta = None
+        self._tfidf_delta = None
+        self._search_delta = None
+        self._id_delta = {}
+        self._detail_delta = []
+        self._update_lock = threading.RLock()
+        self._update_seq = 0
+        self._base_version = None
+        self._fitted_rows = 0
+        self._changed_rows = 0
+        self._drift = None
+        self._replay = None
+        self._refit_thread = None
         
         # Load and process data in the correct order
-        self.load_amazon_data()
+        self._progress('loading')
+        if not (self.use_snapshot and self.load_snapshot()):
+            if self.n_jobs > 1:
+                self.load_and_clean_parallel()
+            else:
+                self.load_amazon_data()
+                if self.df is not None and len(self.df) > 0:
+                    self._progress('cleaning')
+                    self.clean_amazon_data()
+            if self.df is not None and len(self.df) > 0:
+                self._progress('vectorizing')
+                self.build_recommendation_matrix()
+                self.build_coview_graph()
+                if self.use_snapshot:
+                    self.save_snapshot()
+                if self.storage == 'mmap':
+                    # Drop the heap copies built above in favour of the shared mapping
+                    self.load_snapshot()
         if self.df is not None and len(self.df) > 0:
-            self.clean_amazon_data()
-            self.build_recommendation_matrix()
+            self._progress('neighbors')
+            if self.embedding_dims:
+                self.build_embeddings()
+            if self.ann_backend:
+                self.build_ann_index()
+            else:
+                self.build_neighbor_index()
+            self._progress('ready')
         else:
-            print("❌ Failed to load data. Check your dataset file.")
+            logger.error("❌ Failed to load data. Check your dataset file.")
+
+        catalog = copy.copy(self)
+        for name in self.CATALOG_ATTRIBUTES:
+            self.__dict__.pop(name, None)
+        self._publish(catalog)
+
+    def __getattr__(self, name):
+        # Only reached for attributes missing on the handle: read them from the current catalog
+        catalog = self.__dict__.get('_catalog')
+        if catalog is None or catalog is self:
+            raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+        return getattr(catalog, name)
+
+    def _publish(self, catalog):
+        """Make catalog the one every read sees, with a single reference assignment"""
+        catalog._catalog = catalog
+        self._catalog = catalog
+
+    def _progress(self, phase):
+        if self.on_progress is None:
+            return
+        try:
+            self.on_progress(phase, BUILD_PHASES.index(phase) / (len(BUILD_PHASES) - 1))
+        except Exception as e:
+            logger.warning(f"⚠️ Progress callback failed: {e}")
+
+    def _artifact_path(self, kind):
+        """Path of a file derived from the dataset, e.g. data.jsonl.gz.5000.snapshot.
+
+        Named after the full dataset filename and the row limit, so catalogs
+        built from data.jsonl vs data.jsonl.gz, or with different max_products
+        (the app vs the export CLI), keep their own copies.
+        """
+        return f"{self.data_path}.{self.max_products or 'all'}.{kind}"
+
+    @property
+    def snapshot_path(self):
+        return self._artifact_path('snapshot')
+
+    @reads_catalog
+    def catalog_key(self):
+        """Version key of the catalog: snapshot format, source file hash and row limit"""
+        if self.catalog_version is None:
+            self.catalog_version = self.version_for(self.data_path, self.max_products)
+        return self.catalog_version
+
+    @staticmethod
+    def version_for(data_path, max_products):
+        """catalog_key of a catalog built from data_path, without building it"""
+        return f"v{SNAPSHOT_VERSION}-{file_digest(data_path)}-{max_products}"
+
+    @classmethod
+    def preview_products(cls, data_path, n=12):
+        """Cards for the first n products of a dataset, read without building the catalog"""
+        rows = cls._clean_records(stream_products(data_path, max_products=n))
+        return CardStore.build(rows).take(np.arange(len(rows)))
+
+    @span('snapshot_load')
+    def load_snapshot(self):
+        """Restore the cleaned catalog and fitted models from a matching snapshot"""
+        if not os.path.exists(self.data_path):
+            return False
+
+        mmap = self.storage == 'mmap'
+        try:
+            snapshot = SnapshotStore(self.snapshot_path).load(self.catalog_key(), mmap=mmap)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not read snapshot, rebuilding: {e}")
+            return False
+        if snapshot is None:
+            return False
+
+        self.df = snapshot['df']
+        self._string_columns = snapshot['string_columns']
+        self.tfidf_matrix = snapshot['tfidf_matrix']
+        self._tfidf_by_term = snapshot['tfidf_by_term']
+        self._fitted_rows = self.tfidf_matrix.shape[0]
+        self.vectorizer = self._restore_vectorizer(snapshot['vocabulary'], snapshot['idf'])
+        self.coview_graph = CoViewGraph(snapshot['coview']) if snapshot['coview'] is not None else None
+        if snapshot['search_index'] is not None:
+            self.search_index = InvertedIndex.from_arrays(**snapshot['search_index'])
+        if 'id' in self._string_columns and snapshot['id_slots'] is not None:
+            self._id_index = IdHashIndex(snapshot['id_slots'], self._string_columns['id'])
+        self._build_indexes()
+        logger.info(f"✅ Loaded snapshot with {len(self.df)} products from {self.snapshot_path}"
+              + (" (memory-mapped)" if mmap else ""))
+        return True
+
+    @span('snapshot_save')
+    def save_snapshot(self):
+        """Persist the cleaned catalog, TF-IDF matrix, vocabulary and search index"""
+        if self.tfidf_matrix is None:
+            return
+        try:
+            SnapshotStore(self.snapshot_path).save(
+                self.catalog_key(), self.df, SNAPSHOT_COLUMNS, self.tfidf_matrix,
+                self.vectorizer.get_feature_names_out().tolist(), self.vectorizer.idf_,
+                search_index=self.search_index, categorical=CATEGORICAL_COLUMNS,
+                coview=None if self.coview_graph is None else self.coview_graph.matrix
+            )
+            logger.info(f"✅ Saved snapshot to {self.snapshot_path}")
+        except Exception as e:
+            logger.warning(f"⚠️ Could not save snapshot: {e}")
+
+    def _restore_vectorizer(self, vocabulary, idf):
+        """A TfidfVectorizer equivalent to the fitted one, from its vocabulary and idf"""
+        params = {k: v for k, v in TFIDF_PARAMS.items() if k not in ('max_features', 'min_df', 'max_df')}
+        vectorizer = TfidfVectorizer(vocabulary={term: i for i, term in enumerate(vocabulary)}, **params)
+        vectorizer.idf_ = idf
+        return vectorizer
 
     def _clean_text(self, text):
         """Clean text data"""
@@ -28,122 +313,306 @@ class AmazonFashionRecommender:
             return ""
         return str(text).lower().replace('\n', ' ').replace('\r', '').strip()
 
+    @span('load')
     def load_amazon_data(self):
-        """Load Amazon dataset from JSON file"""
-        print("🔄 Loading Amazon Fashion Dataset...")
+        """Stream the Amazon dataset (JSON array, JSONL or .gz) into a DataFrame"""
+        logger.info("🔄 Loading Amazon Fashion Dataset...")
         
         if not os.path.exists(self.data_path):
-            print(f"❌ Dataset file not found at: {self.data_path}")
-            print("💡 Please ensure your dataset file exists or create a sample using the dataset sampler.")
+            logger.error(f"❌ Dataset file not found at: {self.data_path}")
+            logger.info("💡 Please ensure your dataset file exists or create a sample using the dataset sampler.")
             return
 
-        products = []
         try:
-            with open(self.data_path, 'r', encoding='utf-8') as f:
-                # Try to load as JSON array first
-                try:
-                    f.seek(0)
-                    data = json.load(f)
-                    if isinstance(data, list):
-                        products = data[:5000]  # Limit to 5000 items
-                        print(f"✅ Loaded JSON array with {len(products)} products")
-                    else:
-                        products = [data]
-                        print("✅ Loaded single JSON object")
-                except json.JSONDecodeError:
-                    # Try JSONL format (one JSON per line)
-                    f.seek(0)
-                    line_count = 0
-                    for line in f:
-                        if line_count >= 5000:  # Limit to 5000 items
-                            break
-                        try:
-                            product = json.loads(line.strip())
-                            # Only load if has title
-                            if 'title' in product and product['title']:
-                                products.append(product)
-                                line_count += 1
-                        except json.JSONDecodeError:
-                            continue
-                    print(f"✅ Loaded JSONL format with {len(products)} products")
-
-            if products:
-                self.df = pd.DataFrame(products)
-                print(f"✅ Created DataFrame with {len(self.df)} products")
+            stats = {}
+            self.df = load_products(self.data_path, max_products=self.max_products, stats=stats)
+            if len(self.df) > 0:
+                logger.info(f"✅ Loaded {stats['format']} format: kept {stats['kept']} of {stats['scanned']} products")
+                logger.info(f"✅ Created DataFrame with {len(self.df)} products")
             else:
-                print("❌ No valid products found in dataset")
-                self.df = pd.DataFrame()
+                logger.error("❌ No valid products found in dataset")
 
         except Exception as e:
-            print(f"❌ Error loading dataset: {e}")
+            logger.error(f"❌ Error loading dataset: {e}")
             self.df = pd.DataFrame()
 
+    @span('load_clean_parallel')
+    def load_and_clean_parallel(self, shard_size=20000):
+        """load_amazon_data + clean_amazon_data across n_jobs processes"""
+        logger.info(f"🔄 Loading and cleaning Amazon data in {self.n_jobs} processes...")
+        if not os.path.exists(self.data_path):
+            logger.error(f"❌ Dataset file not found at: {self.data_path}")
+            return
+
+        try:
+            df = load_and_clean_parallel(self.data_path, self.n_jobs, self.max_products, shard_size)
+        except Exception as e:
+            logger.error(f"❌ Error in parallel build, falling back to a serial build: {e}")
+            df = pd.DataFrame()
+        if len(df) == 0:
+            # e.g. a single JSON object, which can't be sharded
+            self.load_amazon_data()
+            if self.df is not None and len(self.df) > 0:
+                self.clean_amazon_data()
+            return
+
+        fashion_mask = df.pop('_fashion').astype(bool)
+        self.df = df
+        self.df = self.filter_fashion_products(fashion_mask)
+        self.df = self.df.reset_index(drop=True)
+        self._build_indexes()
+        logger.info(f"✅ Cleaned {len(df)} → {len(self.df)} products")
+
     def clean_amazon_data(self):
         """Clean and prepare Amazon dataset"""
-        print("🔄 Cleaning Amazon data...")
+        logger.info("🔄 Cleaning Amazon data...")
         
         if self.df is None or len(self.df) == 0:
-            print("❌ No data to clean")
+            logger.error("❌ No data to clean")
             return
         
         original_count = len(self.df)
+        if not self._standardize_columns():
+            return
+        
+        # Filter fashion-related products only
+        self.df = self.filter_fashion_products()
+        
+        # Create combined text for recommendations
+        self.df['combined_features'] = self.create_combined_features()
         
+        # Index labels == row positions == tfidf_matrix rows from here on
+        self.df = self.df.reset_index(drop=True)
+        self._build_indexes()
+        
+        logger.info(f"✅ Cleaned: {original_count} → {len(self.df)} products")
+
+    @span('clean')
+    def _standardize_columns(self):
+        """Row-local part of cleaning: drop unusable rows and derive the standard columns.
+
+        Works on any slice of the catalog, so parallel builds run it per shard.
+        """
         # Remove products without essential info
         if 'title' in self.df.columns:
             self.df = self.df.dropna(subset=['title'])
-            self.df = self.df[self.df['title'].str.len() > 0]
+            self.df = self.df[self.df['title'].str.len() > 0].copy()
         else:
-            print("❌ No 'title' column found")
-            return
+            logger.error("❌ No 'title' column found")
+            return False
         
         # Create standardized columns
-        self.df['id'] = self.df.get('asin', pd.Series(range(len(self.df))))
+        self.df['id'] = self.df['asin'] if 'asin' in self.df.columns else np.arange(len(self.df))
         self.df['name'] = self.df['title']
         
-        # Handle categories
-        self.df['main_category'] = self.df.apply(self.extract_main_category, axis=1)
-        self.df['subcategory'] = self.df.apply(self.extract_subcategory, axis=1)
-        self.df['category_path'] = self.df.apply(self.extract_category_path, axis=1)
+        # Drop unpriced rows first so the text cleaning below skips them
+        self.df['price'] = pd.to_numeric(self.df.get('price'), errors='coerce')
+        self.df = self.df[self.df['price'] > 0].copy()
+        
+        # Handle categories (one pass over the nested lists)
+        main, sub, path = self._split_categories(self.df.get('categories'))
+        self.df['main_category'] = pd.Series(main, index=self.df.index, dtype=object)
+        self.df['subcategory'] = pd.Series(sub, index=self.df.index, dtype=object)
+        self.df['category_path'] = pd.Series(path, index=self.df.index, dtype=object)
         
         # Handle brand
         if 'brand' in self.df.columns:
-            self.df['brand'] = self.df['brand'].fillna('Unknown')
+            self.df['brand'] = self.df['brand'].fillna('Unknown').astype(str)
         else:
             self.df['brand'] = 'Unknown'
-        self.df['brand'] = self.df['brand'].apply(lambda x: str(x) if pd.notna(x) else 'Unknown')
         
         # Handle description
         if 'description' in self.df.columns:
-            self.df['description'] = self.df['description'].fillna('')
-            self.df['description'] = self.df['description'].apply(self.clean_description)
+            self.df['description'] = self._clean_descriptions(self.df['description'])
         else:
             self.df['description'] = ''
         
-        # Try converting to numeric, but allow missing prices
-        self.df['price'] = pd.to_numeric(self.df.get('price'), errors='coerce')
-
-        # After setting self.df['price']
-        self.df = self.df[self.df['price'] > 0]
-
-
-        
         # Handle images
-        self.df['image_url'] = self.df.apply(self.extract_image_url, axis=1)
+        self.df['image_url'] = self._coalesce_image_urls()
         
         # Handle ratings
         if 'overall' in self.df.columns:
             self.df['rating'] = pd.to_numeric(self.df['overall'], errors='coerce').fillna(4.0)
         else:
             self.df['rating'] = 4.0
-        
-        # Filter fashion-related products only
-        self.df = self.filter_fashion_products()
-        
-        # Create combined text for recommendations
-        self.df['combined_features'] = self.create_combined_features()
-        
-        print(f"✅ Cleaned: {original_count} → {len(self.df)} products")
+        return True
+
+    @span('indexes')
+    def _build_indexes(self):
+        """Build lookup structures over the cleaned catalog"""
+        live = self._live
+        self._live_positions = None if live is None else np.flatnonzero(live)
+        self.n_rows = self._delta_start = len(self.df)
+
+        # Reversed so the first row wins for duplicate ids, like a boolean scan + iloc[0]
+        if 'id' in self.df.columns:
+            ids = self.df['id'].astype(str).to_numpy()
+            positions = np.arange(len(ids)) if live is None else self._live_positions
+            self._id_to_pos = dict(zip(ids[positions][::-1], positions[::-1].tolist()))
+
+        indexed = (len(self.search_index) if self.search_index is not None else 0) + \
+            (len(self._search_delta) if self._search_delta is not None else 0)
+        if self.search_index is None or indexed != len(self.df):
+            logger.info("🔄 Building search index...")
+            self.search_index = InvertedIndex.build(self.df)
+            self._search_delta = None
+            logger.info(f"✅ Indexed {len(self.search_index.terms)} search terms")
+
+        # Detail lookups index these arrays directly instead of slicing the frame
+        self._detail_columns = self._detail_arrays(self.df)
+
+        # Product lists only need card fields; extract those columns once
+        self.cards = CardStore.build(self.df, self._string_columns)
+
+        # Navigation facets and stats are read on every request; aggregate them once
+        self.facets = FacetSummary.build(self.df if live is None else self.df[live])
+
+        # Brand / category filters and featured sampling draw row positions from these
+        self.field_indexes = {
+            column: FieldIndex.build(self.df[column] if live is None else self.df[column].where(live))
+            for column in ('main_category', 'brand') if column in self.df.columns
+        }
+        self.ranking_features = RankingFeatures.build(self.df, self.field_indexes)
+        self._sort_orders = {}
+        if 'rating' in self.df.columns:
+            high_rated = self.df['rating'].to_numpy() >= 4.0
+            self._high_rated = np.flatnonzero(high_rated if live is None else high_rated & live)
+
+    def _detail_arrays(self, df):
+        return [(name, df[name].array) for name in df.columns
+                if name not in DETAIL_EXCLUDED and name not in self._string_columns]
+
+    @reads_catalog
+    def get_position(self, product_id):
+        """Row position (== TF-IDF row, appended rows numbered after the fitted ones) of a product id, or None"""
+        if self._id_index is not None:
+            return self._id_index.get(product_id)
+        key = str(product_id)
+        # An appended row replaces the fitted row of the same id, which is tombstoned
+        position = self._id_delta.get(key) if self._id_delta else None
+        if position is None:
+            position = self._id_to_pos.get(key)
+        if position is not None and self._live is not None and not self._live[position]:
+            return None
+        return position
+
+    @reads_catalog
+    def column(self, name):
+        """Every row's value of a catalog column, whether it lives in df or (mmap) in the string columns"""
+        if name in self._string_columns:
+            return np.array(self._string_columns[name].to_list(), dtype=object)
+        values = self.df[name].to_numpy()
+        if self._df_delta is not None:
+            values = np.concatenate((values, self._df_delta[name].to_numpy()))
+        return values
+
+    @reads_catalog
+    def tfidf_rows(self):
+        """TF-IDF matrix of every row position: the fitted rows, stacked with any appended since"""
+        if self._tfidf_delta is None:
+            return self.tfidf_matrix
+        return sp.vstack([self.tfidf_matrix, self._tfidf_delta], format='csr')
+
+    def _tfidf_vectors(self, positions):
+        """TF-IDF rows at catalog positions, taken from the fitted or the appended matrix"""
+        return stacked_rows(self.tfidf_matrix, self._tfidf_delta, positions)
+
+    def _tfidf_similarities(self, vectors):
+        """Dense cosine similarities of TF-IDF rows to every catalog row"""
+        similarities = (vectors @ self.tfidf_matrix.T).toarray()
+        if self._tfidf_delta is not None:
+            similarities = np.hstack((similarities, (vectors @ self._tfidf_delta.T).toarray()))
+        return similarities
+
+    @reads_catalog
+    def ids(self):
+        """Product id of every row position as a string, deleted rows included"""
+        return pd.Series(self.column('id'), dtype=object).astype(str).to_numpy()
+
+    def _drop_deleted(self, positions):
+        """positions without tombstoned rows"""
+        positions = np.asarray(positions)
+        if self._live is None:
+            return positions
+        return positions[self._live[positions]]
+
+    def _cards(self, positions):
+        """Compact product-card dicts (CARD_FIELDS) for a sequence of row positions"""
+        return self.cards.take(positions)
+
+    def _record(self, position):
+        """Full product detail dict for one row position, read from the column arrays"""
+        record = {}
+        columns, row = self._detail_columns, position
+        if position >= self._delta_start:
+            columns, row = self._detail_delta, position - self._delta_start
+        for name, values in columns:
+            value = values[row]
+            record[name] = value.item() if isinstance(value, np.generic) else value
+        # Memory-mapped string columns are decoded only for the requested row
+        for name, column in self._string_columns.items():
+            record[name] = column[position]
+        return record
     
+    def _split_categories(self, categories):
+        """(main_category, subcategory, category_path) lists from a categories column.
+
+        Columnar equivalent of extract_main_category/extract_subcategory/
+        extract_category_path, walking each nested list once.
+        """
+        n = len(self.df)
+        main, sub, path = [None] * n, [None] * n, [None] * n
+        if categories is None:
+            return main, sub, path
+
+        for i, value in enumerate(categories.tolist()):
+            if not isinstance(value, list) or not value:
+                continue
+            first = value[0]
+            if isinstance(first, list):
+                if first:
+                    main[i] = first[0]
+                if len(first) > 1:
+                    sub[i] = first[1]
+                path[i] = " > ".join(first)
+            elif isinstance(first, str):
+                main[i] = first
+        return main, sub, path
+
+    def _clean_descriptions(self, descriptions):
+        """Columnar clean_description: join lists, strip HTML, collapse whitespace, cap length"""
+        # A single comprehension over the column beats chained .str.replace passes
+        # (each of which is its own per-element loop); split/join collapses whitespace
+        # exactly like re.sub(r'\s+', ' ', ...).strip()
+        cleaned = []
+        for desc in descriptions.tolist():
+            if isinstance(desc, list):
+                desc = ' '.join(str(d) for d in desc if pd.notna(d))
+            elif desc is None or (isinstance(desc, float) and desc != desc):
+                cleaned.append('')
+                continue
+            desc = str(desc)
+            if '<' in desc:
+                desc = HTML_TAG_PATTERN.sub('', desc)
+            cleaned.append(' '.join(desc.split())[:500])
+        return pd.Series(cleaned, index=descriptions.index, dtype=object)
+
+    def _coalesce_image_urls(self):
+        """Columnar extract_image_url: first usable URL across the image columns"""
+        image_url = pd.Series(None, index=self.df.index, dtype=object)
+        for field in ['imUrl', 'imageURL', 'image', 'imageURLHighRes']:
+            if field not in self.df.columns:
+                continue
+            values = self.df[field]
+            kinds = values.map(type)
+            from_lists = values.where(kinds == list).str[0]
+            from_lists = from_lists.where(from_lists.isna(), from_lists.astype(str))
+            strings = values.where(kinds == str)
+            from_strings = strings.where(strings.str.strip().str.len() > 0)
+            image_url = image_url.combine_first(from_lists.combine_first(from_strings))
+
+        return image_url.fillna('https://via.placeholder.com/300x300?text=No+Image')
+
     def extract_main_category(self, row):
         field = 'categories'
         if field in row and isinstance(row[field], list) and len(row[field]) > 0:
@@ -233,8 +702,8 @@ class AmazonFashionRecommender:
         # Fallback placeholder
         return 'https://via.placeholder.com/300x300?text=No+Image'
     
-    def filter_fashion_products(self):
-        """Filter to keep only fashion-related products"""
+    def fashion_mask(self):
+        """Boolean mask of fashion-related rows"""
         fashion_keywords = [
             'clothing', 'shoes', 'jewelry', 'accessories', 'fashion',
             'apparel', 'dress', 'shirt', 'pants', 'jeans', 'jacket',
@@ -244,165 +713,970 @@ class AmazonFashionRecommender:
             'scarf', 'gloves', 'socks', 'underwear', 'bra', 'swimwear'
         ]
         
-        # Create fashion filter
-        fashion_mask = (
+        return (
             self.df['name'].str.lower().str.contains('|'.join(fashion_keywords), na=False) |
             self.df['main_category'].str.lower().str.contains('|'.join(fashion_keywords), na=False) |
             self.df['category_path'].str.lower().str.contains('|'.join(fashion_keywords), na=False)
         )
+
+    @span('filter')
+    def filter_fashion_products(self, fashion_mask=None):
+        """Filter to keep only fashion-related products"""
+        if fashion_mask is None:
+            fashion_mask = self.fashion_mask()
         
         filtered_df = self.df[fashion_mask]
         
         if len(filtered_df) < 100:  # If too few fashion items, keep all
-            print("⚠️ Few fashion items found, keeping all products")
+            logger.warning("⚠️ Few fashion items found, keeping all products")
             return self.df
         
-        print(f"✅ Filtered to {len(filtered_df)} fashion products")
+        logger.info(f"✅ Filtered to {len(filtered_df)} fashion products")
         return filtered_df
     
+    @span('features')
     def create_combined_features(self):
         """Create combined text features for recommendations"""
-        combined = (
-            self.df['name'].astype(str) + ' ' +
-            self.df['brand'].astype(str) + ' ' +
-            self.df['main_category'].astype(str) + ' ' +
-            self.df['subcategory'].astype(str) + ' ' +
-            self.df['description'].astype(str)
+        return self._combined_features(self.df)
+
+    @staticmethod
+    def _combined_features(df):
+        # astype(str) keeps missing values missing under pandas' string dtype
+        return (
+            df['name'].astype(str).fillna('') + ' ' +
+            df['brand'].astype(str).fillna('') + ' ' +
+            df['main_category'].astype(str).fillna('') + ' ' +
+            df['subcategory'].astype(str).fillna('') + ' ' +
+            df['description'].astype(str).fillna('')
         )
-        
-        return combined
     
+    @span('fit')
     def build_recommendation_matrix(self):
         """Build TF-IDF matrix for recommendations"""
         if len(self.df) == 0:
-            print("❌ No data available for building recommendation matrix")
+            logger.error("❌ No data available for building recommendation matrix")
             return
         
-        print("🔄 Building recommendation matrix...")
+        logger.info("🔄 Building recommendation matrix...")
         
         try:
-            self.vectorizer = TfidfVectorizer(
-                max_features=2000,  # Reduced for better performance
-                stop_words='english',
-                ngram_range=(1, 2),
-                min_df=2,
-                max_df=0.8,
-                lowercase=True
-            )
-            
-            self.tfidf_matrix = self.vectorizer.fit_transform(self.df['combined_features'])
-            print(f"✅ Built TF-IDF matrix: {self.tfidf_matrix.shape}")
+            if self.n_jobs > 1:
+                self.vectorizer, self.tfidf_matrix = fit_tfidf_parallel(
+                    self.df['combined_features'], TFIDF_PARAMS, self.n_jobs
+                )
+            else:
+                self.vectorizer = TfidfVectorizer(**TFIDF_PARAMS)
+                self.tfidf_matrix = self.vectorizer.fit_transform(self.df['combined_features'])
+            # Term-major copy so a query only touches the rows of its own terms
+            self._tfidf_by_term = self.tfidf_matrix.T.tocsr()
+            self._fitted_rows = self.tfidf_matrix.shape[0]
+            logger.info(f"✅ Built TF-IDF matrix: {self.tfidf_matrix.shape}")
             
         except Exception as e:
-            print(f"❌ Error building recommendation matrix: {e}")
+            logger.error(f"❌ Error building recommendation matrix: {e}")
             self.tfidf_matrix = None
+
+    @span('coview')
+    def build_coview_graph(self):
+        """Build the co-view / co-purchase graph from the raw 'related' lists, then drop them"""
+        if self.df is None or 'related' not in self.df.columns:
+            return
+        logger.info("🔄 Building co-view graph...")
+        started = time.perf_counter()
+        try:
+            self.coview_graph = CoViewGraph.build(self.df['id'].astype(str).to_numpy(), self.df['related'])
+            stats = self.coview_graph.stats()
+            logger.info(f"✅ Built co-view graph: {stats['edges']} edges over {stats['linked_products']} products, "
+                        f"{format_bytes(stats['bytes'])} in {time.perf_counter() - started:.2f}s")
+        except Exception as e:
+            logger.error(f"❌ Error building co-view graph: {e}")
+            self.coview_graph = None
+        # The raw lists are only needed for the graph and are the heaviest column left
+        self.df = self.df.drop(columns=['related'])
+
+    @property
+    def neighbor_index_path(self):
+        return self._artifact_path('neighbors')
+
+    def _source_fingerprint(self):
+        """Identify the dataset + matrix (and embeddings) a saved neighbor table was built from"""
+        fingerprint = f"{self.catalog_key()}-{self.tfidf_matrix.shape}-{self.tfidf_matrix.nnz}"
+        if self.embeddings is not None:
+            fingerprint += f"-lsa{self.embeddings.dims}{self.embeddings.dtype}"
+        return fingerprint
+
+    @span('embeddings')
+    def build_embeddings(self):
+        """Fit the LSA embeddings used for neighbor similarity"""
+        if self.tfidf_matrix is None:
+            return
+        logger.info(f"🔄 Building {self.embedding_dims}-dim {self.embedding_dtype} embeddings...")
+        try:
+            self.embeddings = EmbeddingIndex.fit(self.tfidf_matrix, self.embedding_dims, self.embedding_dtype)
+            logger.info(f"✅ Built embeddings: {self.embeddings.vectors.shape}, "
+                        f"{self.embeddings.svd.explained_variance_ratio_.sum():.1%} of variance")
+        except Exception as e:
+            logger.error(f"❌ Error building embeddings, using TF-IDF similarity: {e}")
+            self.embeddings = None
+
+    @reads_catalog
+    def embedding_quality_report(self, k=10, sample_size=200, dtypes=EMBEDDING_DTYPES):
+        """Neighbor recall, latency and memory of the embeddings (in each storage dtype) versus raw TF-IDF"""
+        if self.embeddings is None:
+            return []
+        matrix = self.tfidf_rows()
+        return [quality_report(self.embeddings.with_dtype(dtype), matrix, k=k, sample_size=sample_size)
+                for dtype in dtypes]
+
+    def _neighbor_table(self, block_size=1024, fingerprint=''):
+        """Top-n_neighbors table from the embeddings when enabled, else from TF-IDF"""
+        if self.embeddings is not None:
+            indices, scores = self.embeddings.top_k_for_rows(
+                np.arange(len(self.embeddings)), self.n_neighbors, block_size=block_size
+            )
+            return NeighborIndex(indices, scores, fingerprint)
+        return NeighborIndex.build(self.tfidf_matrix, k=self.n_neighbors, block_size=block_size,
+                                   fingerprint=fingerprint)
+
+    @span('neighbors')
+    def build_neighbor_index(self, block_size=1024):
+        """Load or build the top-K neighbor table used by get_recommendations"""
+        if self.tfidf_matrix is None or self.n_neighbors <= 0:
+            return
+
+        fingerprint = self._source_fingerprint()
+        try:
+            mmap_mode = 'r' if self.storage == 'mmap' else None
+            self.neighbor_index = NeighborIndex.load(self.neighbor_index_path, fingerprint, mmap_mode)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not read neighbor table: {e}")
+            self.neighbor_index = None
+        if self.neighbor_index is not None:
+            logger.info(f"✅ Loaded top-{self.neighbor_index.k} neighbor table from {self.neighbor_index_path}")
+            return
+
+        logger.info(f"🔄 Building top-{self.n_neighbors} neighbor table...")
+        self.neighbor_index = self._neighbor_table(block_size, fingerprint)
+        logger.info(f"✅ Built neighbor table: {self.neighbor_index.indices.shape}")
+
+        try:
+            self.neighbor_index.save(self.neighbor_index_path)
+        except OSError as e:
+            logger.warning(f"⚠️ Could not save neighbor table: {e}")
+
+    @span('ann')
+    def build_ann_index(self):
+        """Fit the configured approximate nearest-neighbor backend"""
+        if self.tfidf_matrix is None:
+            return
+
+        logger.info(f"🔄 Building {self.ann_backend} ANN index...")
+        if self.embeddings is not None:
+            logger.warning("⚠️ ANN index is fitted on TF-IDF vectors; recommendations won't use the LSA embeddings")
+        try:
+            self.ann_index = create_ann_index(self.ann_backend, **self.ann_params)
+            self.ann_index.fit(self.tfidf_matrix)
+            logger.info(f"✅ Built {self.ann_index.name} ANN index over {self.tfidf_matrix.shape[0]} products")
+        except Exception as e:
+            logger.error(f"❌ Error building ANN index, using exact similarity: {e}")
+            self.ann_index = None
+
+    @reads_catalog
+    def ann_recall_report(self, k=10, sample_size=200):
+        """Recall@k and latency of the ANN backend versus brute-force cosine"""
+        if self.ann_index is None:
+            return {}
+        return recall_report(self.ann_index, self.tfidf_matrix, k=k, sample_size=sample_size)
+
+    def _compute_neighbors(self, position, n):
+        """On-demand cosine neighbors for rows the precomputed table can't answer"""
+        if self.ann_index is not None:
+            # Rows appended after the ANN fit are queried by vector
+            extra = 0 if self._live is None else len(self._live) - len(self._live_positions)
+            similar = self.ann_index.query_vector(self._tfidf_vectors([position]), n + extra, exclude=position)
+            return self._drop_deleted(similar)[:n]
+
+        similarities = self._similarity_row(position)
+        similarities[position] = -np.inf
+        if self._live is not None:
+            similarities[~self._live] = -np.inf
+        return select_top_k(similarities, n)[0]
+
+    def _similarity_row(self, position):
+        """Cosine similarity of one row to every row, in the embedding space when enabled"""
+        if self.embeddings is not None:
+            return self.embeddings.scores(self.embeddings.decode([position]))[0]
+        # TF-IDF rows are L2-normalized, so the dot product is the cosine similarity
+        return self._tfidf_similarities(self._tfidf_vectors([position])).ravel()
+
+    def _pairwise_similarities(self, positions):
+        """Dense cosine similarity matrix between the given rows"""
+        if self.embeddings is not None:
+            vectors = self.embeddings.decode(positions)
+            return vectors @ vectors.T
+        vectors = self._tfidf_vectors(positions)
+        return (vectors @ vectors.T).toarray()
+
+    def _pair_similarities(self, anchors, positions):
+        """Cosine similarity of each (anchors[i], positions[i]) pair of rows"""
+        anchor_rows, inverse = np.unique(anchors, return_inverse=True)
+        if self.embeddings is not None:
+            vectors = self.embeddings.decode(positions)
+            if len(anchor_rows) == 1:
+                return vectors @ self.embeddings.decode(anchor_rows)[0]
+            return np.einsum('ij,ij->i', vectors, self.embeddings.decode(anchor_rows)[inverse])
+        if len(anchor_rows) == 1:
+            return (self._tfidf_vectors(positions) @ self._tfidf_vectors(anchor_rows).T).toarray().ravel()
+        pairs = self._tfidf_vectors(anchors).multiply(self._tfidf_vectors(positions))
+        return np.asarray(pairs.sum(axis=1)).ravel()
+
+    def _coview_neighbors(self, position):
+        """(positions, strengths in [0, 1]) of live products co-viewed / co-bought with a row"""
+        if self.coview_graph is None:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+        positions, strengths = self.coview_graph.neighbors(position)
+        if self._live is not None and len(positions):
+            keep = self._live[positions]
+            positions, strengths = positions[keep], strengths[keep]
+        return positions, strengths
+
+    def _blend_coview(self, position, similar, n):
+        """Content neighbors merged with co-view neighbors, re-scored as a coview_weight blend"""
+        return self._blend_coview_rows([position], [similar], n)[0]
+
+    def _blend_coview_rows(self, positions, similar_lists, n):
+        """_blend_coview for many rows, scoring the (row, candidate) pairs of all of them at once"""
+        if self.coview_weight <= 0 or self.coview_graph is None:
+            return list(similar_lists)
+        pools = {}
+        for i, (position, similar) in enumerate(zip(positions, similar_lists)):
+            linked, strengths = self._coview_neighbors(position)
+            if len(linked):
+                pools[i] = (np.union1d(similar, linked), linked, strengths)
+        blended = list(similar_lists)
+        if not pools:
+            return blended
+
+        sizes = [len(candidates) for candidates, _, _ in pools.values()]
+        anchors = np.repeat([positions[i] for i in pools], sizes)
+        similarities = self._pair_similarities(anchors, np.concatenate([c for c, _, _ in pools.values()]))
+        offsets = np.cumsum([0] + sizes)
+        for row, (i, (candidates, linked, strengths)) in enumerate(pools.items()):
+            scores = (1 - self.coview_weight) * similarities[offsets[row]:offsets[row + 1]]
+            scores[np.searchsorted(candidates, linked)] += self.coview_weight * strengths
+            blended[i] = candidates[select_top_k(scores, n)[0]]
+        return blended
+
+    RANKING_POOL = 100
+
+    def _ranking_weights(self, weights=None):
+        """resolve_weights with the co-view default taken from coview_weight, as in the unranked blend"""
+        return resolve_weights({'coview': self.coview_weight, **(weights or {})})
+
+    def _ranked_neighbors(self, position, n, weights=None, min_price=None, max_price=None,
+                          exclude_brands=None, diversity=0.0, pool=None):
+        """n neighbors re-ranked by RankingFeatures from the top-pool most similar rows.
+
+        Price and brand constraints mask rows before the pool is cut, so the
+        pool only holds eligible products and is never post-filtered short.
+        """
+        eligible = self.ranking_features.eligible(self._live, min_price, max_price)
+        eligible[position] = False
+        if exclude_brands and 'brand' in self.field_indexes:
+            for brand in exclude_brands:
+                eligible[self.field_indexes['brand'].lookup(brand, 'exact')] = False
+
+        similarities = self._similarity_row(position)
+        similarities[~eligible] = -np.inf
+        candidates = select_top_k(similarities, max(pool or self.RANKING_POOL, n))[0]
+        candidates = candidates[np.isfinite(similarities[candidates])]
+
+        # Eligible co-view neighbors join the pool even when their text is dissimilar
+        weights = self._ranking_weights(weights)
+        coview = None
+        linked, strengths = self._coview_neighbors(position)
+        if weights['coview'] and len(linked):
+            keep = eligible[linked]
+            linked, strengths = linked[keep], strengths[keep]
+            candidates = np.union1d(candidates, linked)
+            coview = np.zeros(len(candidates), dtype=np.float32)
+            coview[np.searchsorted(candidates, linked)] = strengths
+
+        scores = self.ranking_features.fuse(position, candidates, similarities[candidates], weights, coview)
+        pairwise = self._pairwise_similarities(candidates) if diversity > 0 else None
+        return candidates[mmr_order(scores, pairwise, n, diversity)]
+
+    def _table_neighbors(self, position, n):
+        """n live neighbors from the precomputed table, or None if it can't answer"""
+        if self.neighbor_index is None:
+            return None
+        if self._live is None:
+            return self.neighbor_index.lookup(position, n)
+        if n > self.neighbor_index.k:
+            return None
+        similar = self.neighbor_index.lookup(position, self.neighbor_index.k)
+        if similar is None:
+            return None
+        similar = self._drop_deleted(similar)[:n]
+        return similar if len(similar) == n else None
     
+    # An upsert that only changes these fields is applied in place; a change to
+    # TEXT_FIELDS (the TF-IDF input) re-vectorizes the product
+    IN_PLACE_FIELDS = ('price', 'rating', 'image_url')
+    TEXT_FIELDS = ('name', 'brand', 'main_category', 'subcategory', 'description')
+
+    def _require_updatable(self):
+        if self.storage == 'mmap':
+            raise RuntimeError("Catalog updates need storage='memory'; mapped snapshots are read-only")
+        catalog = self._catalog
+        if catalog.tfidf_matrix is None or catalog.vectorizer is None:
+            raise RuntimeError("No fitted catalog to update")
+
+    @classmethod
+    def _clean_records(cls, records):
+        """Standardized rows with combined_features for raw product records (fashion filter not applied)"""
+        staged = cls.__new__(cls)
+        staged.df = pd.DataFrame([r for r in (project_record(record) for record in records) if r is not None])
+        if len(staged.df) == 0 or not staged._standardize_columns():
+            return pd.DataFrame()
+        staged.df['combined_features'] = staged.create_combined_features()
+        return staged.df.drop_duplicates('id', keep='last').reset_index(drop=True)
+
+    def _copy(self):
+        """Shallow copy of this catalog to stage changes on"""
+        staged = copy.copy(self)
+        staged._sort_orders = dict(self._sort_orders)
+        staged._catalog = staged
+        return staged
+
+    def _staged(self, staged):
+        """Version staged (a catalog derived from this one) as the next update"""
+        base = self._base_version or self.catalog_key()
+        staged._base_version = base
+        staged._update_seq = self._update_seq + 1
+        staged.catalog_version = f"{base}+u{staged._update_seq}"
+        staged._live_positions = None if staged._live is None else np.flatnonzero(staged._live)
+        staged._catalog = staged
+        return staged
+
+    def _rows_at(self, positions):
+        """Frame of the catalog rows at positions (fitted rows first, then appended ones)"""
+        positions = np.asarray(positions, dtype=np.int64)
+        appended = positions >= self._delta_start
+        frames = [self.df.iloc[positions[~appended]]]
+        if appended.any():
+            frames.append(self._df_delta.iloc[positions[appended] - self._delta_start])
+        return pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0].reset_index(drop=True)
+
+    def _live_prices(self):
+        prices = np.asarray(self.column('price'), dtype=np.float64)
+        return prices if self._live is None else prices[self._live]
+
+    def _edit_rows(self, positions, rows):
+        """Write IN_PLACE_FIELDS of rows over the staged rows at positions"""
+        fields = [f for f in self.IN_PLACE_FIELDS if f in self.df.columns and f in rows.columns]
+        positions = np.asarray(positions, dtype=np.int64)
+        before = self._rows_at(positions)
+        appended = positions >= self._delta_start
+        for name, where, offset in (('df', ~appended, 0), ('_df_delta', appended, self._delta_start)):
+            if not where.any():
+                continue
+            # The shallow copy shares column buffers with the published frame;
+            # give the edited columns their own before writing into them
+            frame = getattr(self, name).copy(deep=False)
+            for field in fields:
+                column = frame[field].to_numpy(copy=True)
+                column[positions[where] - offset] = rows[field].to_numpy()[where]
+                frame[field] = column
+            setattr(self, name, frame)
+
+        if not appended.all():
+            self.cards = self.cards.updated(positions[~appended], rows[fields][~appended])
+            self._detail_columns = self._detail_arrays(self.df)
+        if appended.any():
+            self._detail_delta = self._detail_arrays(self._df_delta)
+            self.cards = self.cards.with_appended(CardStore.build(self._df_delta))
+
+        after = self._rows_at(positions)
+        order = np.concatenate((positions[~appended], positions[appended]))
+        self.ranking_features = self.ranking_features.updated(self.field_indexes, order, after)
+        self.facets = self.facets.updated(added=after, removed=before, prices=self._live_prices)
+        for sort, sort_order in self._sort_orders.items():
+            if self.SORT_COLUMNS[sort] in fields:
+                self._sort_orders[sort] = sort_order.rekey(
+                    order, self._sort_keys(sort, after[self.SORT_COLUMNS[sort]])
+                )
+        if 'rating' in fields:
+            high_rated = self._high_rated[~np.isin(self._high_rated, order)]
+            added = np.sort(order[after['rating'].to_numpy(dtype=np.float64) >= 4.0])
+            self._high_rated = np.insert(high_rated, np.searchsorted(high_rated, added), added)
+
+    def _drop_rows(self, positions):
+        """Tombstone the staged rows at positions"""
+        removed = self._rows_at(positions)
+        live = np.ones(self.n_rows, dtype=bool) if self._live is None else self._live.copy()
+        live[positions] = False
+        self._live = live
+        self.field_indexes = {column: index.drop(positions) for column, index in self.field_indexes.items()}
+        self.ranking_features = self.ranking_features.updated(self.field_indexes)
+        self.facets = self.facets.updated(removed=removed, prices=self._live_prices)
+        self._high_rated = self._high_rated[live[self._high_rated]]
+
+    def _append_rows(self, rows):
+        """Vectorize cleaned rows with the fitted vocabulary and add them after the staged rows"""
+        texts = rows['combined_features'].tolist()
+        matrix = self.vectorizer.transform(texts)
+        self._tfidf_delta = matrix if self._tfidf_delta is None else \
+            sp.vstack([self._tfidf_delta, matrix], format='csr')
+        if self.embeddings is not None:
+            self.embeddings = self.embeddings.extend(matrix)
+
+        # Keep the catalog's columns (snapshots drop combined_features; refit recomputes it)
+        rows = rows.reindex(columns=self.df.columns)
+        start = self.n_rows
+        self._df_delta = rows if self._df_delta is None else pd.concat([self._df_delta, rows], ignore_index=True)
+        self.n_rows = start + len(rows)
+        if self._live is not None:
+            self._live = np.concatenate((self._live, np.ones(len(rows), dtype=bool)))
+        positions = np.arange(start, self.n_rows)
+        self._id_delta = {**self._id_delta, **dict(zip(rows['id'].astype(str), positions.tolist()))}
+
+        # Appended rows get their own small search segment, rebuilt per update
+        self._search_delta = InvertedIndex.build(self._df_delta, **{
+            k: v for k, v in self.search_index.params().items() if k != 'n_docs'
+        })
+        self._detail_delta = self._detail_arrays(self._df_delta)
+        self.cards = self.cards.with_appended(CardStore.build(self._df_delta))
+        self.field_indexes = {column: index.extend(rows[column]) for column, index in self.field_indexes.items()}
+        self.ranking_features = self.ranking_features.updated(self.field_indexes, appended=rows)
+        self.facets = self.facets.updated(added=rows)
+        for sort, sort_order in self._sort_orders.items():
+            self._sort_orders[sort] = sort_order.extend(self._sort_keys(sort, rows[self.SORT_COLUMNS[sort]]))
+        if 'rating' in rows.columns:
+            high_rated = positions[rows['rating'].to_numpy(dtype=np.float64) >= 4.0]
+            self._high_rated = np.concatenate((self._high_rated, high_rated))
+
+        if self._drift is None:
+            fitted_texts = self.df['combined_features'] if 'combined_features' in self.df.columns \
+                else self._combined_features(self.df)
+            self._drift = VocabularyDrift(self.vectorizer, fitted_texts)
+        self._drift.observe(texts)
+
+    def _upserted(self, rows):
+        """(new catalog, summary) with cleaned rows upserted; this catalog is left untouched"""
+        summary = {'added': 0, 'updated': 0, 'repriced': 0}
+        if len(rows) == 0:
+            return self, summary
+
+        appended, edited, replaced = [], {}, []
+        for i, product_id in enumerate(rows['id'].astype(str)):
+            position = self.get_position(product_id)
+            if position is None:
+                appended.append(i)
+                summary['added'] += 1
+                continue
+            current = self._record(position)
+            if all(str(current.get(f)) == str(rows.at[i, f]) for f in self.TEXT_FIELDS):
+                edited[position] = i
+                summary['repriced'] += 1
+            else:
+                # Text changed: tombstone the old row and append a re-vectorized one
+                replaced.append(position)
+                appended.append(i)
+                summary['updated'] += 1
+
+        staged = self._copy()
+        if edited:
+            staged._edit_rows(list(edited), rows.iloc[list(edited.values())].reset_index(drop=True))
+        if replaced:
+            staged._drop_rows(replaced)
+        if appended:
+            staged._append_rows(rows.iloc[appended].reset_index(drop=True))
+        if staged._live is not None and staged._live.all():
+            staged._live = None
+        staged._changed_rows = self._changed_rows + summary['added'] + 2 * summary['updated']
+        return self._staged(staged), summary
+
+    def _deleted(self, product_ids):
+        """(new catalog, number found) with products tombstoned; this catalog is left untouched"""
+        positions = [p for p in (self.get_position(pid) for pid in product_ids) if p is not None]
+        if not positions:
+            return self, 0
+        staged = self._copy()
+        staged._drop_rows(sorted(set(positions)))
+        staged._changed_rows = self._changed_rows + len(positions)
+        return self._staged(staged), len(positions)
+
+    @timed
+    def upsert_products(self, records):
+        """Add or update products, matched by asin, from raw records with the dataset's fields.
+
+        New products, and products whose text changed, are vectorized with the
+        fitted vocabulary and appended (the old row is tombstoned); price,
+        rating or image-only changes are applied in place. Appended rows are
+        kept apart from the fitted ones (frame, TF-IDF rows, search segment,
+        id map) until a refit folds them in, and the other indexes are updated
+        from the changed rows only, so an upsert costs little more than its own
+        rows. Changes are staged on a copy of the catalog that is published
+        with one reference swap, so readers see either the old or the new
+        catalog. Upserted products skip the fashion filter. Returns counts of
+        added, updated and repriced products.
+        """
+        self._require_updatable()
+        rows = self._clean_records(records)
+        with self._update_lock:
+            catalog, summary = self._catalog._upserted(rows)
+            self._publish(catalog)
+            if self._replay is not None:
+                self._replay.append(('upsert', rows))
+        summary['refit_started'] = self._maybe_refit()
+        return summary
+
+    @timed
+    def delete_products(self, product_ids):
+        """Tombstone products by id; returns how many were found"""
+        self._require_updatable()
+        product_ids = [str(pid) for pid in product_ids]
+        with self._update_lock:
+            catalog, deleted = self._catalog._deleted(product_ids)
+            self._publish(catalog)
+            if self._replay is not None:
+                self._replay.append(('delete', product_ids))
+        self._maybe_refit()
+        return deleted
+
+    def update_stats(self):
+        """Incremental-update state: rows, tombstones, drift and whether a refit is running"""
+        catalog = self._catalog
+        deleted = 0 if catalog._live is None else len(catalog._live) - len(catalog._live_positions)
+        return {
+            'rows': catalog.n_rows,
+            'deleted': deleted,
+            'appended': 0 if catalog._df_delta is None else len(catalog._df_delta),
+            'changed_rows': catalog._changed_rows,
+            'fitted_rows': catalog._fitted_rows,
+            'drift': catalog._drift.stats() if catalog._drift is not None else None,
+            'refit_running': self._refit_thread is not None and self._refit_thread.is_alive(),
+            'version': catalog.catalog_version
+        }
+
+    def _maybe_refit(self):
+        """Start a background refit when vocabulary drift or churn crosses the thresholds"""
+        if self.refit_threshold is None:
+            return False
+        if self._refit_thread is not None and self._refit_thread.is_alive():
+            return False
+        catalog = self._catalog
+        drifted = catalog._drift is not None and catalog._drift.docs >= 20 \
+            and catalog._drift.excess >= self.refit_threshold
+        churned = catalog._changed_rows >= self.refit_changed_fraction * max(catalog._fitted_rows, 1)
+        if not (drifted or churned):
+            return False
+        self._refit_thread = threading.Thread(target=self.refit, name='catalog-refit', daemon=True)
+        self._refit_thread.start()
+        return True
+
+    @span('refit')
+    def refit(self):
+        """Refit TF-IDF on the live catalog, rebuild every index and swap it in.
+
+        Tombstoned rows are dropped. Updates that arrive while the refit runs
+        go to the current catalog as usual and are replayed onto the refitted
+        one just before the swap.
+        """
+        with self._update_lock:
+            self._replay = []
+            catalog = self._catalog
+        df = catalog.df if catalog._df_delta is None else pd.concat([catalog.df, catalog._df_delta], ignore_index=True)
+        df = (df if catalog._live is None else df[catalog._live]).reset_index(drop=True).copy()
+        # Graph edges follow their rows to the compacted positions
+        coview = None if catalog.coview_graph is None else catalog.coview_graph.take(
+            np.arange(catalog.n_rows) if catalog._live is None else catalog._live_positions, catalog.n_rows
+        )
+        logger.info(f"🔄 Refitting catalog of {len(df)} products after incremental updates...")
+
+        try:
+            staged = catalog._copy()
+            staged.__dict__.update(
+                df=df, tfidf_matrix=None, _tfidf_by_term=None, _live=None, search_index=None,
+                _df_delta=None, _tfidf_delta=None, _search_delta=None, _id_delta={}, _detail_delta=[],
+                neighbor_index=None, ann_index=None, embeddings=None, coview_graph=coview, _drift=None,
+                _changed_rows=0
+            )
+            staged.df['combined_features'] = staged.create_combined_features()
+            staged.build_recommendation_matrix()
+            if staged.tfidf_matrix is None:
+                raise RuntimeError("TF-IDF refit failed")
+            staged._build_indexes()
+            if staged.embedding_dims:
+                staged.build_embeddings()
+            if staged.ann_backend:
+                staged.build_ann_index()
+            elif staged.n_neighbors > 0:
+                # Kept in memory only: the table on disk belongs to the source dataset
+                staged.neighbor_index = staged._neighbor_table()
+        except Exception as e:
+            with self._update_lock:
+                self._replay = None
+            logger.error(f"❌ Refit failed, keeping the incrementally updated catalog: {e}")
+            return False
+
+        with self._update_lock:
+            for operation, payload in self._replay:
+                if operation == 'upsert':
+                    staged, _ = staged._upserted(payload)
+                else:
+                    staged, _ = staged._deleted(payload)
+            self._publish(self._catalog._staged(staged))
+            self._replay = None
+        logger.info(f"✅ Refitted catalog: {staged.tfidf_matrix.shape}")
+        return True
+
+    @timed
+    @reads_catalog
     def get_product_by_id(self, product_id):
         """Get product by ID"""
         try:
             if self.df is None or len(self.df) == 0:
                 return None
                 
-            product = self.df[self.df['id'] == product_id]
-            if len(product) > 0:
-                return product.iloc[0].to_dict()
+            position = self.get_position(product_id)
+            if position is not None:
+                return self._record(position)
             return None
         except Exception as e:
-            print(f"Error getting product {product_id}: {e}")
+            logger.error("Error getting product %s: %s", product_id, e)
+            CALL_ERRORS.inc(method='get_product_by_id')
             return None
     
+    @reads_catalog
     def get_product_by_index(self, index):
         """Get product by index"""
-        if self.df is not None and 0 <= index < len(self.df):
-            return self.df.iloc[index].to_dict()
+        if self.df is not None and 0 <= index < self.n_rows and (self._live is None or self._live[index]):
+            return self._record(index)
         return None
     
+    @reads_catalog
+    def filter_positions(self, category=None, brand=None, match='contains'):
+        """Row positions matching the category / brand filters (None = no filter)"""
+        filters = []
+        if category:
+            filters.append(self.field_indexes['main_category'].lookup(category, match))
+        if brand and brand != 'Unknown':
+            filters.append(self.field_indexes['brand'].lookup(brand, match))
+        if not filters:
+            return None
+        return intersect_positions(*filters)
+
+    @timed
+    @reads_catalog
     def get_random_products(self, n=12, category=None, brand=None):
         """Get random products with filtering"""
         if self.df is None or len(self.df) == 0:
             return []
         
         try:
-            filtered_df = self.df.copy()
-            
-            if category:
-                filtered_df = filtered_df[
-                    filtered_df['main_category'].str.lower().str.contains(category.lower(), na=False)
-                ]
-            
-            if brand and brand != 'Unknown':
-                filtered_df = filtered_df[
-                    filtered_df['brand'].str.lower().str.contains(brand.lower(), na=False)
-                ]
-            
-            sample_size = min(n, len(filtered_df))
-            if sample_size > 0:
-                return filtered_df.sample(n=sample_size).to_dict('records')
+            positions = self.filter_positions(category, brand)
+            if positions is not None and len(positions) > 0:
+                return self._cards(sample_positions(positions, n))
             else:
-                # Fallback to any products
-                return self.df.sample(n=min(n, len(self.df))).to_dict('records')
+                # No filter, or fallback to any products
+                live = self.n_rows if self._live_positions is None else self._live_positions
+                return self._cards(sample_positions(live, n))
                 
         except Exception as e:
-            print(f"Error getting random products: {e}")
+            logger.error("Error getting random products: %s", e)
+            CALL_ERRORS.inc(method='get_random_products')
             return []
     
-    def get_recommendations(self, product_id, n_recommendations=6):
-        """Get content-based recommendations"""
+    @timed
+    @reads_catalog
+    def get_recommendations(self, product_id, n_recommendations=6, weights=None, min_price=None,
+                            max_price=None, exclude_brands=None, diversity=0.0):
+        """Get content-based recommendations.
+
+        Passing weights (see ranking.DEFAULT_WEIGHTS), a price range, brands to
+        exclude or an MMR diversity in [0, 1] re-ranks a pool of similar
+        products by price proximity, rating and brand / category affinity
+        instead of text similarity alone.
+        """
+        if weights is not None:
+            weights = self._ranking_weights(weights)
         if self.tfidf_matrix is None or self.df is None or len(self.df) == 0:
-            print("No recommendation matrix available, returning random products")
+            logger.warning("No recommendation matrix available, returning random products")
             return self.get_random_products(n_recommendations)
         
         try:
-            product_indices = self.df[self.df['id'] == product_id].index
-            if len(product_indices) == 0:
-                print(f"Product {product_id} not found, returning random products")
+            product_idx = self.get_position(product_id)
+            if product_idx is None:
+                logger.debug("Product %s not found, returning random products", product_id)
                 return self.get_random_products(n_recommendations)
             
-            product_idx = product_indices[0]
-            
-            # Calculate similarities
-            cosine_similarities = cosine_similarity(
-                self.tfidf_matrix[product_idx:product_idx+1], 
-                self.tfidf_matrix
-            ).flatten()
-            
-            # Get most similar products (excluding the product itself)
-            similar_indices = cosine_similarities.argsort()[::-1][1:n_recommendations+1]
+            if weights is not None or min_price is not None or max_price is not None \
+                    or exclude_brands or diversity > 0:
+                similar_indices = self._ranked_neighbors(product_idx, n_recommendations, weights, min_price,
+                                                         max_price, exclude_brands, diversity)
+                NEIGHBOR_LOOKUPS.inc(source='ranked')
+                return self._cards(similar_indices)
+
+            # Precomputed table is an O(K) lookup; fall back to a single cosine pass
+            similar_indices = self._table_neighbors(product_idx, n_recommendations)
+            if similar_indices is None:
+                similar_indices = self._compute_neighbors(product_idx, n_recommendations)
+                NEIGHBOR_LOOKUPS.inc(source='ann' if self.ann_index is not None else 'computed')
+            else:
+                NEIGHBOR_LOOKUPS.inc(source='table')
+            similar_indices = self._blend_coview(product_idx, similar_indices, n_recommendations)
             
-            recommendations = self.df.iloc[similar_indices].to_dict('records')
-            print(f"✅ Generated {len(recommendations)} recommendations for {product_id}")
+            recommendations = self._cards(similar_indices)
+            logger.debug("Generated %d recommendations for %s", len(recommendations), product_id)
             return recommendations
             
         except Exception as e:
-            print(f"Error getting recommendations for {product_id}: {e}")
+            logger.error("Error getting recommendations for %s: %s", product_id, e)
+            CALL_ERRORS.inc(method='get_recommendations')
             return self.get_random_products(n_recommendations)
     
-    def search_products(self, query, n_results=12):
-        """Search products by query"""
+    @timed
+    @reads_catalog
+    def get_recommendations_batch(self, product_ids, n_recommendations=6):
+        """Recommendations for many products at once, as {product_id: [cards]}.
+
+        Rows the precomputed table can answer are looked up; the rest are
+        scored together, a block of rows per sparse matrix product, with a
+        vectorized top-K. Unknown ids map to an empty list.
+        """
+        results = {product_id: [] for product_id in product_ids}
+        if self.tfidf_matrix is None or self.df is None or len(self.df) == 0:
+            return results
+
+        positions = {}
+        for product_id in results:
+            position = self.get_position(product_id)
+            if position is not None:
+                positions[product_id] = int(position)
+
+        neighbors = {}
+        for position in set(positions.values()):
+            similar = self._table_neighbors(position, n_recommendations)
+            if similar is not None:
+                neighbors[position] = similar
+                NEIGHBOR_LOOKUPS.inc(source='table')
+            elif self.ann_index is not None:
+                neighbors[position] = self._compute_neighbors(position, n_recommendations)
+                NEIGHBOR_LOOKUPS.inc(source='ann')
+
+        pending = np.array(sorted(set(positions.values()) - set(neighbors)), dtype=np.int64)
+        if len(pending):
+            excluded = None if self._live is None else ~self._live
+            if self.embeddings is not None:
+                indices, _ = self.embeddings.top_k_for_rows(pending, n_recommendations, excluded=excluded)
+            else:
+                indices, _ = compute_top_k_for_rows(self.tfidf_matrix, pending, n_recommendations,
+                                                    matrix_t=self._tfidf_by_term, excluded=excluded,
+                                                    appended=self._tfidf_delta)
+            neighbors.update(zip(pending.tolist(), indices))
+            NEIGHBOR_LOOKUPS.inc(len(pending), source='computed')
+
+        rows = list(set(positions.values()))
+        blended = dict(zip(rows, self._blend_coview_rows(rows, [neighbors[row] for row in rows], n_recommendations)))
+        for product_id, position in positions.items():
+            results[product_id] = self._cards(blended[position])
+        logger.debug("Generated recommendations for %d/%d products", len(positions), len(results))
+        return results
+
+    SEARCH_MODES = ('keyword', 'semantic', 'hybrid')
+
+    def _keyword_search(self, query, n, operator='and'):
+        """Top-n (positions, BM25 scores) over the fitted index and the segment of appended rows"""
+        deleted = 0 if self._live is None else len(self._live) - len(self._live_positions)
+        positions, scores = self.search_index.search(query, n + deleted, operator=operator)
+        if self._search_delta is not None:
+            delta_positions, delta_scores = self._search_delta.search(query, n, operator=operator)
+            positions = np.concatenate((positions, delta_positions + self._delta_start))
+            scores = np.concatenate((scores, delta_scores))
+        if self._live is not None:
+            keep = self._live[positions]
+            positions, scores = positions[keep], scores[keep]
+        top = select_top_k(scores, n)[0]
+        return positions[top], scores[top]
+
+    def _semantic_scores(self, query):
+        """(positions, cosine scores) of products sharing TF-IDF terms with the query"""
+        query_vector = self.vectorizer.transform([query])
+        scores = (query_vector @ self._tfidf_by_term).tocsr()
+        positions, scores = scores.indices, scores.data
+        if self._tfidf_delta is not None:
+            appended = (query_vector @ self._tfidf_delta.T).tocsr()
+            positions = np.concatenate((positions, appended.indices + self._delta_start))
+            scores = np.concatenate((scores, appended.data))
+        if self._live is not None:
+            keep = self._live[positions]
+            positions, scores = positions[keep], scores[keep]
+        return positions, scores
+
+    def _semantic_matches(self, query, keyword_weight=0.0, operator='and', pool=100):
+        """(positions, scores) by TF-IDF cosine, optionally blended with the top-pool BM25 keyword scores"""
+        positions, scores = self._semantic_scores(query)
+        if len(scores):
+            scores = scores / scores.max()
+
+        if keyword_weight > 0:
+            kw_positions, kw_scores = self._keyword_search(query, pool, operator=operator)
+            if len(kw_scores):
+                kw_scores = kw_scores / kw_scores.max()
+            positions, inverse = np.unique(np.concatenate((positions, kw_positions)), return_inverse=True)
+            scores = np.bincount(inverse, weights=np.concatenate((
+                (1 - keyword_weight) * scores, keyword_weight * kw_scores
+            )))
+
+        return positions, scores
+
+    def _semantic_search(self, query, n_results, keyword_weight=0.0, operator='and'):
+        """Top positions by TF-IDF cosine, optionally blended with the BM25 keyword score"""
+        positions, scores = self._semantic_matches(query, keyword_weight, operator, pool=max(n_results * 5, 100))
+        return positions[select_top_k(scores, n_results)[0]]
+
+    @timed
+    @reads_catalog
+    def search_products(self, query, n_results=12, operator='and', mode='keyword', keyword_weight=0.5):
+        """Search products by query.
+
+        mode='keyword' ranks by BM25 over name/brand/category/description:
+        multi-word queries require every word unless they contain OR (or
+        operator='or'); 'term*' and the last word also match as prefixes.
+        mode='semantic' ranks by TF-IDF cosine using the recommendation
+        vectorizer, and mode='hybrid' blends the two with keyword_weight.
+        """
         if self.df is None or len(self.df) == 0:
             return []
         
         try:
-            query = query.lower().strip()
+            query = query.strip()
             if not query:
                 return self.get_random_products(n_results)
             
-            # Multi-field search
-            mask = (
-                self.df['name'].str.lower().str.contains(query, na=False) |
-                self.df['brand'].str.lower().str.contains(query, na=False) |
-                self.df['main_category'].str.lower().str.contains(query, na=False) |
-                self.df['subcategory'].str.lower().str.contains(query, na=False) |
-                self.df['description'].str.lower().str.contains(query, na=False)
-            )
-            
-            results = self.df[mask].head(n_results)
-            return results.to_dict('records')
+            if mode != 'keyword' and self.vectorizer is not None:
+                weight = keyword_weight if mode == 'hybrid' else 0.0
+                positions = self._semantic_search(query, n_results, weight, operator)
+            else:
+                positions, _ = self._keyword_search(query, n_results, operator=operator)
+            return self._cards(positions)
             
         except Exception as e:
-            print(f"Error searching for '{query}': {e}")
+            logger.error("Error searching for %r: %s", query, e)
+            CALL_ERRORS.inc(method='search_products')
             return []
     
+    SORT_KEYS = ('relevance', 'price_low', 'price_high', 'rating', 'name')
+
+    # Catalog column each sort key orders by
+    SORT_COLUMNS = {'price_low': 'price', 'price_high': 'price', 'rating': 'rating', 'name': 'name'}
+
+    @classmethod
+    def _sort_keys(cls, sort, values):
+        """Ascending sort keys of a SORT_KEYS order from its column's values"""
+        if sort == 'name':
+            return pd.Series(values, dtype=object).fillna('').str.lower().to_numpy()
+        keys = np.asarray(values, dtype=np.float64)
+        return keys if sort == 'price_low' else -keys
+
+    def _sort_order(self, sort):
+        """SortOrder of every row under a sort key, built on first use"""
+        if sort not in self._sort_orders:
+            self._sort_orders[sort] = SortOrder.build(self._sort_keys(sort, self.column(self.SORT_COLUMNS[sort])))
+        return self._sort_orders[sort]
+
+    def _value_mask(self, column, value):
+        mask = np.zeros(self.n_rows, dtype=bool)
+        mask[self.field_indexes[column].lookup(value, 'exact')] = True
+        return mask
+
+    @timed
+    @reads_catalog
+    def search(self, query='', category=None, brand=None, min_price=None, max_price=None,
+               min_rating=None, sort='relevance', offset=0, limit=24, mode='keyword', operator='and',
+               keyword_weight=0.5):
+        """Filtered, sorted, paginated search over the full matching set.
+
+        category and brand match exactly (case-insensitive). sort is one of
+        SORT_KEYS; 'relevance' orders by query score, or catalog order when
+        there is no query. Returns a dict with the page of 'results', the
+        'total' number of matches and 'facets': category / brand counts
+        (each ignoring its own filter) and the matching price range.
+        """
+        if sort not in self.SORT_KEYS:
+            raise ValueError(f"sort must be one of {self.SORT_KEYS}, got {sort!r}")
+        offset, limit = max(int(offset), 0), max(int(limit), 0)
+        response = {'results': [], 'total': 0, 'offset': offset, 'limit': limit, 'sort': sort,
+                    'facets': {'categories': [], 'brands': [], 'price_range': {'min': 0, 'max': 0}}}
+        if self.df is None or len(self.df) == 0:
+            return response
+
+        n = self.n_rows
+        query = (query or '').strip()
+        scores = None
+        if query:
+            if mode != 'keyword' and self.vectorizer is not None:
+                weight = keyword_weight if mode == 'hybrid' else 0.0
+                positions, matched_scores = self._semantic_matches(query, weight, operator, pool=n)
+            else:
+                positions, matched_scores = self._keyword_search(query, n, operator=operator)
+            base = np.zeros(n, dtype=bool)
+            base[positions] = True
+            scores = np.zeros(n)
+            scores[positions] = matched_scores
+        else:
+            base = np.ones(n, dtype=bool) if self._live is None else self._live.copy()
+
+        prices = np.asarray(self.column('price'), dtype=np.float64)
+        if min_price is not None:
+            base &= prices >= min_price
+        if max_price is not None:
+            base &= prices <= max_price
+        if min_rating is not None:
+            base &= np.asarray(self.column('rating'), dtype=np.float64) >= min_rating
+
+        category_mask = self._value_mask('main_category', category) if category else None
+        brand_mask = self._value_mask('brand', brand) if brand else None
+        mask = base.copy()
+        for filter_mask in (category_mask, brand_mask):
+            if filter_mask is not None:
+                mask &= filter_mask
+
+        # Disjunctive facets: each facet is counted without its own filter
+        names, counts = self.field_indexes['main_category'].counts(base if brand_mask is None else base & brand_mask)
+        response['facets']['categories'] = [{'name': k, 'count': int(c)} for k, c in zip(names[:15], counts[:15])]
+        names, counts = self.field_indexes['brand'].counts(base if category_mask is None else base & category_mask)
+        response['facets']['brands'] = [
+            {'name': k, 'count': int(c)} for k, c in zip(names, counts) if k != 'Unknown'
+        ][:20]
+
+        matched = np.flatnonzero(mask)
+        response['total'] = len(matched)
+        if len(matched) == 0:
+            return response
+        response['facets']['price_range'] = {
+            'min': round(float(prices[matched].min()), 2),
+            'max': round(float(prices[matched].max()), 2)
+        }
+
+        if sort == 'relevance':
+            if scores is not None:
+                matched = matched[np.argsort(-scores[matched], kind='stable')]
+        else:
+            order = self._sort_order(sort)
+            # Scanning the presorted order beats sorting once the match set is a sizeable fraction
+            if len(matched) * 8 > n:
+                matched = order.order[mask[order.order]]
+            else:
+                matched = matched[np.argsort(order.rank[matched], kind='stable')]
+
+        response['results'] = self._cards(matched[offset:offset + limit])
+        return response
+
+    @timed
+    @reads_catalog
     def get_featured_products(self):
         """Get featured products for homepage"""
         try:
@@ -410,75 +1684,66 @@ class AmazonFashionRecommender:
                 return []
                 
             # Get high-rated products
-            high_rated = self.df[self.df['rating'] >= 4.0]
-            if len(high_rated) >= 8:
-                return high_rated.sample(n=8).to_dict('records')
+            if len(self._high_rated) >= 8:
+                return self._cards(sample_positions(self._high_rated, 8))
             else:
                 return self.get_random_products(8)
         except Exception as e:
-            print(f"Error getting featured products: {e}")
+            logger.error("Error getting featured products: %s", e)
+            CALL_ERRORS.inc(method='get_featured_products')
             return self.get_random_products(8)
     
+    @timed
+    @reads_catalog
     def get_categories(self):
         """Get available categories"""
-        if self.df is None or len(self.df) == 0:
-            return []
-        
-        try:
-            categories = self.df['main_category'].value_counts().head(15)
-            return [{'name': cat, 'count': count} for cat, count in categories.items()]
-        except Exception as e:
-            print(f"Error getting categories: {e}")
-            return []
-    
+        return self.facets.categories
+
+    @timed
+    @reads_catalog
     def get_brands(self):
         """Get available brands"""
-        if self.df is None or len(self.df) == 0:
-            return []
-        
-        try:
-            brands = self.df['brand'].value_counts().head(20)
-            return [{'name': brand, 'count': count} for brand, count in brands.items() if brand != 'Unknown']
-        except Exception as e:
-            print(f"Error getting brands: {e}")
-            return []
+        return self.facets.brands
+
+    @timed
+    @reads_catalog
     def get_products_by_category(self, category_name):
-        return [p for p in self.products if p.get("main_category") == category_name]
+        if 'main_category' not in self.field_indexes:
+            return []
+        return self._cards(self.field_indexes['main_category'].lookup(category_name, 'exact'))
 
+    @timed
+    @reads_catalog
     def get_products_by_brand(self, brand_name):
-        return [p for p in self.products if p.get("brand") == brand_name]
+        if 'brand' not in self.field_indexes:
+            return []
+        return self._cards(self.field_indexes['brand'].lookup(brand_name, 'exact'))
 
+    @timed
+    @reads_catalog
     def get_stats(self):
         """Get dataset statistics"""
-        if self.df is None or len(self.df) == 0:
-            return {'total_products': 0}
-        
-        try:
-            stats = {
-                'total_products': len(self.df),
-                'total_brands': self.df['brand'].nunique(),
-                'total_categories': self.df['main_category'].nunique(),
-                'avg_rating': round(self.df['rating'].mean(), 1)
-            }
-            
-            # Add price stats if available
-            price_data = self.df[self.df['price'] > 0]
-            if len(price_data) > 0:
-                stats.update({
-                    'avg_price': round(price_data['price'].mean(), 2),
-                    'price_range': {
-                        'min': round(price_data['price'].min(), 2),
-                        'max': round(price_data['price'].max(), 2)
-                    }
-                })
-            else:
-                stats.update({
-                    'avg_price': 0,
-                    'price_range': {'min': 0, 'max': 0}
-                })
-            
-            return stats
-            
-        except Exception as e:
-            print(f"Error getting stats: {e}")
-            return {'total_products': len(self.df) if self.df is not None else 0}
\ No newline at end of file
+        return dict(self.facets.stats)
+
+    @reads_catalog
+    def memory_usage(self):
+        """Bytes held per component, split into heap and memory-mapped (shared) bytes"""
+        components = {
+            'catalog': (self.df, self._df_delta, self._string_columns, self.cards),
+            'tfidf': (self.tfidf_matrix, self._tfidf_by_term, self._tfidf_delta),
+            'neighbors': (self.neighbor_index, self.ann_index),
+            'coview': (self.coview_graph,),
+            'embeddings': (self.embeddings, None if self.embeddings is None else self.embeddings.svd.components_),
+            'search': (self.search_index, self._search_delta),
+            'filters': (self.field_indexes, self._sort_orders, self._high_rated, self._live, self._id_index,
+                        self.ranking_features)
+        }
+        usage, seen = {}, set()
+        for name, parts in components.items():
+            heap, mapped = object_nbytes(parts, seen)
+            usage[name] = {'heap': heap, 'mapped': mapped}
+        usage['total'] = {
+            'heap': sum(u['heap'] for u in usage.values()),
+            'mapped': sum(u['mapped'] for u in usage.values())
+        }
+        return usage
@@ -0,0 +1,157 @@
+import gc
+import logging
+import os
+import threading
+import time
+from models.memory import format_bytes, process_rss
+
+logger = logging.getLogger(__name__)
+
+
+class RecommenderReloader:
+    """Double-buffered holder for the live recommender.
+
+    reload() builds a replacement with factory() in a background thread while
+    the current instance keeps serving, then swaps the reference in one
+    assignment; requests that already hold the old instance finish on it and
+    it is freed once they return. Old and new catalogs coexist during the
+    build, so a reload is refused when the current catalog's heap footprint,
+    doubled, would exceed memory_budget bytes.
+
+    factory is called as factory(on_progress=callback) so build phases show up
+    in status(). Without an initial instance, current stays None (not ready)
+    until the first build, started with reload(), completes.
+    """
+
+    def __init__(self, factory, initial=None, memory_budget=None):
+        self.factory = factory
+        self.current = initial
+        self.memory_budget = memory_budget
+        self.state = 'idle'
+        self.last_error = None
+        self.last_reload = None
+        self.reloads = 0
+        self.phase = 'ready' if initial is not None else 'pending'
+        self.progress = 1.0 if initial is not None else 0.0
+        self.build_started = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._current_bytes = self._heap_bytes(initial)
+        self._peak_bytes = self._current_bytes
+        self._watcher = None
+
+    @staticmethod
+    def _heap_bytes(recommender):
+        if recommender is None:
+            return 0
+        try:
+            return recommender.memory_usage()['total']['heap']
+        except Exception:
+            return 0
+
+    def get(self):
+        return self.current
+
+    @property
+    def ready(self):
+        return self.current is not None
+
+    def _on_progress(self, phase, progress):
+        self.phase = phase
+        self.progress = progress
+
+    def reload(self, wait=False):
+        """Start a background rebuild; returns (started, reason)"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return False, 'A reload is already running'
+            if self.memory_budget and 2 * self._current_bytes > self.memory_budget:
+                reason = (f"Reload needs about {format_bytes(2 * self._current_bytes)} while both catalogs "
+                          f"are held, over the {format_bytes(self.memory_budget)} budget")
+                logger.warning(f"⚠️ {reason}")
+                return False, reason
+            self.state = 'building'
+            self._thread = threading.Thread(target=self._build, name='catalog-reload', daemon=True)
+            self._thread.start()
+        if wait:
+            self._thread.join()
+        return True, 'Reload started'
+
+    def _build(self):
+        started = time.perf_counter()
+        self.build_started = time.time()
+        logger.info("🔄 Building catalog in the background..." if self.current is None
+              else "🔄 Reloading catalog in the background...")
+        try:
+            replacement = self.factory(on_progress=self._on_progress)
+            if replacement.df is None or len(replacement.df) == 0:
+                raise RuntimeError("The new catalog has no products")
+        except Exception as e:
+            self.state = 'failed'
+            self.phase = 'failed'
+            self.last_error = str(e)
+            logger.error(f"❌ Reload failed, still serving the previous catalog: {e}" if self.current is not None
+                  else f"❌ Catalog build failed: {e}")
+            return
+
+        new_bytes = self._heap_bytes(replacement)
+        self._peak_bytes = max(self._peak_bytes, self._current_bytes + new_bytes)
+        self._current_bytes = new_bytes
+        self.state = 'idle'
+        self.phase, self.progress = 'ready', 1.0
+        self.last_error = None
+        self.last_reload = time.time()
+        self.reloads += 1
+        self.current = replacement
+        replacement = None
+        gc.collect()
+        logger.info(f"✅ Loaded catalog in {time.perf_counter() - started:.1f}s "
+              f"({len(self.current.df)} products, {format_bytes(new_bytes)} heap)")
+
+    def watch(self, path, interval=30):
+        """Poll path's mtime and size every interval seconds and reload when they change.
+
+        A change must hold for one more poll before the reload starts, so a
+        file that is still being copied into place is not picked up half-written.
+        """
+        def signature():
+            try:
+                stat = os.stat(path)
+                return stat.st_mtime_ns, stat.st_size
+            except OSError:
+                return None
+
+        def run():
+            last = pending = signature()
+            while True:
+                time.sleep(interval)
+                current = signature()
+                if current is not None and current != last and current == pending:
+                    started, _ = self.reload()
+                    if started:
+                        last = current
+                pending = current
+
+        self._watcher = threading.Thread(target=run, name='catalog-watcher', daemon=True)
+        self._watcher.start()
+
+    def status(self):
+        return {
+            'ready': self.ready,
+            'state': self.state,
+            'phase': self.phase,
+            'progress': round(self.progress, 3),
+            'build_seconds': round(time.time() - self.build_started, 1)
+            if self.state == 'building' and self.build_started else None,
+            'last_error': self.last_error,
+            'last_reload': self.last_reload,
+            'reloads': self.reloads,
+            'watching': self._watcher is not None,
+            'memory': {
+                'catalog_bytes': self._current_bytes,
+                'peak_catalog_bytes': self._peak_bytes,
+                'reload_bytes_estimate': 2 * self._current_bytes,
+                'budget_bytes': self.memory_budget,
+                'process_rss_bytes': process_rss()
+            }
+        }
@@ -0,0 +1,187 @@
+import re
+from array import array
+from bisect import bisect_left
+import numpy as np
+from models.neighbors import select_top_k
+
+TOKEN_PATTERN = re.compile(r'[^\W_]+')
+
+DEFAULT_FIELD_WEIGHTS = {
+    'name': 3.0,
+    'brand': 2.5,
+    'main_category': 1.5,
+    'subcategory': 1.5,
+    'description': 1.0,
+}
+
+
+def tokenize(text):
+    """Lowercased alphanumeric tokens of a text value"""
+    if text is None or text != text:  # None or NaN
+        return []
+    return TOKEN_PATTERN.findall(str(text).lower())
+
+
+class InvertedIndex:
+    """Field-weighted BM25 (BM25F-style) inverted index over catalog text columns.
+
+    Postings are stored like a CSR matrix: terms are sorted, and the postings of
+    term t are docs[offsets[t]:offsets[t + 1]]. Terms sharing a prefix are
+    therefore contiguous, so prefix expansion is a bisect plus a slice.
+    """
+
+    def __init__(self, field_weights=None, k1=1.2, b=0.75, max_expansions=50):
+        self.field_weights = dict(field_weights or DEFAULT_FIELD_WEIGHTS)
+        self.k1 = k1
+        self.b = b
+        self.max_expansions = max_expansions
+        self.n_docs = 0
+        self.terms = []
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.docs = np.zeros(0, dtype=np.int32)
+        self.weights = np.zeros(0, dtype=np.float32)
+        self.idf = np.zeros(0, dtype=np.float32)
+
+    @classmethod
+    def build(cls, df, field_weights=None, **params):
+        index = cls(field_weights, **params)
+        index.fit(df)
+        return index
+
+    def params(self):
+        return {
+            'field_weights': self.field_weights,
+            'k1': self.k1,
+            'b': self.b,
+            'max_expansions': self.max_expansions,
+            'n_docs': self.n_docs,
+        }
+
+    @classmethod
+    def from_arrays(cls, params, terms, offsets, docs, weights, idf):
+        """Rebuild an index from the arrays of a saved snapshot"""
+        params = dict(params)
+        n_docs = params.pop('n_docs')
+        index = cls(**params)
+        index.n_docs = n_docs
+        index.terms = terms
+        index.offsets, index.docs, index.weights, index.idf = offsets, docs, weights, idf
+        return index
+
+    def fit(self, df):
+        fields = [f for f in self.field_weights if f in df.columns]
+        columns = [df[f].tolist() for f in fields]
+        self.n_docs = len(df)
+
+        # Average field lengths for BM25 length normalization
+        avg_lengths = []
+        for field in fields:
+            lengths = df[field].astype(str).str.count(TOKEN_PATTERN.pattern)
+            avg_lengths.append(max(float(lengths.mean()), 1.0) if len(lengths) else 1.0)
+
+        vocab = {}
+        term_ids, docs, weights = array('i'), array('i'), array('f')
+        for doc, values in enumerate(zip(*columns)):
+            tf = {}
+            for field, avg_length, value in zip(fields, avg_lengths, values):
+                tokens = tokenize(value)
+                if not tokens:
+                    continue
+                norm = self.field_weights[field] / (1 - self.b + self.b * len(tokens) / avg_length)
+                for token in tokens:
+                    tf[token] = tf.get(token, 0.0) + norm
+            for token, weight in tf.items():
+                term_ids.append(vocab.setdefault(token, len(vocab)))
+                docs.append(doc)
+                weights.append(weight)
+
+        # Renumber terms alphabetically, then group postings by term
+        self.terms = sorted(vocab)
+        remap = np.empty(len(vocab), dtype=np.int32)
+        remap[[vocab[t] for t in self.terms]] = np.arange(len(self.terms), dtype=np.int32)
+        term_ids = remap[np.frombuffer(term_ids, dtype=np.int32)]
+        order = np.argsort(term_ids, kind='stable')
+
+        self.docs = np.frombuffer(docs, dtype=np.int32)[order]
+        self.weights = np.frombuffer(weights, dtype=np.float32)[order]
+        doc_freq = np.bincount(term_ids, minlength=len(self.terms))
+        self.offsets = np.concatenate(([0], np.cumsum(doc_freq))).astype(np.int64)
+        self.idf = np.log1p((self.n_docs - doc_freq + 0.5) / (doc_freq + 0.5)).astype(np.float32)
+        return self
+
+    def __len__(self):
+        return self.n_docs
+
+    def _expand(self, term, prefix):
+        """Term ids matching a query term; prefix matches are capped by document frequency"""
+        lo = bisect_left(self.terms, term)
+        exact = lo < len(self.terms) and self.terms[lo] == term
+        if not prefix and exact:
+            return [lo]
+
+        hi = bisect_left(self.terms, term + '\uffff', lo)
+        ids = np.arange(lo, hi)
+        if len(ids) > self.max_expansions:
+            doc_freq = self.offsets[ids + 1] - self.offsets[ids]
+            ids = ids[np.argsort(-doc_freq, kind='stable')[:self.max_expansions]]
+        return ids.tolist()
+
+    def _score_group(self, term, term_ids):
+        """Per-document BM25 score of one query term (summed over its expansions)"""
+        docs, scores = [], []
+        for t in term_ids:
+            start, stop = self.offsets[t], self.offsets[t + 1]
+            tf = self.weights[start:stop]
+            score = self.idf[t] * tf * (self.k1 + 1) / (tf + self.k1)
+            if self.terms[t] != term:
+                score = score * 0.5  # prefer exact matches over prefix expansions
+            docs.append(self.docs[start:stop])
+            scores.append(score)
+        if not docs:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+
+        docs, inverse = np.unique(np.concatenate(docs), return_inverse=True)
+        return docs, np.bincount(inverse, weights=np.concatenate(scores))
+
+    def parse_query(self, query):
+        """Split a query into (terms, operator); 'a OR b' switches to OR, 'term*' is a prefix"""
+        words = str(query).split()
+        operator = 'or' if any(w == 'OR' for w in words) else None
+        terms = []
+        for word in words:
+            if word in ('OR', 'AND'):
+                continue
+            prefix = word.endswith('*')
+            for token in tokenize(word):
+                terms.append((token, prefix))
+        return terms, operator
+
+    def search(self, query, n=12, operator='and', prefix_last=True):
+        """Ranked (positions, scores) for a query.
+
+        operator is 'and' (every term must match) or 'or'; an explicit OR in the
+        query overrides it. Terms ending in '*' and, with prefix_last, the final
+        term match as prefixes, as do terms that have no exact match.
+        """
+        terms, query_operator = self.parse_query(query)
+        operator = query_operator or operator
+        if not terms:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        group_docs, group_scores = [], []
+        for i, (term, prefix) in enumerate(terms):
+            prefix = prefix or (prefix_last and i == len(terms) - 1)
+            docs, scores = self._score_group(term, self._expand(term, prefix))
+            if operator == 'and' and len(docs) == 0:
+                return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+            group_docs.append(docs)
+            group_scores.append(scores)
+
+        docs, inverse = np.unique(np.concatenate(group_docs), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(group_scores))
+        if operator == 'and':
+            matched = np.bincount(inverse) == len(group_docs)
+            docs, scores = docs[matched], scores[matched]
+
+        top = select_top_k(scores, n)[0]
+        return docs[top], scores[top]
@@ -0,0 +1,209 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from models.storage import StringColumn, IdHashIndex
+
+# Bump whenever cleaning, feature building or the on-disk layout changes so
+# snapshots written by older code are rebuilt instead of silently reused.
+SNAPSHOT_VERSION = 4
+
+
+# Digests by (path, mtime, size), so repeated version checks don't re-read the file
+_digests = {}
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """SHA-1 of a file's contents, read in chunks"""
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    if key in _digests:
+        return _digests[key]
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    _digests[key] = digest.hexdigest()
+    return _digests[key]
+
+
+def save_string_column(directory, name, values):
+    """Store strings as one UTF-8 blob plus an offsets array (and a null mask if needed)"""
+    encoded, nulls = [], []
+    for value in values:
+        missing = value is None or (isinstance(value, float) and value != value)
+        nulls.append(missing)
+        encoded.append(b'' if missing else str(value).encode('utf-8'))
+
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(e) for e in encoded])
+    np.save(os.path.join(directory, f'{name}.blob.npy'), np.frombuffer(b''.join(encoded), dtype=np.uint8))
+    np.save(os.path.join(directory, f'{name}.offsets.npy'), offsets)
+    if any(nulls):
+        np.save(os.path.join(directory, f'{name}.nulls.npy'), np.array(nulls, dtype=bool))
+
+
+def load_string_column(directory, name):
+    """Decode a column written by save_string_column into a list of str/None"""
+    blob = np.load(os.path.join(directory, f'{name}.blob.npy')).tobytes()
+    offsets = np.load(os.path.join(directory, f'{name}.offsets.npy')).tolist()
+    values = [blob[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(len(offsets) - 1)]
+
+    nulls_path = os.path.join(directory, f'{name}.nulls.npy')
+    if os.path.exists(nulls_path):
+        for i in np.flatnonzero(np.load(nulls_path)):
+            values[i] = None
+    return values
+
+
+def save_categorical_column(directory, name, series):
+    """Store a low-cardinality column as int32 codes plus its distinct values"""
+    categorical = pd.Categorical(series)
+    np.save(os.path.join(directory, f'{name}.codes.npy'), categorical.codes.astype(np.int32))
+    save_string_column(directory, f'{name}.categories', list(categorical.categories))
+
+
+class SnapshotStore:
+    """Versioned on-disk snapshot of a cleaned catalog and its fitted models.
+
+    Everything is stored as plain .npy arrays (CSR matrices as their data,
+    indices and indptr arrays) with a manifest.json describing them, so loading
+    needs no parsing beyond the arrays themselves. Loading with mmap=True maps
+    the arrays read-only instead of reading them, so processes opening the
+    same snapshot share its pages.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def read_manifest(self):
+        path = os.path.join(self.directory, 'manifest.json')
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _save_matrix(self, directory, name, matrix):
+        matrix = matrix.tocsr()
+        for part in ('data', 'indices', 'indptr'):
+            np.save(os.path.join(directory, f'{name}.{part}.npy'), getattr(matrix, part))
+        return list(matrix.shape)
+
+    def _load_matrix(self, name, shape, mmap_mode=None):
+        parts = [np.load(os.path.join(self.directory, f'{name}.{part}.npy'), mmap_mode=mmap_mode)
+                 for part in ('data', 'indices', 'indptr')]
+        return sp.csr_matrix(tuple(parts), shape=tuple(shape), copy=False)
+
+    def save(self, key, df, columns, matrix, vocabulary, idf, search_index=None, categorical=(), coview=None):
+        """Write a snapshot atomically: build in a temp directory, then swap it in"""
+        tmp_dir = f'{self.directory}.tmp-{os.getpid()}'
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+
+        manifest = {
+            'version': SNAPSHOT_VERSION,
+            'key': key,
+            'created': time.time(),
+            'n_rows': len(df),
+            'columns': {},
+        }
+        for column in columns:
+            if column not in df.columns:
+                continue
+            if pd.api.types.is_numeric_dtype(df[column]):
+                np.save(os.path.join(tmp_dir, f'{column}.npy'), df[column].to_numpy())
+                manifest['columns'][column] = 'numeric'
+            elif column in categorical:
+                save_categorical_column(tmp_dir, column, df[column])
+                manifest['columns'][column] = 'categorical'
+            else:
+                save_string_column(tmp_dir, column, df[column].tolist())
+                manifest['columns'][column] = 'string'
+
+        manifest['tfidf_shape'] = self._save_matrix(tmp_dir, 'tfidf', matrix)
+        self._save_matrix(tmp_dir, 'tfidf_by_term', matrix.T.tocsr())
+        if coview is not None:
+            manifest['coview_shape'] = self._save_matrix(tmp_dir, 'coview', coview)
+        if 'id' in df.columns:
+            np.save(os.path.join(tmp_dir, 'id.slots.npy'), IdHashIndex.build_slots(df['id'].tolist()))
+        save_string_column(tmp_dir, 'vocabulary', vocabulary)
+        np.save(os.path.join(tmp_dir, 'idf.npy'), np.asarray(idf))
+
+        if search_index is not None:
+            manifest['search_index'] = search_index.params()
+            save_string_column(tmp_dir, 'search_terms', search_index.terms)
+            for part in ('offsets', 'docs', 'weights', 'idf'):
+                np.save(os.path.join(tmp_dir, f'search_{part}.npy'), getattr(search_index, part))
+
+        with open(os.path.join(tmp_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+
+        old_dir = f'{self.directory}.old-{os.getpid()}'
+        if os.path.exists(self.directory):
+            os.replace(self.directory, old_dir)
+        os.replace(tmp_dir, self.directory)
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+    def load(self, key, mmap=False):
+        """Return the snapshot contents as a dict, or None if missing or stale.
+
+        In memory mode every column is in 'df'. With mmap=True, 'df' holds the
+        numeric and categorical columns over mapped arrays and string columns
+        are returned separately as StringColumn objects in 'string_columns'.
+        """
+        manifest = self.read_manifest()
+        if manifest is None or manifest.get('version') != SNAPSHOT_VERSION or manifest.get('key') != key:
+            return None
+
+        mmap_mode = 'r' if mmap else None
+
+        def path(name):
+            return os.path.join(self.directory, name)
+
+        data, string_columns = {}, {}
+        for column, kind in manifest['columns'].items():
+            if kind == 'numeric':
+                data[column] = np.load(path(f'{column}.npy'), mmap_mode=mmap_mode)
+            elif kind == 'categorical':
+                codes = np.load(path(f'{column}.codes.npy'), mmap_mode=mmap_mode)
+                categories = load_string_column(self.directory, f'{column}.categories')
+                if mmap:
+                    data[column] = pd.Categorical.from_codes(codes, categories)
+                else:
+                    values = np.array(categories + [None], dtype=object)
+                    data[column] = values[codes]  # code -1 (missing) picks the trailing None
+            elif mmap:
+                string_columns[column] = StringColumn.load(self.directory, column, mmap_mode)
+            else:
+                data[column] = load_string_column(self.directory, column)
+
+        snapshot = {
+            'manifest': manifest,
+            'df': pd.DataFrame(data, columns=[c for c in manifest['columns'] if c in data], copy=False),
+            'string_columns': string_columns,
+            'tfidf_matrix': self._load_matrix('tfidf', manifest['tfidf_shape'], mmap_mode),
+            'tfidf_by_term': self._load_matrix('tfidf_by_term', manifest['tfidf_shape'][::-1], mmap_mode),
+            'vocabulary': load_string_column(self.directory, 'vocabulary'),
+            'idf': np.load(path('idf.npy')),
+            'id_slots': np.load(path('id.slots.npy'), mmap_mode=mmap_mode) if os.path.exists(path('id.slots.npy')) else None,
+            'search_index': None,
+            'coview': None,
+        }
+        if 'coview_shape' in manifest:
+            snapshot['coview'] = self._load_matrix('coview', manifest['coview_shape'], mmap_mode)
+        if 'search_index' in manifest:
+            if mmap:
+                terms = StringColumn.load(self.directory, 'search_terms', mmap_mode)
+            else:
+                terms = load_string_column(self.directory, 'search_terms')
+            snapshot['search_index'] = {
+                'params': manifest['search_index'],
+                'terms': terms,
+                **{part: np.load(path(f'search_{part}.npy'), mmap_mode=mmap_mode)
+                   for part in ('offsets', 'docs', 'weights', 'idf')},
+            }
+        return snapshot
@@ -0,0 +1,91 @@
+import os
+import zlib
+import numpy as np
+
+
+class StringColumn:
+    """Read-only string column backed by a UTF-8 blob and an offsets array.
+
+    With mmap_mode='r' both arrays stay in the OS page cache, so every worker
+    process that opens the same snapshot shares one physical copy; strings are
+    only decoded for the rows actually requested.
+    """
+
+    def __init__(self, blob, offsets, nulls=None):
+        self.blob = blob
+        self.offsets = offsets
+        self.nulls = nulls
+
+    @classmethod
+    def load(cls, directory, name, mmap_mode=None):
+        blob = np.load(os.path.join(directory, f'{name}.blob.npy'), mmap_mode=mmap_mode)
+        offsets = np.load(os.path.join(directory, f'{name}.offsets.npy'), mmap_mode=mmap_mode)
+        nulls_path = os.path.join(directory, f'{name}.nulls.npy')
+        nulls = np.load(nulls_path, mmap_mode=mmap_mode) if os.path.exists(nulls_path) else None
+        return cls(blob, offsets, nulls)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, position):
+        if self.nulls is not None and self.nulls[position]:
+            return None
+        start, stop = self.offsets[position], self.offsets[position + 1]
+        return self.blob[start:stop].tobytes().decode('utf-8')
+
+    def take(self, positions):
+        return [self[int(p)] for p in positions]
+
+    def to_list(self):
+        return self.take(range(len(self)))
+
+    @property
+    def nbytes(self):
+        return self.blob.nbytes + self.offsets.nbytes + (self.nulls.nbytes if self.nulls is not None else 0)
+
+
+def stable_hash(value):
+    """Process-independent string hash (Python's hash() is salted per process)"""
+    return zlib.crc32(str(value).encode('utf-8'))
+
+
+class IdHashIndex:
+    """Open-addressing hash table from product id to row position.
+
+    The table is a single int32 array that can be memory-mapped and shared;
+    keys are not stored, collisions are resolved by comparing against the id
+    column itself.
+    """
+
+    def __init__(self, slots, ids):
+        self.slots = slots
+        self.ids = ids
+        self.mask = len(slots) - 1
+
+    @staticmethod
+    def build_slots(ids):
+        size = 1 << max(4, int(2 * len(ids) - 1).bit_length())
+        slots = np.full(size, -1, dtype=np.int32)
+        mask = size - 1
+        seen = set()
+        for position, product_id in enumerate(ids):
+            product_id = str(product_id)
+            if product_id in seen:
+                continue  # first row wins for duplicate ids
+            seen.add(product_id)
+            slot = stable_hash(product_id) & mask
+            while slots[slot] != -1:
+                slot = (slot + 1) & mask
+            slots[slot] = position
+        return slots
+
+    def get(self, product_id):
+        product_id = str(product_id)
+        slot = stable_hash(product_id) & self.mask
+        while True:
+            position = int(self.slots[slot])
+            if position == -1:
+                return None
+            if self.ids[position] == product_id:
+                return position
+            slot = (slot + 1) & self.mask
@@ -0,0 +1,56 @@
+import numpy as np
+
+# Fitted documents sampled to estimate the vocabulary's baseline coverage
+BASELINE_SAMPLE = 2000
+
+
+class VocabularyDrift:
+    """How much worse the fitted TF-IDF vocabulary covers documents added since the fit.
+
+    The out-of-vocabulary rate of added documents' terms is compared against
+    the rate on a sample of the fitted corpus, since with max_features many
+    terms are out of vocabulary even for the original catalog.
+    """
+
+    def __init__(self, vectorizer, fitted_texts, seed=0):
+        self.analyzer = vectorizer.build_analyzer()
+        self.vocabulary = vectorizer.vocabulary_
+        fitted_texts = list(fitted_texts)
+        if len(fitted_texts) > BASELINE_SAMPLE:
+            rng = np.random.default_rng(seed)
+            fitted_texts = [fitted_texts[i] for i in rng.choice(len(fitted_texts), BASELINE_SAMPLE, replace=False)]
+        tokens, oov = self._count(fitted_texts)
+        self.baseline = oov / tokens if tokens else 0.0
+        self.docs = self.tokens = self.oov = 0
+
+    def _count(self, texts):
+        tokens = oov = 0
+        for text in texts:
+            terms = self.analyzer(text)
+            tokens += len(terms)
+            oov += sum(1 for term in terms if term not in self.vocabulary)
+        return tokens, oov
+
+    def observe(self, texts):
+        """Account for newly added documents"""
+        tokens, oov = self._count(texts)
+        self.docs += len(texts)
+        self.tokens += tokens
+        self.oov += oov
+
+    @property
+    def rate(self):
+        return self.oov / self.tokens if self.tokens else 0.0
+
+    @property
+    def excess(self):
+        """Added documents' out-of-vocabulary rate above the fitted corpus baseline"""
+        return max(0.0, self.rate - self.baseline)
+
+    def stats(self):
+        return {
+            'docs': self.docs,
+            'oov_rate': round(self.rate, 4),
+            'baseline_oov_rate': round(self.baseline, 4),
+            'excess': round(self.excess, 4)
+        }
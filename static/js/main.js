@@ -281,7 +281,7 @@ function debounce(func, wait) {
 }
 
 // API Helper Functions
-async function fetchRecommendations(productId) {
+async function fetchProductRecommendations(productId) {
     try {
         const response = await fetch(`/api/recommendations/${productId}`);
         if (!response.ok) throw new Error('Failed to fetch recommendations');
@@ -292,6 +292,72 @@ async function fetchRecommendations(productId) {
     }
 }
 
+async function fetchRecommendationsBatch(productIds, k = 8) {
+    try {
+        const response = await fetch('/api/recommendations/batch', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ ids: productIds, k: k })
+        });
+        if (!response.ok) throw new Error('Failed to fetch recommendations');
+        return await response.json();
+    } catch (error) {
+        console.error('Error fetching recommendations:', error);
+        return { success: false, error: error.message };
+    }
+}
+
+// fetchRecommendations calls made in the same tick share one batch request.
+// A lone id, or an id the batch doesn't know, goes to the single-product
+// endpoint, which falls back to random products instead of an empty list
+const pendingRecommendations = new Map();
+let recommendationFlush = null;
+
+function fetchRecommendations(productId) {
+    if (!pendingRecommendations.has(productId)) {
+        let resolve;
+        const promise = new Promise(r => { resolve = r; });
+        pendingRecommendations.set(productId, { promise, resolve });
+    }
+    if (!recommendationFlush) {
+        recommendationFlush = setTimeout(flushRecommendations, 0);
+    }
+    return pendingRecommendations.get(productId).promise;
+}
+
+async function flushRecommendations() {
+    const batch = new Map(pendingRecommendations);
+    pendingRecommendations.clear();
+    recommendationFlush = null;
+
+    const ids = Array.from(batch.keys());
+    if (ids.length === 1) {
+        batch.get(ids[0]).resolve(await fetchProductRecommendations(ids[0]));
+        return;
+    }
+    for (let i = 0; i < ids.length; i += 100) {
+        const chunk = ids.slice(i, i + 100);
+        const data = await fetchRecommendationsBatch(chunk);
+        chunk.forEach(productId => {
+            if (!data.success) {
+                batch.get(productId).resolve(data);
+                return;
+            }
+            const recommendations = data.results[productId] || [];
+            if (!recommendations.length) {
+                batch.get(productId).resolve(fetchProductRecommendations(productId));
+                return;
+            }
+            batch.get(productId).resolve({
+                success: true,
+                product_id: productId,
+                recommendations: recommendations,
+                count: recommendations.length
+            });
+        });
+    }
+}
+
 async function searchProducts(query, limit = 12) {
     try {
         const url = new URL('/api/search', window.location.origin);